@@ -4,15 +4,111 @@ CAN总线管理器 - 统一管理CAN总线和Notifier, 所有监听器通过依
 
 import can
 import sys
+import pickle
+import logging
 import Protocol
 import cantools
+import threading
 from pathlib import Path
 from Logger import LoggerMixin
-from typing import List, Optional
+from typing import Any, Callable, List, Optional
 
 
 from Tools import FUNCTION_CONFIG, PROJECT_CONFIG, get_default_project
 
+_log = logging.getLogger(__name__)
+
+# -------- DBC 缓存 --------
+
+# 进程级缓存：(绝对路径, mtime_ns, encoding) -> Database；DBC 文件修改后自动失效
+_DBC_CACHE: dict[tuple[str, int, str], cantools.db.Database] = {}
+# 每个 Database 的逐消息解码函数：id(db) -> {frame_id: decode}
+_DECODER_CACHE: dict[int, dict[int, Callable[[bytes], dict]]] = {}
+_DBC_CACHE_LOCK = threading.Lock()
+# 预编译文件格式版本；cantools 版本变化同样视为失效
+_DBC_PICKLE_VERSION = 1
+_DBC_PICKLE_SUFFIX = ".pkl"
+
+
+def _dbc_pickle_path(path: Path) -> Path:
+    return path.with_name(path.name + _DBC_PICKLE_SUFFIX)
+
+
+def _load_dbc_pickle(path: Path, mtime_ns: int, encoding: str) -> Optional[Any]:
+    pickle_path = _dbc_pickle_path(path)
+    if not pickle_path.exists():
+        return None
+    try:
+        with open(pickle_path, "rb") as f:
+            header, db = pickle.load(f)
+    except Exception as exc:
+        _log.warning(f"DBC预编译文件读取失败, 将重新解析: {pickle_path}, {exc}")
+        return None
+    expected = (_DBC_PICKLE_VERSION, cantools.__version__, mtime_ns, encoding)
+    if header != expected:
+        return None
+    return db
+
+
+def _store_dbc_pickle(path: Path, mtime_ns: int, encoding: str, db: Any) -> None:
+    pickle_path = _dbc_pickle_path(path)
+    header = (_DBC_PICKLE_VERSION, cantools.__version__, mtime_ns, encoding)
+    tmp_path = pickle_path.with_name(pickle_path.name + ".tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            pickle.dump((header, db), f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp_path.replace(pickle_path)
+    except Exception as exc:
+        _log.warning(f"DBC预编译文件写入失败: {pickle_path}, {exc}")
+        try:
+            tmp_path.unlink()
+        except Exception:
+            pass
+
+
+def load_dbc(
+    dbc_path: str | Path, encoding: str = "utf-8", persist: Optional[bool] = None
+) -> cantools.db.Database:
+    """加载 DBC（进程级缓存, 以路径+修改时间为键）。
+
+    persist 为 True 时在 .dbc 旁写入/读取 .dbc.pkl 预编译文件, 冷启动跳过解析；
+    为 None 时取 CanBus.DbcPickleCache 配置。文件不存在时抛出 FileNotFoundError。
+    """
+    path = Path(dbc_path).resolve()
+    mtime_ns = path.stat().st_mtime_ns
+    key = (str(path), mtime_ns, encoding)
+    with _DBC_CACHE_LOCK:
+        db = _DBC_CACHE.get(key)
+    if db is not None:
+        return db
+
+    if persist is None:
+        persist = bool(FUNCTION_CONFIG.get("CanBus", {}).get("DbcPickleCache", False))
+
+    db = _load_dbc_pickle(path, mtime_ns, encoding) if persist else None
+    if db is None:
+        db = cantools.db.load_file(str(path), encoding=encoding)
+        if persist:
+            _store_dbc_pickle(path, mtime_ns, encoding, db)
+
+    with _DBC_CACHE_LOCK:
+        # 同一路径的旧版本（mtime 变化前）移除
+        for stale in [k for k in _DBC_CACHE if k[0] == key[0] and k != key]:
+            _DECODER_CACHE.pop(id(_DBC_CACHE.pop(stale)), None)
+        db = _DBC_CACHE.setdefault(key, db)
+    return db
+
+
+def get_message_decoders(db: Any) -> dict[int, Callable[[bytes], dict]]:
+    """返回 {frame_id: message.decode}, 跳过 Database.decode_message 的通用查找。"""
+    decoders = _DECODER_CACHE.get(id(db))
+    if decoders is None:
+        decoders = {message.frame_id: message.decode for message in db.messages}
+        with _DBC_CACHE_LOCK:
+            if any(cached is db for cached in _DBC_CACHE.values()):
+                _DECODER_CACHE[id(db)] = decoders
+    return decoders
+
 
 class CanBusManager(LoggerMixin):
     """CAN总线管理器：统一管理Bus和Notifier"""
@@ -37,7 +133,7 @@ class CanBusManager(LoggerMixin):
         self.dbc = None
         if dbc_path:
             try:
-                self.dbc = cantools.db.load_file(dbc_path, encoding="utf-8")
+                self.dbc = load_dbc(dbc_path, encoding="utf-8")
             except FileNotFoundError:
                 self.log.warning(f"DBC文件未找到: {dbc_path}, DBC解析功能将不可用")
             except Exception as exc:
@@ -1,62 +1,277 @@
 from __future__ import annotations
 import time
+import heapq
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from Logger import LoggerMixin
 from RxParser import RxSplitter
 from CanInitializer import CanBusManager
 from typing import Any, Callable, Optional
-from Tools import PROJECT_CONFIG, set_cards, get_default_project
+from Tools import FUNCTION_CONFIG, PROJECT_CONFIG, set_cards, get_default_project
+
+
+class _PeriodicJob:
+    """单个周期任务的调度状态与运行统计"""
+
+    __slots__ = (
+        "name",
+        "interval_s",
+        "func",
+        "slow",
+        "adaptive",
+        "slow_streak",
+        "fast_streak",
+        "runs",
+        "overruns",
+        "lateness_max",
+        "lateness_total",
+        "runtime_last",
+        "runtime_max",
+        "runtime_total",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        interval_s: float,
+        func: Callable[[], None],
+        slow: bool,
+        adaptive: bool = True,
+    ):
+        self.name = name
+        self.interval_s = interval_s
+        self.func = func
+        self.slow = slow
+        # add_job 未显式指定 slow 时按实际耗时在调度线程/线程池之间切换
+        self.adaptive = adaptive
+        self.slow_streak = 0
+        self.fast_streak = 0
+        self.runs = 0
+        self.overruns = 0
+        self.lateness_max = 0.0
+        self.lateness_total = 0.0
+        self.runtime_last = 0.0
+        self.runtime_max = 0.0
+        self.runtime_total = 0.0
 
 
 class _PeriodicWorker(LoggerMixin):
-    def __init__(self):
-        self._jobs: dict[str, tuple[float, Callable[[], None]]] = {}
-        self._stop_event = threading.Event()
+    """基于最小堆的周期任务调度器
+
+    - 调度线程睡到最近的截止时间, 不再轮询
+    - 截止时间按固定速率推进 (deadline += interval), 周期不随任务耗时漂移；
+      错过的周期直接跳过并计入 overruns
+    - 慢任务 (add_job(slow=True) 或连续 SlowJobStreak 次耗时超过 SlowJobThreshold) 提交到线程池,
+      快任务在调度线程内执行, 不会被慢任务阻塞；同一任务不会并发重入
+    - 自动判定的慢任务连续 SlowJobStreak 次不超时后回到调度线程, 偶发的慢一次 (首次调用预热、GC 停顿)
+      不会让快任务永久占用线程池
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        slow_threshold_s: Optional[float] = None,
+    ):
+        threading_cfg = FUNCTION_CONFIG.get("Threading", {})
+        self._max_workers = int(max_workers or threading_cfg.get("PeriodicWorkers", 4))
+        self._slow_threshold_s = float(
+            slow_threshold_s
+            if slow_threshold_s is not None
+            else threading_cfg.get("SlowJobThreshold", 0.05)
+        )
+        self._slow_streak = max(1, int(threading_cfg.get("SlowJobStreak", 3)))
+        self._jobs: dict[str, _PeriodicJob] = {}
+        # 记住当前判定为慢任务的名字, remove_job 后再 enable 仍走线程池
+        self._slow_names: set[str] = set()
+        # 正在执行的任务名; 按名字而非任务对象记录, 同名任务重新 add_job 时旧实例仍在跑也不会并发
+        self._running_names: set[str] = set()
+        self._heap: list[tuple[float, int, _PeriodicJob]] = []
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._stopping = False
         self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
 
-    def add_job(self, name: str, interval_s: float, func: Callable[[], None]) -> None:
+    def add_job(
+        self,
+        name: str,
+        interval_s: float,
+        func: Callable[[], None],
+        slow: Optional[bool] = None,
+    ) -> None:
         if interval_s <= 0:
             raise ValueError("interval_s must be > 0")
-        self._jobs[name] = (float(interval_s), func)
+        with self._cond:
+            adaptive = slow is None
+            if adaptive:
+                slow = name in self._slow_names
+            elif slow:
+                self._slow_names.add(name)
+            job = _PeriodicJob(name, float(interval_s), func, bool(slow), adaptive)
+            self._jobs[name] = job
+            # 新任务立即执行一次, 之后按固定速率
+            self._push(time.monotonic(), job)
+            self._cond.notify()
 
     def remove_job(self, name: str) -> None:
-        self._jobs.pop(name, None)
+        # 堆里的旧条目在出堆时按身份比对丢弃
+        with self._cond:
+            self._jobs.pop(name, None)
 
     def has_job(self, name: str) -> bool:
         return name in self._jobs
 
     def list_jobs(self) -> dict[str, float]:
         """Return current scheduled jobs: {job_name: interval_seconds}."""
-        return {name: float(interval_s) for name, (interval_s, _) in self._jobs.items()}
+        return {name: job.interval_s for name, job in list(self._jobs.items())}
+
+    def metrics(self) -> dict[str, dict[str, Any]]:
+        """各任务的调度统计：延迟 (实际开始 - 截止时间)、耗时与错过的周期数, 单位 ms"""
+        with self._cond:
+            result = {}
+            for name, job in self._jobs.items():
+                runs = max(1, job.runs)
+                result[name] = {
+                    "interval_ms": job.interval_s * 1000.0,
+                    "slow": job.slow,
+                    "runs": job.runs,
+                    "overruns": job.overruns,
+                    "lateness_avg_ms": job.lateness_total / runs * 1000.0,
+                    "lateness_max_ms": job.lateness_max * 1000.0,
+                    "runtime_last_ms": job.runtime_last * 1000.0,
+                    "runtime_avg_ms": job.runtime_total / runs * 1000.0,
+                    "runtime_max_ms": job.runtime_max * 1000.0,
+                }
+            return result
 
     def start(self) -> None:
-        if self._thread and self._thread.is_alive():
-            return
-        self._stop_event.clear()
+        with self._cond:
+            running = self._thread is not None and self._thread.is_alive()
+            if running and not self._stopping:
+                return
+            self._stopping = False
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._max_workers, thread_name_prefix="periodic"
+                )
+            # 与原实现一致：(重新) 启动时所有任务立即执行一次
+            self._heap = []
+            now = time.monotonic()
+            for job in self._jobs.values():
+                self._push(now, job)
+            if running:
+                # stop 超时时调度线程仍卡在快任务里, 取消停止后它会继续调度
+                self._cond.notify()
+                return
         self._thread = threading.Thread(target=self._run, daemon=True)
         self._thread.start()
 
     def stop(self, timeout: float = 2.0) -> None:
-        self._stop_event.set()
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+            executor, self._executor = self._executor, None
         if self._thread and self._thread.is_alive():
             self._thread.join(timeout=timeout)
+        if executor is not None:
+            # 正在执行的慢任务自然结束, 排队中的取消
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _push(self, deadline: float, job: _PeriodicJob) -> None:
+        self._seq += 1
+        heapq.heappush(self._heap, (deadline, self._seq, job))
 
     def _run(self) -> None:
-        next_run: dict[str, float] = {name: time.time() for name in self._jobs}
-        while not self._stop_event.is_set():
-            now = time.time()
-            # 避免忙等
-            time.sleep(0.01)
-
-            for name, (interval_s, func) in list(self._jobs.items()):
-                due = next_run.get(name, now)
-                if now < due:
-                    continue
-                try:
-                    func()
-                except Exception as exc:
-                    self.log.error(f"Periodic job '{name}' failed: {exc}")
-                next_run[name] = now + interval_s
+        while True:
+            with self._cond:
+                job, deadline = self._next_due()
+                if job is None:
+                    return
+                dispatch_slow = job.slow and self._executor is not None
+                if dispatch_slow:
+                    try:
+                        self._executor.submit(self._execute, job, deadline)
+                    except RuntimeError:
+                        # 线程池已关闭 (stop 进行中)
+                        self._running_names.discard(job.name)
+                        continue
+            if not dispatch_slow:
+                self._execute(job, deadline)
+
+    def _next_due(self) -> tuple[Optional[_PeriodicJob], float]:
+        """在持锁状态下等到下一个可执行的任务；停止时返回 (None, 0)"""
+        while not self._stopping:
+            if not self._heap:
+                self._cond.wait()
+                continue
+            deadline, _, job = self._heap[0]
+            now = time.monotonic()
+            if deadline > now:
+                self._cond.wait(deadline - now)
+                continue
+            heapq.heappop(self._heap)
+            if self._jobs.get(job.name) is not job:
+                continue  # 已移除或被同名任务替换
+
+            # 固定速率：下一个边界 = 本次截止时间 + interval, 已错过的边界跳过
+            interval = job.interval_s
+            next_deadline = deadline + interval
+            if next_deadline <= now:
+                missed = int((now - deadline) // interval)
+                job.overruns += missed
+                next_deadline = deadline + (missed + 1) * interval
+            self._push(next_deadline, job)
+
+            if job.name in self._running_names:
+                # 上一次 (或被替换前的同名任务) 还没跑完, 本周期不重入
+                job.overruns += 1
+                continue
+            self._running_names.add(job.name)
+            return job, deadline
+        return None, 0.0
+
+    def _execute(self, job: _PeriodicJob, deadline: float) -> None:
+        started = time.monotonic()
+        try:
+            job.func()
+        except Exception as exc:
+            self.log.error(f"Periodic job '{job.name}' failed: {exc}")
+        finished = time.monotonic()
+        runtime = finished - started
+        lateness = max(0.0, started - deadline)
+        with self._cond:
+            self._running_names.discard(job.name)
+            job.runs += 1
+            job.lateness_total += lateness
+            job.lateness_max = max(job.lateness_max, lateness)
+            job.runtime_last = runtime
+            job.runtime_total += runtime
+            job.runtime_max = max(job.runtime_max, runtime)
+            if job.adaptive:
+                self._classify(job, runtime)
+
+    def _classify(self, job: _PeriodicJob, runtime: float) -> None:
+        """持锁调用: 连续超时才移入线程池, 连续不超时再移回调度线程"""
+        if runtime > self._slow_threshold_s:
+            job.slow_streak += 1
+            job.fast_streak = 0
+        else:
+            job.fast_streak += 1
+            job.slow_streak = 0
+        if not job.slow and job.slow_streak >= self._slow_streak:
+            job.slow = True
+            self._slow_names.add(job.name)
+            self.log.info(
+                f"Periodic job '{job.name}' took {runtime * 1000:.0f} ms "
+                f"{job.slow_streak} times in a row, moved to executor"
+            )
+        elif job.slow and job.fast_streak >= self._slow_streak:
+            job.slow = False
+            self._slow_names.discard(job.name)
+            self.log.info(
+                f"Periodic job '{job.name}' back under "
+                f"{self._slow_threshold_s * 1000:.0f} ms, moved to scheduler thread"
+            )
 
 
 class ComponentsInstantiation(LoggerMixin):
@@ -280,6 +495,38 @@ class ComponentsInstantiation(LoggerMixin):
     def __getitem__(self, op_name: str) -> Callable[..., Any]:
         return self.ops[op_name]
 
+    def collect_group_snapshot(self, slots: list[int]) -> dict[int, dict]:
+        """一次取齐多个槽位的状态与诊断结果, 结构与 Tools.get_slot_results 相同。
+
+        每个数据源只取一次: 状态表各取一次引用, 诊断三张表在同一次加锁内按 slot 读取,
+        不再为每个 slot 整表复制。
+        """
+        status_fn = self.ops.get("get_status")
+        tables = {
+            which: (status_fn(which) if status_fn else None)
+            for which in ("card_status", "custom_rx1", "custom_rx2")
+        }
+        card_table = tables["card_status"] or ()
+        rx1_table = tables["custom_rx1"] or ()
+        rx2_table = tables["custom_rx2"] or ()
+
+        diag = self._instant_manager.get("Diagnostic")
+        diag_slots = diag.slots_snapshot(slots) if diag is not None else {}
+        empty = (None, None, None)
+
+        results: dict[int, dict] = {}
+        for slot in slots:
+            diag_result, periodic, dtc_codes = diag_slots.get(slot, empty)
+            results[slot] = {
+                "card_status": card_table[slot] if slot < len(card_table) else None,
+                "custom_rx1": rx1_table[slot] if slot < len(rx1_table) else None,
+                "custom_rx2": rx2_table[slot] if slot < len(rx2_table) else None,
+                "diag_results": diag_result,
+                "diag_periodic_snapshot": periodic,
+                "dtc_codes": dtc_codes,
+            }
+        return results
+
     def _register_default_ops(self) -> None:
         # Rx status query
         rx = (
@@ -289,6 +536,17 @@ class ComponentsInstantiation(LoggerMixin):
         )
         if rx is not None:
             self.register_op("get_status", rx.get_status)
+        # 整组快照：AgingThread 每轮只调用一次
+        self.register_op("collect_group_snapshot", self.collect_group_snapshot)
+        aging = self._instant_manager.get("AgingStatus")
+        if aging is not None and aging.aging_status is not None:
+            # 基于状态矩阵的向量化查询
+            self.register_op("card_active_slots", aging.aging_status.active_slots)
+            self.register_op("card_status_codes", aging.aging_status.status_codes)
+            self.register_op("card_status_summary", aging.aging_status.summary)
+            # 变化集合：AgingThread 每轮只处理状态变化的 slot
+            self.register_op("card_drain_changed", aging.aging_status.drain_changed)
+            self.register_op("card_active_version", aging.aging_status.active_version)
 
         tx_cfg = self.project_cfg.get("TX", {})
         id_tx1 = tx_cfg.get("IdOfTxMsg1")
@@ -386,6 +644,11 @@ class ComponentsInstantiation(LoggerMixin):
                 return diag.periodic_snapshot()
 
             self.register_op("diag_periodic_snapshot", _diag_periodic_snapshot)
+            self.register_op("diag_sweep_metrics", diag.sweep_metrics)
+            self.register_op("diag_session_snapshot", diag.session_snapshot)
+            self.register_op("diag_unlock_metrics", diag.unlock_metrics)
+            self.register_op("diag_latency_histograms", diag.latency_histograms)
+            self.register_op("diag_invalidate_session", diag.invalidate_session)
 
             # 可选：后台自动诊断（直到成功一次即移除）
             # 运行频率默认用 PeriodicDiag.ReDiagInterval（没配就 1s）
@@ -418,9 +681,23 @@ class ComponentsInstantiation(LoggerMixin):
                     _job_diagnostic_once,
                 )
                 self._periodic_worker.add_job(
-                    "Diagnostic", diag_tick, _job_diagnostic_once
+                    "Diagnostic", diag_tick, _job_diagnostic_once, slow=True
                 )
 
+                # 会话保活：已解锁的 slot 空闲超过 TesterPresentInterval 时发送 3E 80
+                if diag.session_cache:
+                    keepalive_tick = max(0.5, diag.tester_present_interval_s / 2)
+                    self._periodic_job_registry["DiagKeepAlive"] = (
+                        keepalive_tick,
+                        diag.keepalive_tick,
+                    )
+                    self._periodic_worker.add_job(
+                        "DiagKeepAlive",
+                        keepalive_tick,
+                        diag.keepalive_tick,
+                        slow=True,
+                    )
+
         # Periodic worker management
         if self._periodic_worker is not None:
             self.register_op("add_job", self._periodic_worker.add_job)
@@ -436,6 +713,7 @@ class ComponentsInstantiation(LoggerMixin):
                 }
 
             self.register_op("periodic_list_jobs", _periodic_list_jobs)
+            self.register_op("periodic_metrics", self._periodic_worker.metrics)
 
             def _periodic_worker_stop(timeout: float = 2.0):
                 if self._periodic_worker is not None:
@@ -614,8 +892,9 @@ class ComponentsInstantiation(LoggerMixin):
                             tick_interval,
                             _job_diag,
                         )
+                        # 一轮扫描可能持续数十秒, 走线程池, 不阻塞报文切换
                         self._periodic_worker.add_job(
-                            "PeriodicDiag", tick_interval, _job_diag
+                            "PeriodicDiag", tick_interval, _job_diag, slow=True
                         )
             if "PeriodicReadDtc" in self.supported:
                 if diag is None:
@@ -673,7 +952,7 @@ class ComponentsInstantiation(LoggerMixin):
                         _job_dtc,
                     )
                     self._periodic_worker.add_job(
-                        "PeriodicReadDtc", max(1.0, interval), _job_dtc
+                        "PeriodicReadDtc", max(1.0, interval), _job_dtc, slow=True
                     )
         # Lifecycle
         self.register_op("shutdown", self.shutdown)
@@ -1,19 +1,541 @@
 import os
+import csv
 import sqlite3
 import threading
 import queue
 import json
 import time
+import hashlib
+import uuid
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Tuple, Any, Optional
+from typing import Dict, List, Tuple, Any, Optional
 from Logger import LoggerMixin
+from RunStorage import RunStorage
+from Tools import FUNCTION_CONFIG, LatencyHistogram
 
+# 存储布局: legacy 为单表 JSON 文本列; compact 为窄数值表 + 内容去重的 Payloads 表
+LAYOUT_LEGACY = "legacy"
+LAYOUT_COMPACT = "compact"
+
+# 对外(查询/导出/曲线)统一的列顺序, compact 布局通过同名视图还原
+LEGACY_COLUMNS = (
+    "Id",
+    "Slot",
+    "Timestamp",
+    "Status",
+    "Voltage",
+    "Current",
+    "Temperature",
+    "DtcCodes",
+    "AdditionalInfo_1",
+    "AdditionalInfo_2",
+    "DiagResults",
+)
+
+# 历史汇总导出 CSV 表头, 与 export_summary_rows 的输出列一一对应
+EXPORT_SUMMARY_HEADER = (
+    "批次表",
+    "穴位",
+    "状态",
+    "电压最小值",
+    "电压最小时间",
+    "电压最大值",
+    "电压最大时间",
+    "电压平均值",
+    "电流最小值",
+    "电流最小时间",
+    "电流最大值",
+    "电流最大时间",
+    "电流平均值",
+    "温度最小值",
+    "温度最小时间",
+    "温度最大值",
+    "温度最大时间",
+    "温度平均值",
+)
+_EXPORT_FIELDS = ("Voltage", "Current", "Temperature")
+
+# 曲线中不算报警的状态码 (正常 / 未接产品), 其余状态的点降采样时全部保留
+CHART_NORMAL_STATUS = (1, -4)
+
+# 写线程内 payload 文本 -> Id 缓存上限, 超出后清空重建
+_PAYLOAD_CACHE_LIMIT = 20_000
+
+# 提交失败时值得重试的 SQLite 主错误码: BUSY, LOCKED, IOERR, FULL, CANTOPEN, PROTOCOL
+_TRANSIENT_SQLITE_CODES = frozenset((5, 6, 10, 13, 14, 15))
+
+# 写队列中的批次结束标记: 写线程提交该批次之前的数据后释放连接, 再交给 RunStorage 压实
+_CLOSE_RUN = object()
+
+
+def _payload_hash(body: str) -> int:
+    """payload 文本的 64 位内容哈希 (有符号, 直接存 SQLite INTEGER)"""
+    digest = hashlib.blake2b(body.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def _numeric_ts(value: Any) -> Optional[float]:
+    """行中的时间戳只接受数值; None、空串 (RxParser 空白状态) 等一律视为缺失"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    return None
+
+
+class _DeltaFilter:
+    """按槽位记录上一次落库的行, 只放行有变化的行
+
+    以下任一条件成立即写入: 状态码变化、数值超出死区、DTC/解码信号/诊断文本变化、距上次落库超过心跳间隔。
+    比较基准是上次"写入"的行而非上次采样, 缓慢漂移累积超出死区后同样会落库。
+    """
+
+    # 行结构: (Slot, Timestamp, Status, Voltage, Current, Temperature, DtcCodes, Rx1, Rx2, Diag)
+    _NUMERIC_FIELDS = ((3, "Voltage"), (4, "Current"), (5, "Temperature"))
+
+    def __init__(self, deadband: Dict[str, float], heartbeat: float):
+        self._deadband = tuple(
+            (idx, float(deadband.get(name, 0.0))) for idx, name in self._NUMERIC_FIELDS
+        )
+        self._heartbeat = float(heartbeat)
+        self._last: Dict[int, Tuple[Any, ...]] = {}
+        self.seen = 0
+        self.written = 0
+
+    def filter(self, rows: List[Tuple[Any, ...]]) -> List[Tuple[Any, ...]]:
+        kept = []
+        for row in rows:
+            self.seen += 1
+            last = self._last.get(row[0])
+            if last is None or self._changed(last, row):
+                self._last[row[0]] = row
+                kept.append(row)
+        self.written += len(kept)
+        return kept
+
+    def _changed(self, last: Tuple[Any, ...], row: Tuple[Any, ...]) -> bool:
+        ts, last_ts = _numeric_ts(row[1]), _numeric_ts(last[1])
+        if ts is None or last_ts is None or ts - last_ts >= self._heartbeat:
+            return True
+        if row[2] != last[2]:
+            return True
+        for idx, band in self._deadband:
+            value, last_value = row[idx], last[idx]
+            if value is None or last_value is None:
+                if value is not last_value:
+                    return True
+                continue
+            try:
+                if abs(float(value) - float(last_value)) > band:
+                    return True
+            except (TypeError, ValueError):
+                if value != last_value:
+                    return True
+        return row[6:] != last[6:]
+
+
+# 汇总字段及其在行元组中的下标
+_ROLLUP_FIELDS = (("Voltage", 3), ("Current", 4), ("Temperature", 5))
+# 状态码 -5..4 映射到 StatusMask 的 bit0..bit9
+_STATUS_MIN, _STATUS_MAX = -5, 4
+
+
+def status_mask(statuses) -> int:
+    """把状态码集合转换为 StatusMask 位掩码"""
+    mask = 0
+    for st in statuses or ():
+        try:
+            st = int(st)
+        except (TypeError, ValueError):
+            continue
+        if _STATUS_MIN <= st <= _STATUS_MAX:
+            mask |= 1 << (st - _STATUS_MIN)
+    return mask
+
+
+_SLOT_ROLLUP_COLUMNS = ("Count", "FirstTs", "LastTs", "StatusMask") + tuple(
+    f"{name}{suffix}"
+    for name, _ in _ROLLUP_FIELDS
+    for suffix in ("Min", "MinTs", "Max", "MaxTs", "Sum", "N", "WSum", "WDur", "Last")
+)
+_BUCKET_COLUMNS = ("Count", "StatusMask") + tuple(
+    f"{name}{suffix}"
+    for name, _ in _ROLLUP_FIELDS
+    for suffix in ("Min", "Max", "Sum", "N")
+)
+
+
+def _rollup_column_decl(column: str) -> str:
+    integer = column in ("Count", "StatusMask") or column.endswith("N")
+    return f"{column} {'INTEGER' if integer else 'REAL'}"
+
+
+class _RollupState:
+    """单张批次表的增量汇总, 随写入事务一起落库
+
+    - SlotRollup: 每槽位的最值(含最小值最早/最大值最晚时间)、和/计数、按时长加权的和、状态位掩码
+    - RollupBuckets: 每槽位按 bucket_seconds 分桶的 min/max/sum/count, 供曲线缩小视图读取
+    汇总的是实际落库的行 (变化记录过滤之后), 与直接扫原始表的结果一致。
+    """
+
+    def __init__(self, table_name: str, bucket_seconds: float):
+        self.table_name = table_name
+        self.bucket_seconds = float(bucket_seconds)
+        self._slots: Dict[int, Dict[str, Any]] = {}
+        self._buckets: Dict[Tuple[int, int], Dict[str, Any]] = {}
+        self._dirty_slots: set = set()
+        self._dirty_buckets: set = set()
+        self._loaded = False
+
+    def _load(self, cursor: sqlite3.Cursor) -> None:
+        """从库中恢复已有汇总 (重启后回放日志等情况)"""
+        cursor.execute(
+            f"SELECT Slot, {', '.join(_SLOT_ROLLUP_COLUMNS)} FROM SlotRollup WHERE TableName=?",
+            (self.table_name,),
+        )
+        for row in cursor.fetchall():
+            self._slots[row[0]] = dict(zip(_SLOT_ROLLUP_COLUMNS, row[1:]))
+        self._loaded = True
+
+    def _bucket(self, cursor: sqlite3.Cursor, slot: int, bucket: int) -> Dict[str, Any]:
+        key = (slot, bucket)
+        acc = self._buckets.get(key)
+        if acc is None:
+            cursor.execute(
+                f"SELECT {', '.join(_BUCKET_COLUMNS)} FROM RollupBuckets "
+                "WHERE TableName=? AND Slot=? AND Bucket=?",
+                (self.table_name, slot, bucket),
+            )
+            row = cursor.fetchone()
+            acc = (
+                dict(zip(_BUCKET_COLUMNS, row))
+                if row
+                else dict.fromkeys(_BUCKET_COLUMNS, None)
+            )
+            if row is None:
+                acc.update(Count=0, StatusMask=0)
+            self._buckets[key] = acc
+        return acc
+
+    def add(self, cursor: sqlite3.Cursor, rows: List[Tuple[Any, ...]]) -> None:
+        if not self._loaded:
+            self._load(cursor)
+        for row in rows:
+            slot, ts, status = row[0], _numeric_ts(row[1]), row[2]
+            acc = self._slots.get(slot)
+            if acc is None:
+                acc = dict.fromkeys(_SLOT_ROLLUP_COLUMNS, None)
+                acc.update(Count=0, StatusMask=0)
+                self._slots[slot] = acc
+            prev_ts = _numeric_ts(acc["LastTs"])
+            dt = ts - prev_ts if ts is not None and prev_ts is not None else None
+            bit = status_mask((status,))
+            acc["Count"] += 1
+            acc["StatusMask"] |= bit
+            if ts is not None:
+                if acc["FirstTs"] is None:
+                    acc["FirstTs"] = ts
+                acc["LastTs"] = ts
+
+            bucket = None
+            if ts is not None:
+                bucket = int(ts // self.bucket_seconds * self.bucket_seconds)
+                b_acc = self._bucket(cursor, slot, bucket)
+                b_acc["Count"] += 1
+                b_acc["StatusMask"] |= bit
+                self._dirty_buckets.add((slot, bucket))
+
+            for name, idx in _ROLLUP_FIELDS:
+                # 加权和: 上一行的值保持到本行时间戳
+                last = acc[f"{name}Last"]
+                if dt is not None and dt > 0 and last is not None:
+                    acc[f"{name}WSum"] = (acc[f"{name}WSum"] or 0.0) + last * dt
+                    acc[f"{name}WDur"] = (acc[f"{name}WDur"] or 0.0) + dt
+                value = row[idx]
+                try:
+                    value = None if value is None else float(value)
+                except (TypeError, ValueError):
+                    value = None
+                acc[f"{name}Last"] = value
+                if value is None:
+                    continue
+                cur_min = acc[f"{name}Min"]
+                if cur_min is None or value < cur_min or (
+                    value == cur_min
+                    and ts is not None
+                    and (acc[f"{name}MinTs"] is None or ts < acc[f"{name}MinTs"])
+                ):
+                    acc[f"{name}Min"] = value
+                    acc[f"{name}MinTs"] = ts
+                cur_max = acc[f"{name}Max"]
+                if cur_max is None or value > cur_max or (
+                    value == cur_max
+                    and ts is not None
+                    and (acc[f"{name}MaxTs"] is None or ts > acc[f"{name}MaxTs"])
+                ):
+                    acc[f"{name}Max"] = value
+                    acc[f"{name}MaxTs"] = ts
+                acc[f"{name}Sum"] = (acc[f"{name}Sum"] or 0.0) + value
+                acc[f"{name}N"] = (acc[f"{name}N"] or 0) + 1
+
+                if bucket is not None:
+                    b_min = b_acc[f"{name}Min"]
+                    if b_min is None or value < b_min:
+                        b_acc[f"{name}Min"] = value
+                    b_max = b_acc[f"{name}Max"]
+                    if b_max is None or value > b_max:
+                        b_acc[f"{name}Max"] = value
+                    b_acc[f"{name}Sum"] = (b_acc[f"{name}Sum"] or 0.0) + value
+                    b_acc[f"{name}N"] = (b_acc[f"{name}N"] or 0) + 1
+            self._dirty_slots.add(slot)
+
+    def flush(self, cursor: sqlite3.Cursor) -> None:
+        """把有变化的槽位/分桶写回库 (与数据行同一事务)"""
+        if self._dirty_slots:
+            cursor.executemany(
+                f"INSERT OR REPLACE INTO SlotRollup (TableName, Slot, {', '.join(_SLOT_ROLLUP_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * (len(_SLOT_ROLLUP_COLUMNS) + 2))})",
+                [
+                    (self.table_name, slot, *(self._slots[slot][c] for c in _SLOT_ROLLUP_COLUMNS))
+                    for slot in self._dirty_slots
+                ],
+            )
+            self._dirty_slots.clear()
+        if self._dirty_buckets:
+            cursor.executemany(
+                f"INSERT OR REPLACE INTO RollupBuckets (TableName, Slot, Bucket, {', '.join(_BUCKET_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * (len(_BUCKET_COLUMNS) + 3))})",
+                [
+                    (self.table_name, slot, bucket, *(self._buckets[(slot, bucket)][c] for c in _BUCKET_COLUMNS))
+                    for slot, bucket in self._dirty_buckets
+                ],
+            )
+            self._dirty_buckets.clear()
+            # 内存中只保留每槽位最新的分桶, 旧分桶已落库
+            latest: Dict[int, int] = {}
+            for slot, bucket in self._buckets:
+                if bucket > latest.get(slot, bucket - 1):
+                    latest[slot] = bucket
+            self._buckets = {
+                key: acc for key, acc in self._buckets.items() if latest[key[0]] == key[1]
+            }
 
-class DataBaseWorker(LoggerMixin):
-    """用于管理老化数据的数据库工作类"""
+
+class ConnectionPool:
+    """主库连接池: 连接创建时设置一次 WAL/synchronous, 归还后复用
+
+    sqlite3 按连接缓存已编译的语句, 复用连接即复用预编译语句; 池满时 connection() 阻塞等待归还。
+    """
+
+    def __init__(self, db_path: str, size: int = 4, cached_statements: int = 128):
+        self.db_path = db_path
+        self._size = max(1, int(size))
+        self._cached_statements = cached_statements
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._closed = False
+
+    def _create(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=10,
+            check_same_thread=False,
+            cached_statements=self._cached_statements,
+        )
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        except sqlite3.Error:
+            pass
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """借出一个连接; 块内异常时回滚未提交的修改后再归还"""
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self._created < self._size
+                if create:
+                    self._created += 1
+            conn = self._create() if create else self._idle.get()
+        try:
+            yield conn
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            if self._closed:
+                conn.close()
+            else:
+                self._idle.put(conn)
+
+    def close_all(self) -> None:
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class _WriterConnections:
+    """写线程持有的连接: 未分文件时只有主库一个, 分文件时每个批次文件一个 (各自的 payload 缓存)"""
+
+    def __init__(self, worker: "DataBaseWorker"):
+        self._worker = worker
+        self._paths: Dict[str, Optional[str]] = {}
+        self._conns: Dict[str, Tuple[sqlite3.Connection, sqlite3.Cursor, Dict[str, int]]] = {}
+
+    def get(self, table_name: str):
+        """返回 (conn, cursor, payload_cache); 批次文件已归档或过期时返回 None"""
+        if table_name not in self._paths:
+            self._paths[table_name] = self._worker.db_path_for(table_name, writable=True)
+        path = self._paths[table_name]
+        if path is None:
+            return None
+        entry = self._conns.get(path)
+        if entry is None:
+            conn = self._worker._open_connection(path)
+            entry = (conn, conn.cursor(), {})
+            self._conns[path] = entry
+        return entry
+
+    def cursor(self, table_name: str) -> Optional[sqlite3.Cursor]:
+        entry = self.get(table_name)
+        return None if entry is None else entry[1]
+
+    def release(self, table_name: str) -> None:
+        path = self._paths.pop(table_name, None)
+        if path is None or path == self._worker.db_path:
+            return
+        if any(p == path for p in self._paths.values()):
+            return  # 月分片中仍有其他批次在写
+        entry = self._conns.pop(path, None)
+        if entry is not None:
+            entry[0].close()
+
+    def close_all(self) -> None:
+        for conn, _, _ in self._conns.values():
+            try:
+                conn.close()
+            except Exception:
+                pass
+        self._conns.clear()
+        self._paths.clear()
+
+
+class LiveFeed:
+    """内存发布/订阅: 写入快照入队时按 (表, 槽位) 直接推送给订阅者, 打开的曲线窗口不再轮询数据库
+
+    回调在发布者线程 (AgingThread) 中执行, 收到的是曲线行 (Id=None, Slot, Timestamp, Status,
+    Voltage, Current, Temperature, DtcCodes) 列表; 回调应尽快返回 (如发 Qt 信号转到界面线程)。
+    推送的是未经变化过滤的原始行, 数据库仍只负责打开窗口时的回填。
+    """
 
     def __init__(self):
-        self.db_path = "./aging_data.db"
+        self._lock = threading.Lock()
+        self._subs: Dict[Tuple[str, int], Dict[int, Any]] = {}
+        self._tables: Dict[str, int] = {}
+        self._next_token = 1
+        self.published = 0
+
+    def subscribe(self, table_name: str, slot: int, callback) -> int:
+        """订阅某表某槽位的新数据, 返回用于退订的 token"""
+        key = (table_name, int(slot))
+        with self._lock:
+            token = self._next_token
+            self._next_token += 1
+            self._subs.setdefault(key, {})[token] = callback
+            self._tables[table_name] = self._tables.get(table_name, 0) + 1
+        return token
+
+    def unsubscribe(self, token: int) -> None:
+        with self._lock:
+            for key, callbacks in list(self._subs.items()):
+                if callbacks.pop(token, None) is None:
+                    continue
+                if not callbacks:
+                    del self._subs[key]
+                table_name = key[0]
+                self._tables[table_name] -= 1
+                if self._tables[table_name] <= 0:
+                    del self._tables[table_name]
+                return
+
+    def has_subscribers(self, table_name: str) -> bool:
+        # 无锁读取: 没有订阅者时发布端只付出一次字典查找
+        return table_name in self._tables
+
+    def publish(self, table_name: str, data: Any, row_builder) -> None:
+        """data 为快照 dict 或单行 10 字段元组; row_builder(slot, status) 只对被订阅的槽位调用"""
+        with self._lock:
+            targets = {
+                slot: list(callbacks.values())
+                for (table, slot), callbacks in self._subs.items()
+                if table == table_name
+            }
+        if not targets:
+            return
+        if isinstance(data, dict):
+            items = []
+            for slot, status in data.items():
+                try:
+                    slot_no = int(slot)
+                except (TypeError, ValueError):
+                    continue
+                if slot_no in targets:
+                    items.append((slot_no, row_builder(slot_no, status or {})))
+        elif isinstance(data, (tuple, list)) and len(data) == 10:
+            items = [(int(data[0]), tuple(data))] if int(data[0]) in targets else []
+        else:
+            return
+        for slot_no, row in items:
+            chart_row = [(None, *row[:7])]
+            for callback in targets[slot_no]:
+                try:
+                    callback(chart_row)
+                except Exception:
+                    pass
+            self.published += 1
+
+
+class DataBaseWorker(LoggerMixin):
+    """用于管理老化数据的数据库工作类
+
+    FuncConfig.json 中 DataBase 下的可选功能默认关闭, 行为与旧版本一致, 需要时逐项开启
+    (只影响之后新建的批次表, 已有表按创建时的设置读写):
+    - StorageMode: "legacy" 为单表 JSON 文本列; 改为 "compact" 后批次表为同名视图,
+      数据写入 <表名>_rows 窄表, JSON 文本按内容去重存入 Payloads
+    - DeltaRecording.Enable: 开启后每槽位只记录变化行 (状态码变化、数值超出 Deadband、
+      文本变化或距上次落库超过 Heartbeat 秒), 曲线按阶梯还原, 平均值按时间加权
+    - Rollup.Enable: 开启后写入时维护 SlotRollup/RollupBuckets 增量汇总, 汇总导出和
+      曲线缩小视图直接读汇总; 未开启的表仍扫描原始行
+    - Sharding.Enable: 开启后主库只保留 Summary/RunShards 目录, 每个批次 (Mode=month 时
+      每月) 单独一个文件存放在 ShardDir (默认 runs/), 关闭后按 Compression 归档;
+      "zstd" 需要另装 zstandard, 默认 "gzip" 无额外依赖
+    """
+
+    def __init__(self, db_path: Optional[str] = None, storage_mode: Optional[str] = None):
+        db_cfg = FUNCTION_CONFIG.get("DataBase", {})
+        self.db_path = db_path or db_cfg.get("Path", "./aging_data.db")
+        self.storage_mode = storage_mode or db_cfg.get("StorageMode", LAYOUT_LEGACY)
+        if self.storage_mode not in (LAYOUT_LEGACY, LAYOUT_COMPACT):
+            raise ValueError(f"Unsupported storage mode: {self.storage_mode}")
+        self.delta_config: dict = dict(db_cfg.get("DeltaRecording", {}))
+        self.rollup_config: dict = dict(db_cfg.get("Rollup", {}))
+        # 分文件存储: 主库只保留 Summary/RunShards 目录, 每个批次 (或每月) 一个数据文件
+        shard_cfg = db_cfg.get("Sharding", {})
+        self.storage: Optional[RunStorage] = (
+            RunStorage(self.db_path, shard_cfg) if shard_cfg.get("Enable", False) else None
+        )
+        # 主线程 (建表/查询) 使用的批次文件连接, 批次结束时释放
+        self._shard_conns: Dict[str, sqlite3.Connection] = {}
+        self._deferred_closes: List[str] = []
+        self._maintenance_after_replay = False
+        # Summary 等主库读写走连接池, 不再每次新建连接
+        self.pool = ConnectionPool(self.db_path, int(db_cfg.get("PoolSize", 4)))
         self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
         self.cursor = self.connection.cursor()
         try:
@@ -24,8 +546,47 @@ class DataBaseWorker(LoggerMixin):
         self._queue: "queue.Queue[tuple[str, Tuple[Any, ...]]]" = queue.Queue()
         self._stop_event = threading.Event()
         self._worker: Optional[threading.Thread] = None
-        self._max_queue_size = 500
+        writer_cfg = db_cfg.get("Writer", {})
+        self._max_queue_size = int(writer_cfg.get("MaxQueue", 500))
+        # 组提交: 累计行数达到 CommitRows 或距首条未提交数据超过 CommitInterval 秒即提交
+        self._commit_rows = int(writer_cfg.get("CommitRows", 2000))
+        self._commit_interval = float(writer_cfg.get("CommitInterval", 1.0))
         self._last_queue_warn = 0.0
+        # 队列积压时快照追加写入本地日志, 写线程追上后回放; 上次未回放完的日志启动后继续回放
+        self.spill_path = writer_cfg.get("SpillPath") or (
+            os.path.splitext(self.db_path)[0] + ".spill.jsonl"
+        )
+        self._spill_lock = threading.Lock()
+        self._spilling = self._has_spill_backlog()
+        # 确定性错误 (非 busy/locked/IO) 的批次隔离到死信文件, 不再转存回放
+        self.dead_letter_path = writer_cfg.get("DeadLetterPath") or (
+            os.path.splitext(self.db_path)[0] + ".dead.jsonl"
+        )
+        # 提交失败后的回放退避, 避免磁盘持续异常时反复 回放->失败->转存
+        self._retry_at = 0.0
+        self._retry_backoff = 1.0
+        self.commit_latency = LatencyHistogram()
+        self._metrics_lock = threading.Lock()
+        self._metrics = {
+            "enqueued": 0,
+            "max_depth": 0,
+            "commits": 0,
+            "committed_rows": 0,
+            "spilled": 0,
+            "replayed": 0,
+            "dropped": 0,
+            "failed_rows": 0,
+            "quarantined": 0,
+        }
+        self._layouts: Dict[str, str] = {}
+        # 表名 -> 变化记录过滤器 (None 表示该表全量记录)
+        self._delta_filters: Dict[str, Optional[_DeltaFilter]] = {}
+        # 表名 -> 增量汇总 (None 表示该表创建时未开启汇总)
+        self._rollups: Dict[str, Optional[_RollupState]] = {}
+        # 实时曲线推送, 替代各详情窗口对数据库的轮询
+        self.live_feed = LiveFeed()
+        self._ensure_meta_tables(self.connection)
+        self.ensure_summary_table(self.connection)
 
     def check_database_exists(self) -> bool:
         return os.path.isfile(self.db_path)
@@ -41,10 +602,16 @@ class DataBaseWorker(LoggerMixin):
     def initialization(self):
         if not self.check_database_exists():
             self.makesure_file_exist()
+        if self.storage is not None:
+            if self._spilling:
+                # 遗留日志中可能有上次批次的数据, 回放完之前不能压实归档这些文件
+                self._maintenance_after_replay = True
+            else:
+                self.storage.start_maintenance(startup=True)
         self.log.info("Database initialized.")
 
-    def _open_connection(self) -> sqlite3.Connection:
-        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+    def _open_connection(self, path: Optional[str] = None) -> sqlite3.Connection:
+        conn = sqlite3.connect(path or self.db_path, check_same_thread=False)
         try:
             conn.execute("PRAGMA journal_mode=WAL")
             conn.execute("PRAGMA synchronous=NORMAL")
@@ -52,8 +619,307 @@ class DataBaseWorker(LoggerMixin):
             pass
         return conn
 
+    def db_path_for(self, table_name: str, writable: bool = False) -> Optional[str]:
+        """批次表所在的数据库文件; 未开启分文件或旧表为主库, 已过保留期返回 None
+
+        已归档的批次在此时解压到缓存目录, 调用方应在后台线程中调用。
+        """
+        if self.storage is None:
+            return self.db_path
+        return self.storage.path_for(table_name, writable=writable)
+
+    def connection_for(self, table_name: str) -> Optional[sqlite3.Connection]:
+        """主线程访问批次表用的连接 (与 self.connection 一样可跨线程共享)"""
+        path = self.db_path_for(table_name)
+        if path is None:
+            return None
+        if path == self.db_path:
+            return self.connection
+        conn = self._shard_conns.get(path)
+        if conn is None:
+            conn = self._open_connection(path)
+            self._shard_conns[path] = conn
+        return conn
+
+    def close_run(self, table_name: str) -> None:
+        """批次结束: 写线程提交完该批次已入队的数据后释放文件, 由 RunStorage 在后台压实/归档"""
+        if self.storage is None:
+            return
+        path = self.db_path_for(table_name)
+        conn = self._shard_conns.pop(path, None) if path else None
+        if conn is not None:
+            conn.close()
+        if self._worker is not None and self._worker.is_alive():
+            # 控制消息不受队列上限限制, 也不进转存日志
+            self._queue.put((table_name, _CLOSE_RUN))
+        else:
+            self.storage.close_run(table_name)
+
+    @staticmethod
+    def ensure_summary_table(conn: sqlite3.Connection) -> None:
+        """批次汇总表 (历史页目录), 启动时建一次"""
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS Summary (
+                TableName TEXT PRIMARY KEY,
+                DatePrefix TEXT,
+                GroupIndex INTEGER,
+                Project TEXT,
+                Operator TEXT,
+                SetHours REAL,
+                StartTime REAL,
+                EndTime REAL,
+                AgingSeconds REAL,
+                Total INTEGER,
+                Good INTEGER,
+                Bad INTEGER,
+                GoodRate REAL
+            )
+            """
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_Summary_DatePrefix ON Summary (DatePrefix)"
+        )
+        conn.commit()
+
+    def summary_date_prefixes(self) -> List[str]:
+        with self.pool.connection() as conn:
+            rows = conn.execute(
+                "SELECT DISTINCT DatePrefix FROM Summary WHERE DatePrefix IS NOT NULL ORDER BY DatePrefix DESC"
+            ).fetchall()
+        return [row[0] for row in rows if row and row[0]]
+
+    def query_summary(self, date_prefix: Optional[str] = None) -> List[Tuple[Any, ...]]:
+        """返回 (TableName, GroupIndex, Project, Operator, SetHours, AgingSeconds, Total, Good, GoodRate)"""
+        sql = """
+            SELECT TableName, GroupIndex, Project, Operator, SetHours, AgingSeconds, Total, Good, GoodRate
+            FROM Summary {where} ORDER BY TableName DESC
+        """
+        with self.pool.connection() as conn:
+            if date_prefix:
+                # 前缀匹配写成范围条件, 可以走 DatePrefix 索引 (LIKE 默认不区分大小写, 用不上索引)
+                return conn.execute(
+                    sql.format(where="WHERE DatePrefix >= ? AND DatePrefix < ?"),
+                    (date_prefix, date_prefix + "~"),
+                ).fetchall()
+            return conn.execute(sql.format(where="")).fetchall()
+
+    def write_summary_start(
+        self,
+        table_name: str,
+        group_index: int,
+        project: str,
+        operator: str,
+        set_hours: Optional[float],
+        start_time: float,
+    ) -> None:
+        with self.pool.connection() as conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO Summary
+                (TableName, DatePrefix, GroupIndex, Project, Operator, SetHours, StartTime,
+                 EndTime, AgingSeconds, Total, Good, Bad, GoodRate)
+                VALUES (?, ?, ?, ?, ?, ?, ?, NULL, NULL, NULL, NULL, NULL, NULL)
+                """,
+                (
+                    table_name,
+                    table_name[:10],
+                    int(group_index),
+                    project or "--",
+                    operator or "--",
+                    set_hours,
+                    float(start_time),
+                ),
+            )
+            conn.commit()
+
+    def write_summary_end(
+        self,
+        table_name: str,
+        end_time: float,
+        aging_seconds: Optional[float],
+        total: int,
+        good: int,
+        bad: int,
+        good_rate: float,
+    ) -> None:
+        with self.pool.connection() as conn:
+            conn.execute(
+                """
+                UPDATE Summary
+                SET EndTime=?, AgingSeconds=?, Total=?, Good=?, Bad=?, GoodRate=?
+                WHERE TableName=?
+                """,
+                (
+                    float(end_time),
+                    aging_seconds,
+                    int(total),
+                    int(good),
+                    int(bad),
+                    float(good_rate),
+                    table_name,
+                ),
+            )
+            conn.commit()
+
+    @staticmethod
+    def _ensure_meta_tables(conn: sqlite3.Connection) -> None:
+        """TableMeta 记录每张批次表的存储布局; Payloads 保存去重后的 JSON 文本;
+        SlotRollup/RollupBuckets 保存写入时维护的增量汇总"""
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS TableMeta (
+                TableName TEXT PRIMARY KEY,
+                Layout TEXT NOT NULL,
+                CreatedAt REAL,
+                DeltaConfig TEXT,
+                RollupBucket REAL
+            )
+            """
+        )
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(TableMeta)")}
+        for column, decl in (("DeltaConfig", "TEXT"), ("RollupBucket", "REAL")):
+            if column not in columns:
+                conn.execute(f"ALTER TABLE TableMeta ADD COLUMN {column} {decl}")
+        conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS SlotRollup (
+                TableName TEXT NOT NULL,
+                Slot INTEGER NOT NULL,
+                {', '.join(_rollup_column_decl(c) for c in _SLOT_ROLLUP_COLUMNS)},
+                PRIMARY KEY (TableName, Slot)
+            ) WITHOUT ROWID
+            """
+        )
+        conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS RollupBuckets (
+                TableName TEXT NOT NULL,
+                Slot INTEGER NOT NULL,
+                Bucket INTEGER NOT NULL,
+                {', '.join(_rollup_column_decl(c) for c in _BUCKET_COLUMNS)},
+                PRIMARY KEY (TableName, Slot, Bucket)
+            ) WITHOUT ROWID
+            """
+        )
+        DataBaseWorker._ensure_progress_table(conn)
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS Payloads (
+                Id INTEGER PRIMARY KEY,
+                Hash INTEGER NOT NULL UNIQUE,
+                Body TEXT NOT NULL
+            )
+            """
+        )
+        conn.commit()
+
+    @staticmethod
+    def _ensure_progress_table(conn_or_cursor) -> None:
+        """SpillProgress 记录回放日志在本库已提交到的字节偏移, 与数据行同一事务更新"""
+        conn_or_cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS SpillProgress (
+                Id INTEGER PRIMARY KEY CHECK (Id = 1),
+                ReplayId TEXT NOT NULL,
+                Offset INTEGER NOT NULL
+            )
+            """
+        )
+
+    def table_layout(
+        self, table_name: str, cursor: Optional[sqlite3.Cursor] = None
+    ) -> str:
+        """查询批次表布局, 没有 TableMeta 记录的旧表按 legacy 处理"""
+        layout = self._layouts.get(table_name)
+        if layout is not None:
+            return layout
+        cur = cursor or self._meta_cursor(table_name)
+        cur.execute("SELECT Layout FROM TableMeta WHERE TableName=?", (table_name,))
+        row = cur.fetchone()
+        layout = row[0] if row else LAYOUT_LEGACY
+        self._layouts[table_name] = layout
+        return layout
+
+    def table_delta_config(
+        self, table_name: str, cursor: Optional[sqlite3.Cursor] = None
+    ) -> Optional[dict]:
+        """批次表创建时记录的变化记录参数, 全量记录的表返回 None"""
+        try:
+            cur = cursor or self._meta_cursor(table_name)
+            cur.execute(
+                "SELECT DeltaConfig FROM TableMeta WHERE TableName=?", (table_name,)
+            )
+            row = cur.fetchone()
+        except sqlite3.Error:
+            return None
+        if not row or not row[0]:
+            return None
+        return json.loads(row[0])
+
+    def _meta_cursor(self, table_name: str) -> sqlite3.Cursor:
+        conn = self.connection_for(table_name)
+        if conn is None:
+            raise sqlite3.OperationalError(f"data of {table_name} has expired")
+        return conn.cursor()
+
+    def is_delta_table(self, table_name: str) -> bool:
+        """该表是否只记录变化行 (曲线需按阶梯还原, 平均值需按时间加权)"""
+        return self.table_delta_config(table_name) is not None
+
+    def _delta_filter(
+        self, table_name: str, cursor: sqlite3.Cursor
+    ) -> Optional[_DeltaFilter]:
+        if table_name not in self._delta_filters:
+            cfg = self.table_delta_config(table_name, cursor)
+            self._delta_filters[table_name] = (
+                _DeltaFilter(cfg.get("Deadband", {}), cfg.get("Heartbeat", 60.0))
+                if cfg
+                else None
+            )
+        return self._delta_filters[table_name]
+
+    def delta_stats(self) -> Dict[str, dict]:
+        """各变化记录表的采样行数与实际落库行数"""
+        return {
+            name: {"seen": f.seen, "written": f.written}
+            for name, f in self._delta_filters.items()
+            if f is not None
+        }
+
+    @staticmethod
+    def table_rollup_bucket(
+        conn_or_cursor, table_name: str
+    ) -> Optional[float]:
+        """批次表的汇总分桶秒数, 未开启汇总的表返回 None"""
+        try:
+            row = conn_or_cursor.execute(
+                "SELECT RollupBucket FROM TableMeta WHERE TableName=?", (table_name,)
+            ).fetchone()
+        except sqlite3.Error:
+            return None
+        return row[0] if row and row[0] else None
+
+    def _rollup(
+        self, table_name: str, cursor: sqlite3.Cursor
+    ) -> Optional[_RollupState]:
+        if table_name not in self._rollups:
+            bucket = self.table_rollup_bucket(cursor, table_name)
+            self._rollups[table_name] = (
+                _RollupState(table_name, bucket) if bucket else None
+            )
+        return self._rollups[table_name]
+
+    @staticmethod
+    def data_table_name(table_name: str, layout: str) -> str:
+        """实际写入的物理表名: compact 布局下批次表名是视图, 数据在 <表名>_rows"""
+        return f"{table_name}_rows" if layout == LAYOUT_COMPACT else table_name
+
     def create_new_table(self):
         """生成以日期和序号命名的新表,表名结构:yyyy_mm_dd_nn
+
+        compact 布局下 yyyy_mm_dd_nn 为视图, 列与 legacy 完全一致, 读取方无需区分;
+        数据写入 yyyy_mm_dd_nn_rows 窄表, 四个 JSON 列改为 Payloads 表的引用。
         表数据结构:
         - Id: INTEGER (自增序号)
         - Slot: INTEGER
@@ -69,14 +935,16 @@ class DataBaseWorker(LoggerMixin):
         """
         today_prefix = datetime.now().strftime("%Y_%m_%d")
         self.cursor.execute(
-            "SELECT name FROM sqlite_master WHERE type='table' AND name LIKE ?",
+            "SELECT name FROM sqlite_master WHERE type IN ('table', 'view') AND name LIKE ?",
             (f"{today_prefix}_%",),
         )
         existing = [row[0] for row in self.cursor.fetchall()]
+        if self.storage is not None:
+            existing += self.storage.table_names_like(f"{today_prefix}_")
         indices = []
         for name in existing:
             parts = name.split("_")
-            if len(parts) >= 4:
+            if len(parts) == 4:
                 try:
                     indices.append(int(parts[-1]))
                 except Exception:
@@ -84,7 +952,50 @@ class DataBaseWorker(LoggerMixin):
         next_idx = max(indices) + 1 if indices else 1
         table_name = f"{today_prefix}_{next_idx:02d}"
 
-        self.cursor.execute(
+        conn = self.connection
+        if self.storage is not None:
+            # 批次文件自带元数据表, 归档后可单独打开
+            self.storage.register(table_name)
+            conn = self.connection_for(table_name)
+            self._ensure_meta_tables(conn)
+        cursor = conn.cursor()
+        if self.storage_mode == LAYOUT_COMPACT:
+            self._create_compact_table(table_name, cursor)
+        else:
+            self._create_legacy_table(table_name, cursor)
+        delta_cfg = None
+        if self.delta_config.get("Enable", False):
+            delta_cfg = json.dumps(
+                {
+                    "Deadband": self.delta_config.get("Deadband", {}),
+                    "Heartbeat": float(self.delta_config.get("Heartbeat", 60.0)),
+                }
+            )
+        rollup_bucket = None
+        if self.rollup_config.get("Enable", False):
+            rollup_bucket = float(self.rollup_config.get("BucketSeconds", 60.0))
+        else:
+            # 开启汇总的表导出读 SlotRollup, 用不到导出索引
+            self.ensure_export_indexes(
+                cursor, self.data_table_name(table_name, self.storage_mode)
+            )
+        cursor.execute(
+            "INSERT OR REPLACE INTO TableMeta (TableName, Layout, CreatedAt, DeltaConfig, RollupBucket) VALUES (?, ?, ?, ?, ?)",
+            (table_name, self.storage_mode, time.time(), delta_cfg, rollup_bucket),
+        )
+        self._layouts[table_name] = self.storage_mode
+        conn.commit()
+        self.log.info(
+            f"Created table: {table_name} ({self.storage_mode}, delta={delta_cfg is not None}, "
+            f"file={os.path.basename(self.db_path_for(table_name) or '')})"
+        )
+        return table_name
+
+    def _create_legacy_table(
+        self, table_name: str, cursor: Optional[sqlite3.Cursor] = None
+    ) -> None:
+        cursor = cursor or self.cursor
+        cursor.execute(
             f"""
             CREATE TABLE IF NOT EXISTS "{table_name}" (
                 Id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -102,14 +1013,58 @@ class DataBaseWorker(LoggerMixin):
             """
         )
         try:
-            self.cursor.execute(
+            cursor.execute(
                 f'CREATE INDEX IF NOT EXISTS idx_{table_name}_slot_id ON "{table_name}" (Slot, Id)'
             )
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS idx_{table_name}_slot_ts ON "{table_name}" (Slot, Timestamp)'
+            )
         except Exception:
             pass
-        self.connection.commit()
-        self.log.info(f"Created table: {table_name}")
-        return table_name
+
+    def _create_compact_table(
+        self, table_name: str, cursor: Optional[sqlite3.Cursor] = None
+    ) -> None:
+        cursor = cursor or self.cursor
+        data_table = self.data_table_name(table_name, LAYOUT_COMPACT)
+        cursor.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS "{data_table}" (
+                Id INTEGER PRIMARY KEY,
+                Slot INTEGER NOT NULL,
+                Timestamp REAL,
+                Status INTEGER,
+                Voltage REAL,
+                Current REAL,
+                Temperature REAL,
+                DtcRef INTEGER,
+                Rx1Ref INTEGER,
+                Rx2Ref INTEGER,
+                DiagRef INTEGER
+            )
+            """
+        )
+        cursor.execute(
+            f'CREATE INDEX IF NOT EXISTS "idx_{data_table}_slot_id" ON "{data_table}" (Slot, Id)'
+        )
+        cursor.execute(
+            f'CREATE INDEX IF NOT EXISTS "idx_{data_table}_slot_ts" ON "{data_table}" (Slot, Timestamp)'
+        )
+        cursor.execute(
+            f"""
+            CREATE VIEW IF NOT EXISTS "{table_name}" AS
+            SELECT r.Id, r.Slot, r.Timestamp, r.Status, r.Voltage, r.Current, r.Temperature,
+                   p1.Body AS DtcCodes,
+                   p2.Body AS AdditionalInfo_1,
+                   p3.Body AS AdditionalInfo_2,
+                   p4.Body AS DiagResults
+            FROM "{data_table}" AS r
+            LEFT JOIN Payloads AS p1 ON p1.Id = r.DtcRef
+            LEFT JOIN Payloads AS p2 ON p2.Id = r.Rx1Ref
+            LEFT JOIN Payloads AS p3 ON p3.Id = r.Rx2Ref
+            LEFT JOIN Payloads AS p4 ON p4.Id = r.DiagRef
+            """
+        )
 
     def query_data(
         self, table_name: str, conditions: str = ""
@@ -119,8 +1074,10 @@ class DataBaseWorker(LoggerMixin):
         sql = f'SELECT * FROM "{table_name}"'
         if conditions:
             sql += f" WHERE {conditions}"
-        self.cursor.execute(sql)
-        return self.cursor.fetchall()
+        conn = self.connection_for(table_name)
+        if conn is None:
+            return []
+        return conn.execute(sql).fetchall()
 
     def querying_thread(self): ...
     def start_querying(self): ...
@@ -130,107 +1087,479 @@ class DataBaseWorker(LoggerMixin):
         if not table_name:
             raise ValueError("table_name is required")
 
-        if isinstance(data, dict):
-            rows = self.build_rows_from_snapshot(data)
-            if rows:
-                self._insert_rows(table_name, rows)
-                self.connection.commit()
-            return
-
-        if not isinstance(data, (tuple, list)) or len(data) != 10:
-            raise ValueError("data must be a 10-field tuple or a snapshot dict")
-        self._insert_row(table_name, tuple(data))
-        self.connection.commit()
+        conn = self.connection_for(table_name)
+        if conn is None:
+            raise ValueError(f"data of {table_name} has expired")
+        rows = self._rows_from_data(table_name, data)
+        if rows:
+            self._insert_rows(table_name, rows, conn.cursor())
+            conn.commit()
 
     def _insert_row(
         self,
         table_name: str,
         row: Tuple[Any, ...],
         cursor: Optional[sqlite3.Cursor] = None,
+        payload_cache: Optional[Dict[str, int]] = None,
     ):
-        cur = cursor or self.cursor
-        cur.execute(
-            f"""
-            INSERT INTO "{table_name}" (
-                Slot, Timestamp, Status, Voltage, Current, Temperature,
-                DtcCodes, AdditionalInfo_1, AdditionalInfo_2, DiagResults
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            row,
-        )
+        self._insert_rows(table_name, [row], cursor, payload_cache)
 
     def _insert_rows(
         self,
         table_name: str,
         rows: List[Tuple[Any, ...]],
         cursor: Optional[sqlite3.Cursor] = None,
+        payload_cache: Optional[Dict[str, int]] = None,
+        apply_delta: bool = True,
     ):
         cur = cursor or self.cursor
-        cur.executemany(
+        if apply_delta:
+            rows = self._filter_rows(table_name, rows, cur)
+            if not rows:
+                return
+        if self.table_layout(table_name, cur) == LAYOUT_COMPACT:
+            self._insert_compact_rows(table_name, rows, cur, payload_cache)
+        else:
+            cur.executemany(
+                f"""
+                INSERT INTO "{table_name}" (
+                    Slot, Timestamp, Status, Voltage, Current, Temperature,
+                    DtcCodes, AdditionalInfo_1, AdditionalInfo_2, DiagResults
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                rows,
+            )
+        rollup = self._rollup(table_name, cur)
+        if rollup is not None:
+            rollup.add(cur, rows)
+            rollup.flush(cur)
+
+    def _filter_rows(
+        self, table_name: str, rows: List[Tuple[Any, ...]], cursor: sqlite3.Cursor
+    ) -> List[Tuple[Any, ...]]:
+        delta = self._delta_filter(table_name, cursor)
+        return rows if delta is None else delta.filter(rows)
+
+    def _insert_compact_rows(
+        self,
+        table_name: str,
+        rows: List[Tuple[Any, ...]],
+        cursor: sqlite3.Cursor,
+        payload_cache: Optional[Dict[str, int]] = None,
+    ) -> None:
+        """compact 布局写入: 数值列原样写窄表, 后四个 JSON 文本列换成 Payloads 引用"""
+        cache = payload_cache if payload_cache is not None else {}
+        compact_rows = []
+        for row in rows:
+            refs = [
+                None if body is None else self._intern_payload(cursor, body, cache)
+                for body in row[6:10]
+            ]
+            compact_rows.append((*row[:6], *refs))
+        data_table = self.data_table_name(table_name, LAYOUT_COMPACT)
+        cursor.executemany(
             f"""
-            INSERT INTO "{table_name}" (
+            INSERT INTO "{data_table}" (
                 Slot, Timestamp, Status, Voltage, Current, Temperature,
-                DtcCodes, AdditionalInfo_1, AdditionalInfo_2, DiagResults
+                DtcRef, Rx1Ref, Rx2Ref, DiagRef
             ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """,
-            rows,
+            compact_rows,
         )
 
+    @staticmethod
+    def _intern_payload(
+        cursor: sqlite3.Cursor, body: str, cache: Dict[str, int]
+    ) -> int:
+        """按内容哈希去重 payload 文本, 返回 Payloads.Id; cache 以文本为键, 命中时不再计算哈希"""
+        payload_id = cache.get(body)
+        if payload_id is not None:
+            return payload_id
+        digest = _payload_hash(body)
+        cursor.execute("SELECT Id FROM Payloads WHERE Hash=?", (digest,))
+        row = cursor.fetchone()
+        if row:
+            payload_id = row[0]
+        else:
+            cursor.execute(
+                "INSERT INTO Payloads (Hash, Body) VALUES (?, ?)", (digest, body)
+            )
+            payload_id = cursor.lastrowid
+        if len(cache) >= _PAYLOAD_CACHE_LIMIT:
+            cache.clear()
+        cache[body] = payload_id
+        return payload_id
+
     def _insert_data_with_cursor(
-        self, table_name: str, data: Any, cursor: sqlite3.Cursor
+        self,
+        table_name: str,
+        data: Any,
+        cursor: sqlite3.Cursor,
+        payload_cache: Optional[Dict[str, int]] = None,
     ) -> None:
+        rows = self._rows_from_data(table_name, data)
+        if rows:
+            self._insert_rows(table_name, rows, cursor, payload_cache)
+
+    def _rows_from_data(self, table_name: str, data: Any) -> List[Tuple[Any, ...]]:
         if not table_name:
             raise ValueError("table_name is required")
 
         if isinstance(data, dict):
-            rows = self.build_rows_from_snapshot(data)
-            if rows:
-                self._insert_rows(table_name, rows, cursor=cursor)
-            return
+            return self.build_rows_from_snapshot(data)
 
         if not isinstance(data, (tuple, list)) or len(data) != 10:
             raise ValueError("data must be a 10-field tuple or a snapshot dict")
-        self._insert_row(table_name, tuple(data), cursor=cursor)
+        return [tuple(data)]
+
+    def _count(self, key: str, n: int = 1) -> None:
+        with self._metrics_lock:
+            self._metrics[key] += n
 
     def writing_thread(self):
-        """后台写入线程：从队列取数据并写入数据库。"""
-        conn = self._open_connection()
-        cursor = conn.cursor()
+        """后台写入线程：从队列取数据, 按表合并后组提交; 落后时由 enqueue 转存日志, 追上后回放。"""
+        # 每个连接带自己的 payload 文本 -> Id 缓存; 回滚后清空, 避免引用未提交的 Id
+        conns = _WriterConnections(self)
+        # 表名 -> 已过滤待提交的行 (同表的多次快照合并为一次 executemany)
+        pending: Dict[str, List[Tuple[Any, ...]]] = {}
+        pending_rows = 0
+        first_pending = 0.0
         try:
-            while not self._stop_event.is_set():
-                batch: list[tuple[str, Any]] = []
+            while True:
+                stopping = self._stop_event.is_set()
+                if (
+                    not stopping
+                    and self._spilling
+                    and self._queue.empty()
+                    and time.time() >= self._retry_at
+                ):
+                    if pending:
+                        self._flush_pending(conns, pending)
+                        pending_rows = 0
+                    self._replay_spill(conns)
+                    if not self._spilling:
+                        self._process_deferred_closes(conns)
+
+                timeout = 0.2
+                if pending:
+                    timeout = max(
+                        0.0, min(timeout, first_pending + self._commit_interval - time.time())
+                    )
                 try:
-                    batch.append(self._queue.get(timeout=0.2))
+                    item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
                 except queue.Empty:
-                    continue
+                    item = None
 
-                for _ in range(49):
-                    try:
-                        batch.append(self._queue.get_nowait())
-                    except queue.Empty:
-                        break
-
-                for table_name, data in batch:
+                while item is not None:
+                    table_name, data = item
+                    if data is _CLOSE_RUN:
+                        # 先提交该批次之前入队的数据; 转存未回放完时推迟到回放之后
+                        if pending:
+                            self._flush_pending(conns, pending)
+                            pending_rows = 0
+                        self._deferred_closes.append(table_name)
+                        if not self._spilling:
+                            self._process_deferred_closes(conns)
+                        self._queue.task_done()
+                        try:
+                            item = self._queue.get_nowait()
+                        except queue.Empty:
+                            item = None
+                        continue
                     try:
-                        self._insert_data_with_cursor(table_name, data, cursor)
+                        rows = self._rows_from_data(table_name, data)
+                        cursor = conns.cursor(table_name)
+                        if cursor is not None:
+                            rows = self._filter_rows(table_name, rows, cursor)
+                        if rows:
+                            if not pending:
+                                first_pending = time.time()
+                            pending.setdefault(table_name, []).extend(rows)
+                            pending_rows += len(rows)
                     except Exception as exc:
                         self.log.error(f"DB insert failed: {exc}")
                     finally:
                         self._queue.task_done()
-
-                try:
-                    conn.commit()
-                except Exception as exc:
-                    self.log.error(f"DB commit failed: {exc}")
+                    if pending_rows >= self._commit_rows:
+                        break
                     try:
-                        conn.rollback()
-                    except Exception:
-                        pass
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        item = None
+
+                if pending and (
+                    stopping
+                    or pending_rows >= self._commit_rows
+                    or time.time() - first_pending >= self._commit_interval
+                ):
+                    self._flush_pending(conns, pending)
+                    pending_rows = 0
+
+                if stopping and not pending and self._queue.empty():
+                    break
+        finally:
+            conns.close_all()
+
+    def _process_deferred_closes(self, conns: _WriterConnections) -> None:
+        if self._maintenance_after_replay:
+            self._maintenance_after_replay = False
+            self.storage.start_maintenance(startup=True)
+        while self._deferred_closes:
+            table_name = self._deferred_closes.pop(0)
+            conns.release(table_name)
+            self._delta_filters.pop(table_name, None)
+            self._rollups.pop(table_name, None)
+            self.storage.close_run(table_name)
+
+    def _flush_pending(
+        self,
+        conns: _WriterConnections,
+        pending: Dict[str, List[Tuple[Any, ...]]],
+        progress: Optional[Tuple[str, int]] = None,
+    ) -> bool:
+        """每个数据库文件一次事务写入待提交行; 失败时回滚并把这些行转存到日志, 稍后回放
+
+        progress 为 (回放日志 Id, 字节偏移) 时随同一事务写入 SpillProgress, 可重试的失败
+        不再转存 (行仍在 .replay 中, 下次从偏移处续放); 有文件可重试地失败时返回 False。
+        """
+        groups: Dict[int, Tuple[tuple, Dict[str, List[Tuple[Any, ...]]]]] = {}
+        for table_name, rows in pending.items():
+            entry = conns.get(table_name)
+            if entry is None:
+                # 批次文件已归档/过期, 不能再写入
+                self.log.error(f"DB rows dropped, {table_name} is no longer writable")
+                self._count("dropped", len(rows))
+                continue
+            groups.setdefault(id(entry[0]), (entry, {}))[1][table_name] = rows
+        ok = True
+        try:
+            for (conn, cursor, payload_cache), tables in groups.values():
+                ok = self._commit_tables(conn, cursor, payload_cache, tables, progress) and ok
         finally:
+            pending.clear()
+        return ok
+
+    def _commit_tables(
+        self,
+        conn: sqlite3.Connection,
+        cursor: sqlite3.Cursor,
+        payload_cache: Dict[str, int],
+        tables: Dict[str, List[Tuple[Any, ...]]],
+        progress: Optional[Tuple[str, int]] = None,
+    ) -> bool:
+        rows_total = sum(len(rows) for rows in tables.values())
+        try:
+            with self.commit_latency.measure():
+                for table_name, rows in tables.items():
+                    self._insert_rows(
+                        table_name, rows, cursor, payload_cache, apply_delta=False
+                    )
+                if progress is not None:
+                    self._save_replay_offset(cursor, progress)
+                conn.commit()
+            self._count("commits")
+            self._count("committed_rows", rows_total)
+            self._retry_backoff = 1.0
+            return True
+        except Exception as exc:
+            payload_cache.clear()
+            # 内存汇总已计入回滚掉的行, 丢弃后下次从库中重新加载
+            for table_name in tables:
+                self._rollups.pop(table_name, None)
             try:
-                conn.close()
+                conn.rollback()
             except Exception:
                 pass
+            self._count("failed_rows", rows_total)
+            if not self._is_transient_error(exc):
+                # 重试也会同样失败, 转存只会让日志永远回放不完
+                self.log.error(
+                    f"DB commit failed, {rows_total} rows quarantined to "
+                    f"{self.dead_letter_path}: {exc!r}"
+                )
+                self._quarantine(tables, exc)
+                if progress is not None:
+                    # 已隔离的记录不必再回放
+                    try:
+                        self._save_replay_offset(cursor, progress)
+                        conn.commit()
+                    except Exception:
+                        pass
+                return True
+            self._retry_at = time.time() + self._retry_backoff
+            self._retry_backoff = min(self._retry_backoff * 2, 30.0)
+            if progress is not None:
+                self.log.error(f"DB commit failed during spill replay, will resume: {exc}")
+                # 过滤器已见过这些快照, 续放时需重新判断
+                for table_name in tables:
+                    self._delta_filters.pop(table_name, None)
+                return False
+            self.log.error(f"DB commit failed, spilling {rows_total} rows: {exc}")
+            for table_name, rows in tables.items():
+                # 已经过变化记录过滤, 回放时不再过滤
+                self._spill({"t": table_name, "r": rows})
+            return False
+
+    @staticmethod
+    def _save_replay_offset(cursor: sqlite3.Cursor, progress: Tuple[str, int]) -> None:
+        cursor.execute(
+            "INSERT OR REPLACE INTO SpillProgress (Id, ReplayId, Offset) VALUES (1, ?, ?)",
+            progress,
+        )
+
+    def _load_replay_offset(self, cursor: sqlite3.Cursor, replay_id: str) -> int:
+        """本库对该回放日志已提交到的字节偏移; 其他日志留下的记录视为 0"""
+        self._ensure_progress_table(cursor)
+        row = cursor.execute(
+            "SELECT ReplayId, Offset FROM SpillProgress WHERE Id=1"
+        ).fetchone()
+        return row[1] if row and row[0] == replay_id else 0
+
+    @staticmethod
+    def _is_transient_error(exc: Exception) -> bool:
+        """只有 OperationalError 中的 busy/locked/IO/磁盘满等错误值得重试"""
+        if not isinstance(exc, sqlite3.OperationalError):
+            return False
+        code = getattr(exc, "sqlite_errorcode", None)
+        if code is None:
+            return True
+        return code & 0xFF in _TRANSIENT_SQLITE_CODES
+
+    def _quarantine(self, tables: Dict[str, List[Tuple[Any, ...]]], exc: Exception) -> None:
+        """把提交失败的批次追加到死信文件, 供人工排查后补录"""
+        rows_total = sum(len(rows) for rows in tables.values())
+        try:
+            with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+                for table_name, rows in tables.items():
+                    f.write(
+                        self._json_dumps(
+                            {"t": table_name, "r": rows, "e": repr(exc), "at": time.time()}
+                        )
+                        + "\n"
+                    )
+            self._count("quarantined", rows_total)
+        except Exception as write_exc:
+            self._count("dropped", rows_total)
+            self.log.error(f"DB dead-letter write failed, {rows_total} rows dropped: {write_exc}")
+
+    def _has_spill_backlog(self) -> bool:
+        for path in (self.spill_path, self.spill_path + ".replay"):
+            if os.path.isfile(path) and os.path.getsize(path) > 0:
+                return True
+        return False
+
+    def _spill(self, record: dict) -> bool:
+        """追加一条日志记录; 写盘失败才真正丢弃"""
+        try:
+            line = self._json_dumps(record)
+            with self._spill_lock:
+                with open(self.spill_path, "a", encoding="utf-8") as f:
+                    if f.tell() == 0:
+                        # 首行为日志 Id, 回放进度按 Id 区分, 不会误用上一份日志的偏移
+                        f.write(self._json_dumps({"id": uuid.uuid4().hex}) + "\n")
+                    f.write(line + "\n")
+                if not self._spilling:
+                    self._spilling = True
+                    self.log.warning(
+                        "DB writer is behind, spilling snapshots to %s", self.spill_path
+                    )
+            self._count("spilled")
+            return True
+        except Exception as exc:
+            self._count("dropped")
+            now = time.time()
+            if now - self._last_queue_warn > 10:
+                self._last_queue_warn = now
+                self.log.error(f"DB spill failed, snapshot dropped: {exc}")
+            return False
+
+    def _replay_spill(self, conns: _WriterConnections) -> None:
+        """把日志移到 .replay 后逐条回放, 回放期间新快照重新走队列 (时间上都晚于日志内容)
+
+        每个库文件在 SpillProgress 中记录已提交到的字节偏移 (与数据行同一事务), 回放中途
+        崩溃或提交失败后从偏移处续放, 已提交的记录不会重复写入。
+        """
+        replay_path = self.spill_path + ".replay"
+        with self._spill_lock:
+            if not os.path.isfile(replay_path) and os.path.isfile(self.spill_path):
+                os.replace(self.spill_path, replay_path)
+            self._spilling = False
+        if not os.path.isfile(replay_path):
+            return
+
+        pending: Dict[str, List[Tuple[Any, ...]]] = {}
+        pending_rows = 0
+        replayed = 0
+        skipped = 0
+        replay_id: Optional[str] = None
+        # 库文件 (连接) -> 该文件已提交到的偏移
+        committed: Dict[int, int] = {}
+        offset = 0
+        with open(replay_path, "rb") as f:
+            for raw in f:
+                offset += len(raw)
+                if not raw.strip():
+                    continue
+                try:
+                    record = json.loads(raw.decode("utf-8"))
+                    if "t" not in record:
+                        replay_id = record.get("id")
+                        continue
+                    table_name = record["t"]
+                    if replay_id is not None:
+                        entry = conns.get(table_name)
+                        if entry is not None:
+                            key = id(entry[0])
+                            if key not in committed:
+                                committed[key] = self._load_replay_offset(entry[1], replay_id)
+                            if offset <= committed[key]:
+                                skipped += 1
+                                continue
+                    if "r" in record:
+                        rows = [tuple(row) for row in record["r"]]
+                    else:
+                        rows = self._rows_from_data(table_name, record["d"])
+                        cursor = conns.cursor(table_name)
+                        if cursor is not None:
+                            rows = self._filter_rows(table_name, rows, cursor)
+                except Exception as exc:
+                    self.log.error(f"DB spill record skipped: {exc}")
+                    continue
+                replayed += 1
+                if rows:
+                    pending.setdefault(table_name, []).extend(rows)
+                    pending_rows += len(rows)
+                if pending_rows >= self._commit_rows:
+                    if not self._replay_flush(conns, pending, replay_id, offset):
+                        return
+                    pending_rows = 0
+        if pending and not self._replay_flush(conns, pending, replay_id, offset):
+            return
+        os.remove(replay_path)
+        self._count("replayed", replayed)
+        self.log.info(f"DB spill replayed: {replayed} records, {skipped} already committed")
+        with self._spill_lock:
+            # 启动时遗留 .replay 与新日志并存的情况: 新日志留给下一轮回放
+            if os.path.isfile(self.spill_path) and os.path.getsize(self.spill_path) > 0:
+                self._spilling = True
+
+    def _replay_flush(
+        self,
+        conns: _WriterConnections,
+        pending: Dict[str, List[Tuple[Any, ...]]],
+        replay_id: Optional[str],
+        offset: int,
+    ) -> bool:
+        """提交回放中累积的行; 可重试的失败时保留 .replay 并恢复转存, 退避后续放"""
+        if replay_id is None:
+            # 旧格式日志没有 Id, 无法记录进度, 失败的行照旧转存
+            self._flush_pending(conns, pending)
+            return True
+        if self._flush_pending(conns, pending, (replay_id, offset)):
+            return True
+        with self._spill_lock:
+            self._spilling = True
+        return False
 
     def start_writing(self):
         if self._worker is not None and self._worker.is_alive():
@@ -239,24 +1568,55 @@ class DataBaseWorker(LoggerMixin):
         self._worker = threading.Thread(target=self.writing_thread, daemon=True)
         self._worker.start()
 
-    def stop_writing(self):
+    def stop_writing(self, timeout: float = 5.0):
+        """停止写线程; 队列中剩余数据先写完, 未回放的日志保留到下次启动"""
         self._stop_event.set()
         if self._worker is not None:
-            self._worker.join(timeout=2.0)
+            self._worker.join(timeout=timeout)
             self._worker = None
 
     def enqueue(self, table_name: str, data: Any):
-        """可选：异步写入队列。"""
-        if self._queue.qsize() >= self._max_queue_size:
-            now = time.time()
-            if now - self._last_queue_warn > 10:
-                self._last_queue_warn = now
-                self.log.warning(
-                    "DB write queue is full (%s), dropping snapshot to avoid UI stall.",
-                    self._max_queue_size,
-                )
-            return
-        self._queue.put((table_name, data))
+        """异步写入队列; 队列积压或正在转存时写入本地日志, 不丢弃快照。"""
+        self._count("enqueued")
+        if self.live_feed.has_subscribers(table_name):
+            self.live_feed.publish(table_name, data, self._build_live_row)
+        if not self._spilling:
+            depth = self._queue.qsize()
+            if depth < self._max_queue_size:
+                self._queue.put((table_name, data))
+                if depth + 1 > self._metrics["max_depth"]:
+                    with self._metrics_lock:
+                        self._metrics["max_depth"] = max(
+                            self._metrics["max_depth"], depth + 1
+                        )
+                return
+        # 一旦开始转存, 后续快照都进日志直到回放完成, 保证写入顺序与时间一致
+        self._spill({"t": table_name, "d": data})
+
+    def _build_live_row(self, slot: int, status: dict) -> Tuple[Any, ...]:
+        try:
+            return self.build_row_from_status(slot, status)
+        except Exception as exc:
+            self.log.error(f"build_row_from_status failed for slot={slot}: {exc}")
+            return (slot, None, None, None, None, None, None, None, None, None)
+
+    def writer_metrics(self) -> dict:
+        """写入链路指标: 队列深度、提交耗时、转存/回放/丢弃计数"""
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        metrics["queue_depth"] = self._queue.qsize()
+        metrics["spilling"] = self._spilling
+        spill_bytes = 0
+        for path in (self.spill_path, self.spill_path + ".replay"):
+            try:
+                spill_bytes += os.path.getsize(path)
+            except OSError:
+                pass
+        metrics["spill_bytes"] = spill_bytes
+        metrics["commit_latency"] = self.commit_latency.snapshot()
+        metrics["delta"] = self.delta_stats()
+        metrics["live_published"] = self.live_feed.published
+        return metrics
 
     @staticmethod
     def _json_dumps(value: Any) -> str:
@@ -309,7 +1669,442 @@ class DataBaseWorker(LoggerMixin):
                 self.log.error(f"build_row_from_status failed for slot={slot}: {exc}")
         return rows
 
+    @staticmethod
+    def step_points(points: List[Tuple[Any, ...]], until: Optional[float] = None) -> list:
+        """把变化记录的 (x, y, ...) 点还原为阶梯序列: 每个新值之前补一个沿用旧值的点
+
+        until 不为空时把最后一个值延伸到该 x (如当前时间), 表示数值一直保持到现在。
+        """
+        stepped = []
+        prev = None
+        for point in points:
+            if prev is not None and point[0] > prev[0] and point[1] != prev[1]:
+                stepped.append((point[0], *prev[1:]))
+            stepped.append(point)
+            prev = point
+        if prev is not None and until is not None and until > prev[0]:
+            stepped.append((until, *prev[1:]))
+        return stepped
+
+    @staticmethod
+    def time_weighted_avg(
+        cursor: sqlite3.Cursor, table_name: str, slot: int, field: str
+    ) -> Optional[float]:
+        """按持续时间加权的平均值: 每行的值保持到下一行的时间戳 (变化记录表用)"""
+        cursor.execute(
+            f"""
+            SELECT SUM(v * dt) / SUM(dt) FROM (
+                SELECT {field} AS v,
+                       LEAD(Timestamp) OVER (ORDER BY Timestamp) - Timestamp AS dt
+                FROM "{table_name}" WHERE Slot=?
+            ) WHERE v IS NOT NULL AND dt > 0
+            """,
+            (int(slot),),
+        )
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def ensure_export_indexes(conn_or_cursor, data_table: str) -> None:
+        """为汇总导出建 (Slot, 字段, Timestamp) 索引, 最小值最早/最大值最晚时间各是一次索引定位
+
+        只在新建批次时随表创建: 导出时补建要锁库数秒, 会挡住正在写入的批次。
+        旧库的表没有这些索引, 导出结果相同, 只是时间定位退化为按槽位扫描。
+        """
+        for f in _EXPORT_FIELDS:
+            conn_or_cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS "idx_{data_table}_slot_{f.lower()}" '
+                f'ON "{data_table}" (Slot, {f}, Timestamp)'
+            )
+
+    @classmethod
+    def export_summary_sql(
+        cls, conn: sqlite3.Connection, table_name: str, bad_status, weighted: bool
+    ) -> Tuple[str, list]:
+        """生成单表汇总导出语句: 一次 GROUP BY Slot 扫描求 NG/OK 标记与最值、平均值
+
+        分组扫描按行号顺序读表 (NOT INDEXED), 走 (Slot, ...) 索引反而是逐行回表的随机读。
+        最小值最早出现/最大值最晚出现的时间不再回扫原表, 而是按槽位在
+        (Slot, 字段, Timestamp) 索引上各定位一次。变化记录表只为 LEAD 窗口包一层子查询,
+        用于按时长加权平均, 原表仍只读一遍。compact 布局直接读 _rows 窄表, 不经过 payload 视图。
+        """
+        cursor = conn.cursor()
+        layout = LAYOUT_LEGACY
+        try:
+            cursor.execute(
+                "SELECT Layout FROM TableMeta WHERE TableName=?", (table_name,)
+            )
+            row = cursor.fetchone()
+            if row:
+                layout = row[0]
+        except sqlite3.Error:
+            pass
+        source = cls.data_table_name(table_name, layout)
+
+        bad = [int(v) for v in bad_status or ()]
+        ng_expr = f"Status IN ({','.join('?' * len(bad))})" if bad else "0"
+        if weighted:
+            scan = f"""(
+                SELECT Slot, Status, Voltage, Current, Temperature,
+                       LEAD(Timestamp) OVER (PARTITION BY Slot ORDER BY Timestamp) - Timestamp AS dt
+                FROM "{source}" NOT INDEXED
+            )"""
+        else:
+            scan = f'"{source}" NOT INDEXED'
+
+        agg_cols = []
+        out_cols = []
+        for f in _EXPORT_FIELDS:
+            avg = f"AVG({f})"
+            if weighted:
+                avg = (
+                    f"COALESCE(SUM(CASE WHEN dt > 0 THEN {f} * dt END) / "
+                    f"SUM(CASE WHEN dt > 0 AND {f} IS NOT NULL THEN dt END), {avg})"
+                )
+            agg_cols.append(f"MIN({f}) AS min_{f}, MAX({f}) AS max_{f}, {avg} AS avg_{f}")
+            out_cols.append(
+                f'g.min_{f}, (SELECT MIN(Timestamp) FROM "{source}" '
+                f"WHERE Slot = g.Slot AND {f} = g.min_{f}), "
+                f'g.max_{f}, (SELECT MAX(Timestamp) FROM "{source}" '
+                f"WHERE Slot = g.Slot AND {f} = g.max_{f}), "
+                f"g.avg_{f}"
+            )
+        sql = f"""
+            SELECT g.Slot, g.ng, g.ok, {', '.join(out_cols)}
+            FROM (
+                SELECT Slot, MAX({ng_expr}) AS ng, MAX(Status = 1) AS ok,
+                       {', '.join(agg_cols)}
+                FROM {scan}
+                GROUP BY Slot
+            ) AS g
+            ORDER BY g.Slot ASC
+        """
+        return sql, bad
+
+    @classmethod
+    def export_summary_rows(
+        cls,
+        conn: sqlite3.Connection,
+        table_name: str,
+        bad_status=(),
+        weighted: Optional[bool] = None,
+    ):
+        """逐行产出单表汇总导出的 CSV 行 (与 EXPORT_SUMMARY_HEADER 对应), 边查询边产出
+
+        开启了增量汇总的表直接读 SlotRollup (每槽位一行), 否则对原始数据做一次分组聚合。
+        """
+        if weighted is None:
+            try:
+                row = conn.execute(
+                    "SELECT DeltaConfig FROM TableMeta WHERE TableName=?", (table_name,)
+                ).fetchone()
+            except sqlite3.Error:
+                row = None
+            weighted = bool(row and row[0])
+        if cls.table_rollup_bucket(conn, table_name):
+            rows = cls._rollup_export_stats(conn, table_name, bad_status, weighted)
+        else:
+            sql, params = cls.export_summary_sql(conn, table_name, bad_status, weighted)
+            rows = conn.execute(sql, params)
+        for row in rows:
+            slot, ng, ok = row[:3]
+            status_text = "NG" if ng else ("OK" if ok else "--")
+            out = [table_name, slot, status_text]
+            stats = row[3:]
+            for i in range(0, len(stats), 5):
+                min_val, min_ts, max_val, max_ts, avg_val = stats[i : i + 5]
+                out += [
+                    cls._fmt_export_float(min_val),
+                    cls._fmt_export_time(min_ts),
+                    cls._fmt_export_float(max_val),
+                    cls._fmt_export_time(max_ts),
+                    cls._fmt_export_float(avg_val),
+                ]
+            yield out
+
+    @staticmethod
+    def _rollup_export_stats(
+        conn: sqlite3.Connection, table_name: str, bad_status, weighted: bool
+    ):
+        """从 SlotRollup 产出与 export_summary_sql 相同列结构的行"""
+        bad_mask = status_mask(bad_status)
+        ok_mask = status_mask((1,))
+        cols = ["Slot", "StatusMask"]
+        for name, _ in _ROLLUP_FIELDS:
+            cols += [f"{name}{s}" for s in ("Min", "MinTs", "Max", "MaxTs", "Sum", "N", "WSum", "WDur")]
+        cursor = conn.execute(
+            f"SELECT {', '.join(cols)} FROM SlotRollup WHERE TableName=? ORDER BY Slot ASC",
+            (table_name,),
+        )
+        for row in cursor:
+            mask = int(row[1] or 0)
+            out = [row[0], int(bool(mask & bad_mask)), int(bool(mask & ok_mask))]
+            for i in range(2, len(row), 8):
+                min_v, min_ts, max_v, max_ts, total, n, wsum, wdur = row[i : i + 8]
+                avg = total / n if n else None
+                if weighted and wdur:
+                    avg = wsum / wdur
+                out += [min_v, min_ts, max_v, max_ts, avg]
+            yield out
+
+    @staticmethod
+    def query_rollup_buckets(
+        conn: sqlite3.Connection,
+        table_name: str,
+        slot: int,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+    ) -> List[Tuple[Any, ...]]:
+        """读取槽位分桶汇总: (Bucket, StatusMask, V最小, V最大, V均值, I最小, I最大, I均值, T最小, T最大, T均值)"""
+        cols = []
+        for name, _ in _ROLLUP_FIELDS:
+            cols += [
+                f"{name}Min",
+                f"{name}Max",
+                f"CASE WHEN {name}N > 0 THEN {name}Sum / {name}N END",
+            ]
+        sql = (
+            f"SELECT Bucket, StatusMask, {', '.join(cols)} FROM RollupBuckets "
+            "WHERE TableName=? AND Slot=? AND Bucket >= ? AND Bucket <= ? ORDER BY Bucket ASC"
+        )
+        params = (
+            table_name,
+            int(slot),
+            float("-inf") if start is None else start,
+            float("inf") if end is None else end,
+        )
+        return conn.execute(sql, params).fetchall()
+
+    @classmethod
+    def query_chart_rows(
+        cls,
+        conn: sqlite3.Connection,
+        table_name: str,
+        slot: int,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        max_points: int = 2000,
+    ) -> List[Tuple[Any, ...]]:
+        """按可视窗口降采样读取曲线数据, 返回 (Id, Slot, Timestamp, Status, Voltage, Current, Temperature, DtcCodes)
+
+        窗口被分成约 max_points/2 个时间桶:
+        - 每个桶若比汇总分桶还宽, 直接合并 RollupBuckets 的 min/max (不读原始行);
+        - 否则读取窗口内原始行, 每桶保留电压/电流/温度最小值与最大值所在行 (min-max 降采样, 每桶最多 6 行)。
+        报警行 (状态不在 CHART_NORMAL_STATUS) 与 DTC 变化行总是保留, 曲线上的红点不会因缩放消失。
+        start/end 为空时取该槽位全程。
+        """
+        slot = int(slot)
+        layout = LAYOUT_LEGACY
+        try:
+            row = conn.execute(
+                "SELECT Layout FROM TableMeta WHERE TableName=?", (table_name,)
+            ).fetchone()
+            if row:
+                layout = row[0]
+        except sqlite3.Error:
+            pass
+
+        if start is None or end is None:
+            source = cls.data_table_name(table_name, layout)
+            # MIN/MAX 分开写成子查询, 各自走 (Slot, Timestamp) 索引的一端
+            first, last = conn.execute(
+                f'SELECT (SELECT MIN(Timestamp) FROM "{source}" WHERE Slot=?), '
+                f'(SELECT MAX(Timestamp) FROM "{source}" WHERE Slot=?)',
+                (slot, slot),
+            ).fetchone()
+            if first is None:
+                return []
+            start = first if start is None else start
+            end = last if end is None else end
+        buckets = max(1, int(max_points) // 2)
+        width = max((end - start) / buckets, 1e-6)
+
+        bucket_s = cls.table_rollup_bucket(conn, table_name)
+        if bucket_s and width >= bucket_s:
+            return cls._chart_rows_from_buckets(
+                conn, table_name, slot, start, end, width, bucket_s
+            )
+
+        if layout == LAYOUT_COMPACT:
+            # 先读窄表, 只为保留下来的行解析 DTC 文本
+            rows = conn.execute(
+                f'SELECT Id, Slot, Timestamp, Status, Voltage, Current, Temperature, DtcRef '
+                f'FROM "{cls.data_table_name(table_name, layout)}" '
+                "WHERE Slot=? AND Timestamp>=? AND Timestamp<=? ORDER BY Timestamp ASC",
+                (slot, start, end),
+            ).fetchall()
+        else:
+            rows = conn.execute(
+                f'SELECT Id, Slot, Timestamp, Status, Voltage, Current, Temperature, DtcCodes '
+                f'FROM "{table_name}" '
+                "WHERE Slot=? AND Timestamp>=? AND Timestamp<=? ORDER BY Timestamp ASC",
+                (slot, start, end),
+            ).fetchall()
+        if len(rows) > max_points:
+            rows = cls._min_max_rows(rows, start, width)
+        if layout == LAYOUT_COMPACT and rows:
+            refs = {r[7] for r in rows if r[7] is not None}
+            bodies = {}
+            if refs:
+                ref_list = list(refs)
+                for i in range(0, len(ref_list), 500):
+                    chunk = ref_list[i : i + 500]
+                    bodies.update(
+                        conn.execute(
+                            f"SELECT Id, Body FROM Payloads WHERE Id IN ({','.join('?' * len(chunk))})",
+                            chunk,
+                        ).fetchall()
+                    )
+            rows = [(*r[:7], bodies.get(r[7])) for r in rows]
+        return rows
+
+    @staticmethod
+    def _min_max_rows(rows: list, start: float, width: float) -> list:
+        """min-max 降采样: 每个时间桶保留各数值列最小/最大值所在行, 以及首尾行、报警行和 DTC 变化行"""
+        keep = {0, len(rows) - 1}
+        value_cols = (4, 5, 6)
+        current_bucket = None
+        extremes: Dict[int, List[int]] = {}
+        prev_dtc = rows[0][7]
+        for i, row in enumerate(rows):
+            b = int((row[2] - start) / width)
+            if b != current_bucket:
+                for idx_pair in extremes.values():
+                    keep.update(idx_pair)
+                extremes = {}
+                current_bucket = b
+            status = row[3]
+            if status is not None and status not in CHART_NORMAL_STATUS:
+                keep.add(i)
+            if row[7] != prev_dtc:
+                keep.add(i)
+                prev_dtc = row[7]
+            for col in value_cols:
+                value = row[col]
+                if value is None:
+                    continue
+                pair = extremes.get(col)
+                if pair is None:
+                    extremes[col] = [i, i]
+                    continue
+                if value < rows[pair[0]][col]:
+                    pair[0] = i
+                if value > rows[pair[1]][col]:
+                    pair[1] = i
+        for idx_pair in extremes.values():
+            keep.update(idx_pair)
+        return [rows[i] for i in sorted(keep)]
+
+    @classmethod
+    def _chart_rows_from_buckets(
+        cls,
+        conn: sqlite3.Connection,
+        table_name: str,
+        slot: int,
+        start: float,
+        end: float,
+        width: float,
+        bucket_s: float,
+    ) -> list:
+        """宽窗口: 把汇总分桶再合并到屏幕分辨率, 每桶输出最小值点与最大值点两行
+
+        状态取桶内出现过的报警状态 (没有则取正常状态), 保证报警红点在缩小视图中仍可见。
+        合成行没有 Id 与 DTC 文本。
+        """
+        merged: Dict[int, list] = {}
+        for bucket, mask, *stats in cls.query_rollup_buckets(
+            conn, table_name, slot, start - bucket_s, end
+        ):
+            b = int((max(bucket, start) - start) / width)
+            acc = merged.get(b)
+            if acc is None:
+                acc = merged[b] = [0, [None] * 3, [None] * 3]
+            acc[0] |= int(mask or 0)
+            for k in range(3):
+                mn, mx = stats[k * 3], stats[k * 3 + 1]
+                if mn is not None and (acc[1][k] is None or mn < acc[1][k]):
+                    acc[1][k] = mn
+                if mx is not None and (acc[2][k] is None or mx > acc[2][k]):
+                    acc[2][k] = mx
+
+        alarm_mask = status_mask(range(_STATUS_MIN, _STATUS_MAX + 1)) & ~status_mask(
+            CHART_NORMAL_STATUS
+        )
+        rows = []
+        for b in sorted(merged):
+            mask, mins, maxs = merged[b]
+            status = None
+            for candidates in (mask & alarm_mask, mask):
+                if candidates:
+                    status = (candidates & -candidates).bit_length() - 1 + _STATUS_MIN
+                    break
+            ts = start + b * width
+            rows.append((None, slot, ts, status, *mins, None))
+            rows.append((None, slot, ts + width / 2, status, *maxs, None))
+        return rows
+
+    @classmethod
+    def export_summary_csv(
+        cls,
+        db_path: str,
+        table_names: List[str],
+        file_path: str,
+        bad_status=(),
+        path_for=None,
+    ) -> int:
+        """把多张批次表的槽位汇总流式写入 CSV, 返回写入的数据行数
+
+        path_for(table_name) 给出分文件存储时批次表所在文件 (如 DataBaseWorker.db_path_for),
+        文件在用到时才打开 (归档文件此时解压), 同一文件的多个批次共用连接。
+        """
+        count = 0
+        conns: Dict[str, sqlite3.Connection] = {}
+        try:
+            with open(file_path, "w", newline="", encoding="utf-8-sig") as f:
+                writer = csv.writer(f)
+                writer.writerow(EXPORT_SUMMARY_HEADER)
+                for table_name in table_names:
+                    path = path_for(table_name) if path_for else db_path
+                    if path is None:
+                        continue  # 已过保留期
+                    try:
+                        conn = conns.get(path)
+                        if conn is None:
+                            conn = conns[path] = sqlite3.connect(path)
+                        for row in cls.export_summary_rows(conn, table_name, bad_status):
+                            writer.writerow(row)
+                            count += 1
+                    except sqlite3.Error:
+                        # 表不存在或已损坏时跳过, 与逐表导出的旧行为一致
+                        continue
+        finally:
+            for conn in conns.values():
+                conn.close()
+        return count
+
+    @staticmethod
+    def _fmt_export_float(value: Optional[float]) -> str:
+        if value is None:
+            return ""
+        try:
+            return f"{float(value):.2f}"
+        except Exception:
+            return ""
+
+    @staticmethod
+    def _fmt_export_time(ts: Optional[float]) -> str:
+        if ts is None:
+            return ""
+        try:
+            return datetime.fromtimestamp(float(ts)).strftime("%Y-%m-%d %H:%M:%S")
+        except Exception:
+            return ""
+
     def close(self):
+        for conn in self._shard_conns.values():
+            conn.close()
+        self._shard_conns.clear()
+        self.pool.close_all()
         self.connection.close()
 
 
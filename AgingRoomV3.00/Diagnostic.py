@@ -2,13 +2,15 @@ import can
 import time
 import isotp
 import ctypes
+import threading
 import udsoncan
 
 import Tools
 from pathlib import Path
 from Logger import LoggerMixin
-from typing import Any, Optional
+from typing import Any, Callable, Optional
 from udsoncan.client import Client
+from concurrent.futures import ThreadPoolExecutor
 from udsoncan.typing import ClientConfig
 
 
@@ -40,20 +42,37 @@ class DefineDidCodec(udsoncan.DidCodec):
         return self.string_len
 
 
-class SecurityAlgorithm(LoggerMixin):
-    """安全算法实现"""
+# -------- Seed-Key providers --------
 
-    def __init__(self, project_cfg: dict):
-        self.project_cfg = project_cfg or {}
+# 纯 Python 种子-密钥算法注册表：name -> func(level, seed) -> key
+_SEED_KEY_FUNCTIONS: dict[str, Callable[[int, bytes], bytes]] = {}
+# DLL 入口缓存：解析后的 DLL 绝对路径 -> _DllSeedKeyProvider
+_DLL_PROVIDERS: dict[str, "_DllSeedKeyProvider"] = {}
+_PROVIDER_LOCK = threading.Lock()
 
-    def security_algo(self, level, seed):
-        """计算安全密钥"""
-        dll_file_name = self.project_cfg["DLL路径"]
-        dll_func_name = Tools.get_dll_func_names(dll_file_name)[0]
-        ZeekrSeedKey = ctypes.CDLL(str(dll_file_name))
-        GenerateKeyEx = ZeekrSeedKey.__getattr__(dll_func_name)
 
-        GenerateKeyEx.argtypes = [
+def register_seed_key_function(
+    name: str, func: Callable[[int, bytes], bytes]
+) -> None:
+    """注册纯 Python 种子-密钥算法；项目配置 Diag.SeedKeyFunction 填写同名即可启用。"""
+    if not callable(func):
+        raise TypeError("func 必须可调用: func(level, seed) -> bytes")
+    with _PROVIDER_LOCK:
+        _SEED_KEY_FUNCTIONS[str(name)] = func
+
+
+class _DllSeedKeyProvider:
+    """按 DLL 路径缓存的 GenerateKeyEx 入口。
+
+    导出表解析、CDLL 加载与 argtypes 设置只在首次使用时执行一次,
+    之后所有 slot 共用；厂商 DLL 不保证可重入, 调用时加锁串行。
+    """
+
+    def __init__(self, dll_path: Path):
+        func_name = Tools.get_dll_func_names(dll_path)[0]
+        dll = ctypes.CDLL(str(dll_path))
+        func = getattr(dll, func_name)
+        func.argtypes = [
             ctypes.POINTER(ctypes.c_ubyte),
             ctypes.c_ushort,
             ctypes.c_uint,
@@ -61,25 +80,83 @@ class SecurityAlgorithm(LoggerMixin):
             ctypes.POINTER(ctypes.c_ubyte),
             ctypes.POINTER(ctypes.c_ushort),
         ]
-        GenerateKeyEx.restype = ctypes.c_uint
+        func.restype = ctypes.c_uint
+
+        self.dll_path = dll_path
+        self.func_name = func_name
+        self._dll = dll
+        self._func = func
+        self._lock = threading.Lock()
 
+    def __call__(self, level: int, seed: bytes, key_len: int) -> bytes:
         iSeedArray = (ctypes.c_ubyte * len(seed))(*seed)
         iSecurityLevel = ctypes.c_uint(level)
         iVariant = ctypes.c_ubyte()
         iKeyArray = (ctypes.c_ubyte * len(seed))()
-        iKeyLen = ctypes.c_ushort(self.project_cfg["Diag"]["SecurityFeedbackBytes"])
-
-        GenerateKeyEx(
-            iSeedArray,
-            ctypes.c_ushort(len(seed)),
-            iSecurityLevel,
-            ctypes.byref(iVariant),
-            iKeyArray,
-            ctypes.byref(iKeyLen),
-        )
+        iKeyLen = ctypes.c_ushort(key_len)
+
+        with self._lock:
+            self._func(
+                iSeedArray,
+                ctypes.c_ushort(len(seed)),
+                iSecurityLevel,
+                ctypes.byref(iVariant),
+                iKeyArray,
+                ctypes.byref(iKeyLen),
+            )
         return bytes(iKeyArray)
 
 
+def get_dll_seed_key_provider(dll_path: str | Path) -> _DllSeedKeyProvider:
+    """获取（必要时创建）指定 DLL 的种子-密钥入口, 同一路径全局只加载一次。"""
+    resolved = Path(dll_path).resolve()
+    key = str(resolved)
+    with _PROVIDER_LOCK:
+        provider = _DLL_PROVIDERS.get(key)
+        if provider is None:
+            provider = _DllSeedKeyProvider(resolved)
+            _DLL_PROVIDERS[key] = provider
+    return provider
+
+
+class SecurityAlgorithm(LoggerMixin):
+    """安全算法实现
+
+    - Diag.SeedKeyFunction 指定已注册的纯 Python 算法时优先使用
+    - 否则使用项目 DLL路径 对应的缓存 DLL 入口
+    - latency 记录每次密钥计算耗时
+    """
+
+    def __init__(self, project_cfg: dict):
+        self.project_cfg = project_cfg or {}
+        self.latency = Tools.LatencyHistogram()
+        self._provider: Optional[Callable[[int, bytes], bytes]] = None
+
+    def _resolve_provider(self) -> Callable[[int, bytes], bytes]:
+        diag_cfg = self.project_cfg.get("Diag", {})
+        func_name = diag_cfg.get("SeedKeyFunction")
+        if func_name:
+            with _PROVIDER_LOCK:
+                func = _SEED_KEY_FUNCTIONS.get(str(func_name))
+            if func is None:
+                raise KeyError(f"未注册的种子-密钥算法: {func_name}")
+            return func
+
+        dll_provider = get_dll_seed_key_provider(self.project_cfg["DLL路径"])
+        key_len = int(diag_cfg["SecurityFeedbackBytes"])
+        self.log.debug(
+            f"安全算法使用 DLL: {dll_provider.dll_path} ({dll_provider.func_name})"
+        )
+        return lambda level, seed: dll_provider(level, seed, key_len)
+
+    def security_algo(self, level, seed):
+        """计算安全密钥"""
+        with self.latency.measure():
+            if self._provider is None:
+                self._provider = self._resolve_provider()
+            return bytes(self._provider(int(level), bytes(seed)))
+
+
 def _extract_rdbi_value(response: Any, did_int: int) -> Any:
     """从 udsoncan 的 read_data_by_identifier 响应中尽可能提取 DID 的值。
 
@@ -104,6 +181,110 @@ def _extract_rdbi_value(response: Any, did_int: int) -> Any:
     return response
 
 
+class _CanRxDemux(can.Listener):
+    """按接收 CAN ID 分发帧的单一监听器。
+
+    所有诊断 stack 共用一个 notifier 监听器, 每帧只做一次字典查找,
+    分发开销不随 slot 数增长；未登记的 ID 直接丢弃。
+    """
+
+    def __init__(self):
+        self._routes: dict[int, can.BufferedReader] = {}
+        self._lock = threading.Lock()
+
+    def bind(self, rxid: int, reader: can.BufferedReader) -> None:
+        with self._lock:
+            routes = dict(self._routes)
+            routes[int(rxid)] = reader
+            self._routes = routes
+
+    def unbind(self, rxid: int, reader: can.BufferedReader) -> None:
+        with self._lock:
+            if self._routes.get(int(rxid)) is not reader:
+                return
+            routes = dict(self._routes)
+            routes.pop(int(rxid), None)
+            self._routes = routes
+
+    def route_count(self) -> int:
+        return len(self._routes)
+
+    def on_message_received(self, msg: can.Message) -> None:
+        # 读路径不加锁：bind/unbind 整体替换字典
+        reader = self._routes.get(msg.arbitration_id)
+        if reader is None or msg.is_error_frame or msg.is_remote_frame:
+            return
+        reader.on_message_received(msg)
+
+
+class _DemuxCanStack(isotp.TransportLayer):
+    """通过 _CanRxDemux 收帧的 ISO-TP stack（不单独注册到 notifier）"""
+
+    def __init__(
+        self, bus: can.BusABC, demux: _CanRxDemux, *args: Any, **kwargs: Any
+    ):
+        self.bus = bus
+        self.demux = demux
+        self.buffered_reader: Optional[can.BufferedReader] = None
+        self._bound_rxid: Optional[int] = None
+        kwargs.update(dict(rxfn=self._rx_canbus, txfn=self._tx_canbus))
+        super().__init__(*args, **kwargs)
+
+    def _rx_canbus(self, timeout: float) -> Optional[isotp.CanMessage]:
+        reader = self.buffered_reader
+        if reader is None:
+            return None
+        msg = reader.get_message(timeout=timeout)
+        if msg is None:
+            return None
+        return isotp.CanMessage(
+            arbitration_id=msg.arbitration_id,
+            data=msg.data,
+            extended_id=msg.is_extended_id,
+            is_fd=msg.is_fd,
+            bitrate_switch=msg.bitrate_switch,
+        )
+
+    def _tx_canbus(self, msg: isotp.CanMessage) -> None:
+        self.bus.send(
+            can.Message(
+                arbitration_id=msg.arbitration_id,
+                data=msg.data,
+                is_extended_id=msg.is_extended_id,
+                is_fd=msg.is_fd,
+                bitrate_switch=msg.bitrate_switch,
+            )
+        )
+
+    def _rebind(self) -> None:
+        if self.buffered_reader is None:
+            return
+        rxid = self.address.get_rx_arbitration_id()
+        if rxid == self._bound_rxid:
+            return
+        if self._bound_rxid is not None:
+            self.demux.unbind(self._bound_rxid, self.buffered_reader)
+        self.demux.bind(rxid, self.buffered_reader)
+        self._bound_rxid = rxid
+
+    def set_address(self, address: isotp.Address) -> None:
+        super().set_address(address)
+        self._rebind()
+
+    def start(self) -> None:
+        self.buffered_reader = can.BufferedReader()
+        self._bound_rxid = None
+        self._rebind()
+        super().start()
+
+    def stop(self) -> None:
+        if self.buffered_reader is not None and self._bound_rxid is not None:
+            self.demux.unbind(self._bound_rxid, self.buffered_reader)
+        self._bound_rxid = None
+        self.buffered_reader = None
+        super().stop()
+
+
 class UDSClient(LoggerMixin):
     """UDS诊断客户端：通过依赖注入使用notifier"""
 
@@ -115,6 +296,8 @@ class UDSClient(LoggerMixin):
         physical_rx: Optional[int] = None,
         project_name: Optional[str] = None,
         project_cfg: Optional[dict] = None,
+        security: Optional[SecurityAlgorithm] = None,
+        demux: Optional[_CanRxDemux] = None,
     ):
         """
         初始化UDS客户端
@@ -123,14 +306,18 @@ class UDSClient(LoggerMixin):
             bus: CAN总线实例
             notifier: Notifier实例（用于注册isotp stack）
             config: 诊断配置, 如果为None则使用默认配置
+            security: 共享的安全算法实例, 为None时单独创建
+            demux: 共享的接收分发器；为None时 stack 直接注册到 notifier
         """
         self.bus = bus
         self.notifier = notifier
+        self.demux = demux
         if project_cfg is None:
             project_name = project_name or get_default_project(1)
             project_cfg = PROJECT_CONFIG.get(project_name, {})
         self.project_cfg = project_cfg
         self.diag_cfg = self.project_cfg.get("Diag", self.project_cfg)
+        self.security = security or SecurityAlgorithm(self.project_cfg)
 
         # ISO-TP配置（兼容新旧结构）
         diag_addr = self.diag_cfg.get("DiagPhyAddr") or self.project_cfg.get(
@@ -145,9 +332,13 @@ class UDSClient(LoggerMixin):
         self.physical_tx = int(physical_tx)
         self.physical_rx = int(physical_rx)
         self.isotp_params = self._prepare_isotp_params()
+        # 连接等待方式与请求/响应耗时统计（跨 initialize/shutdown 保留）
+        self.wait_mode = FUNCTION_CONFIG.get("Diagnostic", {}).get("WaitMode", "event")
+        self.latency = Tools.LatencyHistogram()
 
         # ISO-TP栈和UDS客户端
-        self.stack: Optional[isotp.NotifierBasedCanStack] = None
+        self.stack: Optional[isotp.TransportLayer] = None
+        self._address: tuple[int, int] = (self.physical_tx, self.physical_rx)
         self.client: Optional[Client] = None
         self._initialized = False
 
@@ -175,21 +366,33 @@ class UDSClient(LoggerMixin):
             txid=self.physical_tx,
             rxid=self.physical_rx,
         )
+        self._address = (self.physical_tx, self.physical_rx)
+
+        if self.demux is not None:
+            # 经共享分发器收帧（按 rxid 路由, 不额外挂 notifier 监听器）
+            self.stack = _DemuxCanStack(
+                self.bus,
+                self.demux,
+                address=tp_addr,
+                params=self.isotp_params,
+            )
+        else:
+            # 创建NotifierBasedCanStack（使用注入的notifier）
+            self.stack = isotp.NotifierBasedCanStack(
+                bus=self.bus,
+                notifier=self.notifier,
+                address=tp_addr,
+                params=self.isotp_params,
+            )
 
-        # 创建NotifierBasedCanStack（使用注入的notifier）
-        self.stack = isotp.NotifierBasedCanStack(
-            bus=self.bus,
-            notifier=self.notifier,
-            address=tp_addr,
-            params=self.isotp_params,
-        )
-
-        # 启动stack（将自己注册到notifier）
+        # 启动stack（注册到notifier 或 分发器）
         self.stack.start()
         self.stack.set_sleep_timing(0, 0)
 
         # 创建UDS连接
-        conn = _NotifierBasedConnection(self.stack)
+        conn = _NotifierBasedConnection(
+            self.stack, wait_mode=self.wait_mode, latency=self.latency
+        )
 
         # 创建UDS客户端配置
         client_config = self._create_client_config()
@@ -223,7 +426,7 @@ class UDSClient(LoggerMixin):
             for did_hex, info in did_config.items()
         }
         # 配置安全算法
-        config_dict["security_algo"] = SecurityAlgorithm(self.project_cfg).security_algo
+        config_dict["security_algo"] = self.security.security_algo
 
         return ClientConfig(**config_dict)
 
@@ -244,8 +447,12 @@ class UDSClient(LoggerMixin):
         if not self._initialized:
             raise RuntimeError("UDSClient未初始化")
 
+        # 地址未变化时跳过（每次诊断前都会调用）
+        if (int(txid), int(rxid)) == self._address:
+            return
         new_address = isotp.Address(txid=txid, rxid=rxid)
         self.stack.set_address(new_address)
+        self._address = (int(txid), int(rxid))
 
     def shutdown(self):
         """关闭UDS客户端"""
@@ -271,11 +478,30 @@ class UDSClient(LoggerMixin):
 
 
 class _NotifierBasedConnection(udsoncan.connections.BaseConnection):
-    """为NotifierBasedCanStack定制的UDS连接类"""
+    """为NotifierBasedCanStack定制的UDS连接类
 
-    def __init__(self, isotp_stack: isotp.CanStack):
+    wait_mode:
+    - "event": 阻塞在 stack 的接收队列上, PDU 重组完成即唤醒（默认）
+    - "poll": 旧行为, 1ms 轮询 available()
+    """
+
+    WAIT_MODES = ("event", "poll")
+
+    def __init__(
+        self,
+        isotp_stack: isotp.CanStack,
+        wait_mode: str = "event",
+        latency: Optional[Tools.LatencyHistogram] = None,
+    ):
         self.isotp_stack = isotp_stack
         self.opened = False
+        wait_mode = str(wait_mode).strip().lower()
+        if wait_mode not in self.WAIT_MODES:
+            raise ValueError(f"wait_mode 必须为 {self.WAIT_MODES} 之一: {wait_mode}")
+        self.wait_mode = wait_mode
+        # 请求发出 -> 首个响应 PDU 的耗时
+        self.latency = latency if latency is not None else Tools.LatencyHistogram()
+        self._sent_at: Optional[float] = None
         super().__init__("NotifierBasedIsoTpConnection")
 
     def open(self) -> "_NotifierBasedConnection":
@@ -293,6 +519,7 @@ class _NotifierBasedConnection(udsoncan.connections.BaseConnection):
         """发送UDS请求"""
         if not self.opened:
             raise RuntimeError("连接未打开")
+        self._sent_at = time.perf_counter()
         self.isotp_stack.send(data)
 
     def specific_wait_frame(self, timeout: float = 2) -> bytes:
@@ -300,17 +527,25 @@ class _NotifierBasedConnection(udsoncan.connections.BaseConnection):
         if not self.opened:
             raise RuntimeError("连接未打开")
 
-        import time
-
-        end_time = time.time() + timeout
-        while time.time() < end_time:
-            if self.isotp_stack.available():
-                return self.isotp_stack.recv()
-            time.sleep(0.001)
-
-        raise udsoncan.exceptions.TimeoutException(
-            f"未在规定时间内收到响应 (timeout={timeout} sec)"
-        )
+        if self.wait_mode == "event":
+            payload = self.isotp_stack.recv(block=True, timeout=timeout)
+        else:
+            payload = None
+            end_time = time.time() + timeout
+            while time.time() < end_time:
+                if self.isotp_stack.available():
+                    payload = self.isotp_stack.recv()
+                    break
+                time.sleep(0.001)
+
+        if payload is None:
+            raise udsoncan.exceptions.TimeoutException(
+                f"未在规定时间内收到响应 (timeout={timeout} sec)"
+            )
+        if self._sent_at is not None:
+            self.latency.observe(time.perf_counter() - self._sent_at)
+            self._sent_at = None
+        return payload
 
     def empty_rxqueue(self) -> None:
         """清空接收队列"""
@@ -322,15 +557,62 @@ class _NotifierBasedConnection(udsoncan.connections.BaseConnection):
         return self.opened
 
 
+class _SlotSession:
+    """单个 slot 的会话/安全访问状态缓存。
+
+    ECU 在非默认会话下若超过 S3 时间未收到任何请求会自动回到默认会话并重新上锁,
+    因此以最近一次成功交互时间判断缓存是否仍然有效。
+    """
+
+    __slots__ = ("session", "security_level", "unlocked_at", "last_activity")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.session: int = 1
+        self.security_level: Optional[int] = None
+        self.unlocked_at: float = 0.0
+        self.last_activity: float = 0.0
+
+    def is_unlocked(
+        self, session: int, level: int, now: float, s3_timeout: float
+    ) -> bool:
+        return (
+            self.session == session
+            and self.security_level == level
+            and (now - self.last_activity) < s3_timeout
+        )
+
+    def needs_keepalive(self, now: float, interval: float, s3_timeout: float) -> bool:
+        if self.session == 1:
+            return False
+        idle = now - self.last_activity
+        return interval <= idle < s3_timeout
+
+
 class MultiSlotDiagnostic(LoggerMixin):
     """80-slot 诊断管理器。
 
-    - 为每个 slot 维护独立的 UDSClient（独立 stack/connection）
+    - 为每个 slot 维护独立的 UDSClient（独立 stack/connection）, 首次诊断时才创建
+    - 所有 stack 经同一个 _CanRxDemux 按 rxid 收帧, 每帧分发开销与 slot 数无关
     - 诊断前强制 update_address(tx, rx)（采集卡转发场景的正确用法）
     - Diagnostic：对 pending_slots 执行“成功一次即移除”, 结果写入 results
     - PeriodicDiag：对 periodic_slots 周期诊断；失败按 ReDiagInterval 更快重试
+    - 各 slot 的 ISO-TP 会话通过线程池并发执行, 同时在途数量受 MaxInFlight 限制
+    - 写 DID 前的扩展会话/安全访问按 slot 缓存, S3 超时前复用, 由 keepalive_tick 维持
     """
 
+    # 写 DID 使用的会话与安全等级
+    WRITE_SESSION = 3
+    WRITE_SECURITY_LEVEL = 1
+    # 这些 NRC 说明 ECU 已退出会话/重新上锁, 需要重新认证
+    _SESSION_LOST_NRC = {
+        udsoncan.Response.Code.ServiceNotSupportedInActiveSession,
+        udsoncan.Response.Code.SubFunctionNotSupportedInActiveSession,
+        udsoncan.Response.Code.SecurityAccessDenied,
+    }
+
     def __init__(
         self,
         bus: can.BusABC,
@@ -338,11 +620,10 @@ class MultiSlotDiagnostic(LoggerMixin):
         slot_count: int = 80,
         project_name: Optional[str] = None,
         project_cfg: Optional[dict] = None,
+        max_in_flight: Optional[int] = None,
     ):
         from Protocol import get_phy_addr_by_slot
 
-        import threading
-
         self.bus = bus
         self.notifier = notifier
         self.slot_count = int(slot_count)
@@ -352,8 +633,43 @@ class MultiSlotDiagnostic(LoggerMixin):
         self.project_cfg = project_cfg
         self.diag_cfg = self.project_cfg.get("Diag", self.project_cfg)
         self.remap = FUNCTION_CONFIG.get("UI", {}).get("Remap", False)
-        # 周期线程与外部调用可能并发：这里用一把锁保护状态与 isotp/uds 交互
+        # self._lock 只保护共享状态（结果表/调度表）；
+        # isotp/uds 交互按 slot 加锁, 不同 slot 之间可以并发
         self._lock = threading.Lock()
+        self._slot_locks: list[threading.Lock | None] = create_slot_table(
+            self.slot_count, default_factory=threading.Lock
+        )
+
+        # 并发诊断引擎：同时在途的 slot 会话数
+        if max_in_flight is None:
+            max_in_flight = FUNCTION_CONFIG.get("Diagnostic", {}).get("MaxInFlight", 8)
+        try:
+            max_in_flight = int(max_in_flight)
+        except Exception:
+            max_in_flight = 8
+        self.max_in_flight = max(1, min(max_in_flight, self.slot_count))
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_in_flight, thread_name_prefix="Diag"
+        )
+        # 每类 tick 的扫描耗时统计：{name: {last_s, max_s, avg_s, count, slots}}
+        self._sweep_stats: dict[str, dict[str, float]] = {}
+
+        # 会话缓存：S3 超时内复用已解锁的扩展会话, 按 TesterPresentInterval 保活
+        diag_func_cfg = FUNCTION_CONFIG.get("Diagnostic", {})
+        self.session_cache = bool(diag_func_cfg.get("SessionCache", True))
+        try:
+            self.s3_timeout_s = float(diag_func_cfg.get("S3Timeout", 5.0))
+        except Exception:
+            self.s3_timeout_s = 5.0
+        try:
+            self.tester_present_interval_s = float(
+                diag_func_cfg.get("TesterPresentInterval", 2.0)
+            )
+        except Exception:
+            self.tester_present_interval_s = 2.0
+        self._sessions: list[_SlotSession | None] = create_slot_table(
+            self.slot_count, default_factory=_SlotSession
+        )
 
         # slot 索引：外部使用 1..N；内部也用 1..N（index 0 为空）
         self._slot_addrs: list[tuple[int, int] | None] = create_slot_table(
@@ -362,17 +678,17 @@ class MultiSlotDiagnostic(LoggerMixin):
         for slot_id in range(1, self.slot_count + 1):
             self._slot_addrs[slot_id] = get_phy_addr_by_slot(slot_id)
 
-        # 80 个独立客户端对象（按 slot 固定初始化地址）
+        # 所有 slot 共用一个安全算法实例（DLL 入口只绑定一次）
+        self.security = SecurityAlgorithm(self.project_cfg)
+        # 完整解锁（27 seed + 计算 + 27 key）耗时
+        self._unlock_latency = Tools.LatencyHistogram()
+
+        # 所有 slot 的 stack 共用一个按 rxid 分发的 notifier 监听器
+        self._demux = _CanRxDemux()
+        self.notifier.add_listener(self._demux)
+
+        # 每个 slot 的客户端在首次诊断时才创建（按 slot 固定初始化地址）
         self.clients: list[UDSClient | None] = create_slot_table(self.slot_count)
-        for slot_id in range(1, self.slot_count + 1):
-            tx, rx = self._slot_addrs[slot_id]
-            self.clients[slot_id] = UDSClient(
-                bus,
-                notifier,
-                physical_tx=tx,
-                physical_rx=rx,
-                project_cfg=self.project_cfg,
-            )
 
         # Diagnostic: 待诊断 slot 列表（1-based）
         self.pending_slots: list[int] = []
@@ -412,13 +728,219 @@ class MultiSlotDiagnostic(LoggerMixin):
     def _validate_slot(self, slot: int) -> int:
         return validate_slot(int(slot), self.slot_count)
 
+    def _get_uds(self, slot: int) -> UDSClient:
+        uds = self.clients[slot]
+        if uds is None:
+            with self._lock:
+                uds = self.clients[slot]
+                if uds is None:
+                    tx, rx = self._slot_addrs[slot]
+                    uds = UDSClient(
+                        self.bus,
+                        self.notifier,
+                        physical_tx=tx,
+                        physical_rx=rx,
+                        project_cfg=self.project_cfg,
+                        security=self.security,
+                        demux=self._demux,
+                    )
+                    self.clients[slot] = uds
+        return uds
+
     def _ensure_client(self, slot: int) -> tuple[UDSClient, Client, int, int]:
         slot = self._validate_slot(slot)
-        uds = self.clients[slot].initialize()
+        uds = self._get_uds(slot).initialize()
         client = uds.get_client()
         tx, rx = self._slot_addrs[slot]
         return uds, client, tx, rx
 
+    def _run_slots(
+        self, slots: list[int], func: Callable[[int], Any]
+    ) -> dict[int, tuple[bool, Any]]:
+        """在线程池中并发执行 func(slot), 返回 {slot: (是否成功, 结果或异常)}。"""
+        if not slots:
+            return {}
+        if len(slots) == 1 or self.max_in_flight <= 1:
+            out: dict[int, tuple[bool, Any]] = {}
+            for slot in slots:
+                try:
+                    out[slot] = (True, func(slot))
+                except Exception as exc:
+                    out[slot] = (False, exc)
+            return out
+
+        futures = {slot: self._executor.submit(func, slot) for slot in slots}
+        out = {}
+        for slot, fut in futures.items():
+            try:
+                out[slot] = (True, fut.result())
+            except Exception as exc:
+                out[slot] = (False, exc)
+        return out
+
+    def _record_sweep(self, name: str, elapsed_s: float, slot_num: int) -> None:
+        with self._lock:
+            stats = self._sweep_stats.setdefault(
+                name,
+                {"last_s": 0.0, "max_s": 0.0, "avg_s": 0.0, "count": 0, "slots": 0},
+            )
+            stats["count"] += 1
+            stats["last_s"] = elapsed_s
+            stats["max_s"] = max(stats["max_s"], elapsed_s)
+            stats["avg_s"] += (elapsed_s - stats["avg_s"]) / stats["count"]
+            stats["slots"] = slot_num
+        if slot_num:
+            self.log.debug(
+                f"{name} 扫描完成: {slot_num} 个slot, 耗时 {elapsed_s:.3f}s "
+                f"(MaxInFlight={self.max_in_flight})"
+            )
+
+    def sweep_metrics(self) -> dict[str, dict[str, float]]:
+        """返回各类周期 tick 的扫描耗时统计。"""
+        with self._lock:
+            return {name: dict(stats) for name, stats in self._sweep_stats.items()}
+
+    def _touch_session(self, slot: int) -> None:
+        """slot 有成功交互时刷新 S3 计时（需持有 slot 锁）。"""
+        state = self._sessions[slot]
+        if state.session != 1:
+            state.last_activity = time.monotonic()
+
+    def invalidate_session(self, slot: int) -> None:
+        """清除 slot 的会话缓存, 下次写入时重新切换会话并解锁。"""
+        slot = self._validate_slot(int(slot))
+        self._sessions[slot].reset()
+
+    def _is_session_lost(self, exc: Exception) -> bool:
+        if isinstance(exc, udsoncan.exceptions.TimeoutException):
+            return True
+        if isinstance(exc, udsoncan.exceptions.NegativeResponseException):
+            return exc.response.code in self._SESSION_LOST_NRC
+        return False
+
+    def _ensure_unlocked(self, slot: int, client: Client) -> bool:
+        """确保 slot 处于写会话且已解锁（需持有 slot 锁）。
+
+        缓存仍在 S3 有效期内时直接返回, 否则执行 change_session + unlock。
+        """
+        state = self._sessions[slot]
+        if self.session_cache and state.is_unlocked(
+            self.WRITE_SESSION,
+            self.WRITE_SECURITY_LEVEL,
+            time.monotonic(),
+            self.s3_timeout_s,
+        ):
+            return True
+
+        state.reset()
+        try:
+            rsp = client.change_session(self.WRITE_SESSION)
+        except Exception as exc:
+            self.log.error(f"Slot {slot} 切换会话异常: {exc}")
+            return False
+        if not rsp.positive:
+            self.log.warning(f"Slot {slot} 切换会话失败, 响应码: {rsp.code_name}")
+            return False
+        state.session = self.WRITE_SESSION
+        state.last_activity = time.monotonic()
+
+        self.log.debug(f"Slot {slot} 切换会话成功, 开始安全访问")
+        try:
+            with self._unlock_latency.measure():
+                rsp = client.unlock_security_access(self.WRITE_SECURITY_LEVEL)
+        except Exception as exc:
+            self.log.error(f"Slot {slot} 安全访问异常: {exc}")
+            return False
+        if not rsp.positive:
+            self.log.warning(f"Slot {slot} 安全访问失败, 响应码: {rsp.code_name}")
+            return False
+        state.security_level = self.WRITE_SECURITY_LEVEL
+        state.unlocked_at = state.last_activity = time.monotonic()
+        return True
+
+    def latency_histograms(
+        self, slots: int | list[int] | None = None
+    ) -> dict[int, dict]:
+        """返回各 slot 的请求/响应耗时直方图；未指定 slots 时只返回有数据的 slot。"""
+        if slots is None:
+            slots = [s for s in range(1, self.slot_count + 1) if self.clients[s]]
+        elif isinstance(slots, int):
+            slots = [slots]
+        slots = normalize_slots(slots, self.slot_count)
+        out: dict[int, dict] = {}
+        for slot in slots:
+            uds = self.clients[slot]
+            if uds is not None:
+                out[slot] = uds.latency.snapshot()
+        return out
+
+    def unlock_metrics(self) -> dict[str, dict]:
+        """返回解锁耗时统计：unlock 为完整安全访问, key_calc 为密钥计算。"""
+        return {
+            "unlock": self._unlock_latency.snapshot(),
+            "key_calc": self.security.latency.snapshot(),
+        }
+
+    def session_snapshot(self) -> dict[int, dict[str, Any]]:
+        """返回处于非默认会话的 slot 的会话缓存状态。"""
+        now = time.monotonic()
+        out: dict[int, dict[str, Any]] = {}
+        for slot in range(1, self.slot_count + 1):
+            state = self._sessions[slot]
+            if state.session == 1:
+                continue
+            out[slot] = {
+                "session": state.session,
+                "security_level": state.security_level,
+                "unlocked_for_s": (
+                    round(now - state.unlocked_at, 3) if state.unlocked_at else None
+                ),
+                "idle_s": round(now - state.last_activity, 3),
+            }
+        return out
+
+    def keepalive_tick(self) -> dict[str, Any]:
+        """对处于扩展会话且空闲超过 TesterPresentInterval 的 slot 发送 TesterPresent。
+
+        slot 正在进行其它诊断时跳过（那次交互本身就会刷新 S3）。
+        """
+        now = time.monotonic()
+        interval_s = self.tester_present_interval_s
+        s3_s = self.s3_timeout_s
+        due = [
+            slot
+            for slot in range(1, self.slot_count + 1)
+            if self._sessions[slot].needs_keepalive(now, interval_s, s3_s)
+        ]
+
+        def _keepalive(slot: int) -> bool:
+            lock = self._slot_locks[slot]
+            if not lock.acquire(blocking=False):
+                return False
+            try:
+                state = self._sessions[slot]
+                if not state.needs_keepalive(time.monotonic(), interval_s, s3_s):
+                    return False
+                uds, client, tx, rx = self._ensure_client(slot)
+                uds.update_address(tx, rx)
+                try:
+                    with client:
+                        with client.suppress_positive_response:
+                            client.tester_present()
+                except Exception as exc:
+                    state.reset()
+                    self.log.warning(f"Slot {slot} TesterPresent 失败, 会话已失效: {exc}")
+                    raise
+                state.last_activity = time.monotonic()
+                return True
+            finally:
+                lock.release()
+
+        outcome = self._run_slots(due, _keepalive)
+        sent = [slot for slot, (ok, value) in outcome.items() if ok and value]
+        lost = [slot for slot, (ok, _) in outcome.items() if not ok]
+        return {"__ts__": time.time(), "sent": sent, "lost": lost}
+
     def _get_did_cfg(self) -> dict:
         diag_cfg = self.diag_cfg or {}
         return diag_cfg.get("DidConfig") or self.project_cfg.get("did_config") or {}
@@ -509,7 +1031,8 @@ class MultiSlotDiagnostic(LoggerMixin):
         return value
 
     def read_dids(self, slot: int, dids: list[str]) -> dict[str, Any]:
-        with self._lock:
+        slot = self._validate_slot(int(slot))
+        with self._slot_locks[slot]:
             uds, client, tx, rx = self._ensure_client(slot)
             # 采集卡转发：每次诊断前必须更新物理地址
             uds.update_address(tx, rx)
@@ -521,12 +1044,14 @@ class MultiSlotDiagnostic(LoggerMixin):
                     rsp = client.read_data_by_identifier(did_int)
                     raw = _extract_rdbi_value(rsp, did_int)
                     out[did_hex] = self._decode_did_value(did_hex, raw)
+                    self._touch_session(slot)
             return out
 
     def write_dids(
         self, slot: int, dids: list[str], values: Optional[dict[str, Any]] = None
     ) -> dict[str, Any]:
-        with self._lock:
+        slot = self._validate_slot(int(slot))
+        with self._slot_locks[slot]:
             uds, client, tx, rx = self._ensure_client(slot)
             self.log.debug(
                 f"Slot {slot} 开始写入 DIDs: {dids}, Values: {values}. with TX {tx}, RX {rx}"
@@ -539,39 +1064,14 @@ class MultiSlotDiagnostic(LoggerMixin):
 
             out: dict[str, Any] = {}
             with client:
-                # 先切换会话与安全访问（只做一次）
-                try:
-                    rsp = client.change_session(3)
-                except Exception as exc:
-                    self.log.error(f"Slot {slot} 切换会话异常: {exc}")
-                    for did_hex in dids:
-                        out[did_hex] = None
-                    return out
-
-                if rsp.positive:
-                    self.log.debug(f"Slot {slot} 切换会话成功, 开始安全访问")
-                    try:
-                        rsp = client.unlock_security_access(1)
-                    except Exception as exc:
-                        self.log.error(f"Slot {slot} 安全访问异常: {exc}")
-                        for did_hex in dids:
-                            out[did_hex] = None
-                        return out
-
-                    if not rsp.positive:
-                        self.log.warning(
-                            f"Slot {slot} 安全访问失败, 响应码: {rsp.code_name}"
-                        )
-                else:
-                    self.log.warning(
-                        f"Slot {slot} 切换会话失败, 响应码: {rsp.code_name}"
-                    )
-
-                if not rsp.positive:
+                # 会话与安全访问：缓存有效时跳过
+                if not self._ensure_unlocked(slot, client):
+                    self._sessions[slot].reset()
                     for did_hex in dids:
                         out[did_hex] = None
                     return out
 
+                retried = False
                 for did_hex in dids:
                     did_int = Tools.hex_to_int(did_hex)
                     info = did_cfg.get(did_hex) or {}
@@ -588,9 +1088,28 @@ class MultiSlotDiagnostic(LoggerMixin):
                     try:
                         rsp = client.write_data_by_identifier(did_int, payload)
                     except Exception as exc:
-                        out[did_hex] = None
-                        self.log.error(f"Slot {slot} DID {did_hex} 写入异常: {exc}")
-                        continue
+                        rsp = None
+                        # 会话已失效（ECU 复位/S3 超时）：重新认证并重试一次
+                        if not retried and self._is_session_lost(exc):
+                            retried = True
+                            self.log.info(
+                                f"Slot {slot} DID {did_hex} 写入时会话已失效, 重新认证: {exc}"
+                            )
+                            self._sessions[slot].reset()
+                            if self._ensure_unlocked(slot, client):
+                                try:
+                                    rsp = client.write_data_by_identifier(
+                                        did_int, payload
+                                    )
+                                except Exception as retry_exc:
+                                    exc = retry_exc
+                        if rsp is None:
+                            out[did_hex] = None
+                            if self._is_session_lost(exc):
+                                self._sessions[slot].reset()
+                            self.log.error(f"Slot {slot} DID {did_hex} 写入异常: {exc}")
+                            continue
+                    self._touch_session(slot)
                     if rsp.positive:
                         out[did_hex] = _extract_rdbi_value(rsp, did_int)
                     else:
@@ -615,7 +1134,8 @@ class MultiSlotDiagnostic(LoggerMixin):
     def _read_dtc_by_slot(
         self, slot: int, subfunction: int, status_mask: int
     ) -> list[dict[str, Any]]:
-        with self._lock:
+        slot = self._validate_slot(int(slot))
+        with self._slot_locks[slot]:
             uds, client, tx, rx = self._ensure_client(slot)
             # 采集卡转发：每次诊断前必须更新物理地址
             uds.update_address(tx, rx)
@@ -626,6 +1146,7 @@ class MultiSlotDiagnostic(LoggerMixin):
                     subfunction=int(subfunction),
                     status_mask=int(status_mask),
                 )
+                self._touch_session(slot)
                 self.log.debug(f"Read Dtc Result:{(rsp.data).hex()}")
                 if rsp.positive:
                     dtc_list = self.format_dtc_list(rsp.data)
@@ -652,14 +1173,16 @@ class MultiSlotDiagnostic(LoggerMixin):
         if status_mask is None:
             status_mask = int(self.dtc_status_mask)
 
+        outcome = self._run_slots(
+            slots,
+            lambda slot: self._read_dtc_by_slot(
+                slot, subfunction=subfunction, status_mask=status_mask
+            ),
+        )
         results: dict[int, list[dict[str, Any]]] = {}
         for slot in slots:
-            try:
-                results[slot] = self._read_dtc_by_slot(
-                    slot, subfunction=subfunction, status_mask=status_mask
-                )
-            except Exception:
-                results[slot] = []
+            success, value = outcome[slot]
+            results[slot] = value if success else []
         return results
 
     # -------- Diagnostic (one-shot success) --------
@@ -701,27 +1224,33 @@ class MultiSlotDiagnostic(LoggerMixin):
             else:
                 read_dids.append(did)
 
+        def _diag_slot(slot: int) -> None:
+            data: dict[str, Any] = {}
+            if read_dids:
+                data.update(self.read_dids(slot, read_dids))
+            if write_dids:
+                values = {
+                    did: (did_cfg.get(did) or {}).get("value")
+                    or (did_cfg.get(did) or {}).get("Value")
+                    for did in write_dids
+                }
+                data.update(
+                    self.write_dids(
+                        remap_slot(slot) if self.remap else slot, write_dids, values
+                    )
+                )  # 诊断穴位重映射.
+            with self._lock:
+                set_slot_value(self.results, slot, data, self.slot_count)
+
+        started = time.perf_counter()
+        outcome = self._run_slots(slots, _diag_slot)
+        self._record_sweep("Diagnostic", time.perf_counter() - started, len(slots))
         for slot in slots:
-            try:
-                data: dict[str, Any] = {}
-                if read_dids:
-                    data.update(self.read_dids(slot, read_dids))
-                if write_dids:
-                    values = {
-                        did: (did_cfg.get(did) or {}).get("value")
-                        or (did_cfg.get(did) or {}).get("Value")
-                        for did in write_dids
-                    }
-                    data.update(
-                        self.write_dids(
-                            remap_slot(slot) if self.remap else slot, write_dids, values
-                        )
-                    )  # 诊断穴位重映射.
-                with self._lock:
-                    set_slot_value(self.results, slot, data, self.slot_count)
+            success, value = outcome[slot]
+            if success:
                 ok.append(slot)
-            except Exception as exc:
-                fail[slot] = str(exc)
+            else:
+                fail[slot] = str(value)
 
         # 成功一次后移除
         if ok:
@@ -788,7 +1317,6 @@ class MultiSlotDiagnostic(LoggerMixin):
 
     def periodic_dtc_tick(self) -> dict[str, Any]:
         now = time.time()
-        ran: list[int] = []
 
         with self._lock:
             slots = list(self.dtc_periodic_slots)
@@ -796,12 +1324,10 @@ class MultiSlotDiagnostic(LoggerMixin):
             subfunction = int(self.dtc_subfunction)
             status_mask = int(self.dtc_status_mask)
 
-        for slot in slots:
-            with self._lock:
-                due = self._dtc_next_due.get(slot, now)
-            if now < due:
-                continue
-            ran.append(slot)
+        with self._lock:
+            ran = [s for s in slots if now >= self._dtc_next_due.get(s, now)]
+
+        def _dtc_slot(slot: int) -> None:
             try:
                 data = self._read_dtc_by_slot(slot, subfunction, status_mask)
                 with self._lock:
@@ -814,10 +1340,16 @@ class MultiSlotDiagnostic(LoggerMixin):
                     set_slot_value(self.dtc_last_error, slot, str(exc), self.slot_count)
                     self._dtc_next_due[slot] = now + interval_s
 
+        started = time.perf_counter()
+        self._run_slots(ran, _dtc_slot)
+        elapsed = time.perf_counter() - started
+        self._record_sweep("PeriodicReadDtc", elapsed, len(ran))
+
         return {
             "__ts__": now,
             "slots": slots,
             "ran": ran,
+            "elapsed": elapsed,
         }
 
     def periodic_dtc_snapshot(self) -> dict[str, Any]:
@@ -840,7 +1372,6 @@ class MultiSlotDiagnostic(LoggerMixin):
 
     def periodic_tick(self) -> dict[str, Any]:
         now = time.time()
-        ran: list[int] = []
 
         with self._lock:
             slots = list(self.periodic_slots)
@@ -876,12 +1407,10 @@ class MultiSlotDiagnostic(LoggerMixin):
                 else:
                     read_list.append(did)
 
-        for slot in slots:
-            with self._lock:
-                due = self._periodic_next_due.get(slot, now)
-            if now < due:
-                continue
-            ran.append(slot)
+        with self._lock:
+            ran = [s for s in slots if now >= self._periodic_next_due.get(s, now)]
+
+        def _periodic_slot(slot: int) -> None:
             try:
                 data: dict[str, Any] = {}
 
@@ -924,10 +1453,16 @@ class MultiSlotDiagnostic(LoggerMixin):
                     )
                     self._periodic_next_due[slot] = now + rediag_s
 
+        started = time.perf_counter()
+        self._run_slots(ran, _periodic_slot)
+        elapsed = time.perf_counter() - started
+        self._record_sweep("PeriodicDiag", elapsed, len(ran))
+
         return {
             "__ts__": now,
             "slots": slots,
             "ran": ran,
+            "elapsed": elapsed,
         }
 
     def periodic_snapshot(self) -> dict[str, Any]:
@@ -939,9 +1474,31 @@ class MultiSlotDiagnostic(LoggerMixin):
                 "error": list(self.periodic_last_error),
             }
 
+    def slots_snapshot(
+        self, slots: list[int]
+    ) -> dict[int, tuple[Optional[dict], Optional[dict], Optional[list]]]:
+        """一次加锁取出多个 slot 的 (诊断结果, 周期诊断, DTC), 只读取请求的元素"""
+        results = self.results
+        periodic = self.periodic_last
+        dtc = self.dtc_last
+        size = len(results)
+        with self._lock:
+            return {
+                slot: (results[slot], periodic[slot], dtc[slot])
+                for slot in slots
+                if 0 < slot < size
+            }
+
     def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
         for uds in self.clients:
+            if uds is None:
+                continue
             try:
                 uds.shutdown()
             except Exception:
                 pass
+        try:
+            self.notifier.remove_listener(self._demux)
+        except Exception:
+            pass
@@ -1,3 +1,4 @@
+import Tools
 from Tools import FUNCTION_CONFIG, PROJECT_CONFIG
 
 SETTING_SLAVE_ID = 0
@@ -42,9 +43,19 @@ _GLOBAL_ID_TO_KEY = {
 }
 
 
+_OFFSET_TO_NAME = {
+    STATUS_OFFSET: "STATUS",
+    DIAG_RX_OFFSET: "DIAG_RX",
+    DIAG_TX_OFFSET: "DIAG_TX",
+    APP_RX1_OFFSET: "APP_RX1",
+    APP_RX2_OFFSET: "APP_RX2",
+}
+
+
 def _is_channel_remap_enabled() -> bool:
     """是否启用通道重映射（CH1/CH2 互换）"""
-    ui_cfg = FUNCTION_CONFIG.get("UI", {})
+    # 读取 Tools 模块上的最新配置（refresh_configs 会重新绑定该全局变量）
+    ui_cfg = Tools.FUNCTION_CONFIG.get("UI", {})
     val = ui_cfg.get("Remap", False)
 
     # 兼容 bool/int/str 配置
@@ -122,16 +133,8 @@ def split_by_can_id(can_id: int) -> str:
         mcu_channel = "CH1"
         channel_offset = offset - CH1_INFO_OFFSET
 
-    offset_to_name = {
-        STATUS_OFFSET: "STATUS",
-        DIAG_RX_OFFSET: "DIAG_RX",
-        DIAG_TX_OFFSET: "DIAG_TX",
-        APP_RX1_OFFSET: "APP_RX1",
-        APP_RX2_OFFSET: "APP_RX2",
-    }
-
     try:
-        suffix = offset_to_name[channel_offset]
+        suffix = _OFFSET_TO_NAME[channel_offset]
     except KeyError as exc:
         raise ValueError(
             f"Unknown CAN ID offset: can_id={can_id}, offset={offset}"
@@ -146,6 +149,31 @@ def split_by_can_id(can_id: int) -> str:
     return f"{out_channel}_{suffix}"
 
 
+def build_rx_route_table(
+    slave_count: int = SLAVE_COUNT,
+) -> dict[int, tuple[str, int]]:
+    """预先计算接收路由表：can_id -> (分流键名, slot)。
+
+    结果与逐帧调用 split_by_can_id / get_slot_id_by_can_id 一致（含 Remap）,
+    供接收线程 O(1) 查表；Remap 配置变化后需重新生成。
+    全局/本机发送类 ID 的 slot 无意义, 固定为 0。
+    """
+    table: dict[int, tuple[str, int]] = {
+        can_id: (key, 0) for can_id, key in _GLOBAL_ID_TO_KEY.items()
+    }
+    # 站点编号为奇数 1..2*slave_count-1, 每站点占用 [站点*10+1, 站点*10+10]
+    max_can_id = (2 * int(slave_count) + 1) * MAGNIFICATION
+    for can_id in range(MAGNIFICATION, max_can_id):
+        if can_id in table:
+            continue
+        try:
+            key = split_by_can_id(can_id)
+        except ValueError:
+            continue
+        table[can_id] = (key, get_slot_id_by_can_id(can_id))
+    return table
+
+
 def get_phy_addr_by_slot(slot_id: int) -> tuple[int, int]:
     """根据采集卡索引获取物理地址。
 
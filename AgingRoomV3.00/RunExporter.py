@@ -0,0 +1,409 @@
+"""老化批次原始数据导出为 Parquet / Arrow IPC, 供离线分析:
+- 分块读取 (fetchmany), 每块转换为 RecordBatch 后立即写出, 内存占用与批次大小无关
+- JSON 列展开为带类型的列: rx1.<信号>、rx2.<信号>、diag.<DID>, DtcCodes 展开为 dtc_count/dtc_codes
+- 同一 payload 文本 (compact 布局下同一 Payloads.Id) 只解析一次
+"""
+
+import os
+import json
+import sqlite3
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from Logger import LoggerMixin
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+except ImportError:  # 可选依赖, 只有原始数据导出需要
+    pa = pa_ipc = pq = None
+
+FORMAT_PARQUET = "parquet"
+FORMAT_ARROW = "arrow"
+
+# JSON 列 -> 展开后的列名前缀
+_JSON_COLUMNS = (("AdditionalInfo_1", "rx1"), ("AdditionalInfo_2", "rx2"), ("DiagResults", "diag"))
+_COMPACT_REFS = {"AdditionalInfo_1": "Rx1Ref", "AdditionalInfo_2": "Rx2Ref", "DiagResults": "DiagRef"}
+
+# 展开值的类型从窄到宽, 同一列出现多种类型时取最宽
+_KIND_ORDER = {"bool": 0, "int": 1, "float": 2, "str": 3}
+
+# 已解析 payload 缓存上限, 超出后清空重建
+_FLAT_CACHE_LIMIT = 50_000
+
+
+def available() -> bool:
+    return pa is not None
+
+
+def _flatten(value: Any, prefix: str, out: Dict[str, Any]) -> None:
+    if isinstance(value, dict):
+        for key, sub in value.items():
+            _flatten(sub, f"{prefix}.{key}", out)
+    elif isinstance(value, list):
+        out[prefix] = json.dumps(value, ensure_ascii=False)
+    else:
+        out[prefix] = value
+
+
+def _flatten_body(body: Optional[str], prefix: str) -> Dict[str, Any]:
+    if not body:
+        return {}
+    try:
+        value = json.loads(body)
+    except ValueError:
+        return {prefix: body}
+    if value is None:
+        return {}
+    out: Dict[str, Any] = {}
+    _flatten(value, prefix, out)
+    return out
+
+
+def _dtc_fields(body: Optional[str]) -> Tuple[Optional[int], Optional[str]]:
+    if not body:
+        return None, None
+    try:
+        items = json.loads(body)
+    except ValueError:
+        return None, body
+    if not isinstance(items, list):
+        return None, body
+    codes = []
+    for item in items:
+        code = item.get("DTC") if isinstance(item, dict) else item
+        if code is not None:
+            codes.append(str(code))
+    return len(codes), ",".join(codes)
+
+
+def _kind(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int):
+        return "int"
+    if isinstance(value, float):
+        return "float"
+    return "str"
+
+
+def _arrow_type(kind: str):
+    return {
+        "bool": pa.bool_(),
+        "int": pa.int64(),
+        "float": pa.float64(),
+        "str": pa.string(),
+    }[kind]
+
+
+class _PayloadSource:
+    """按布局读取一张批次表: 数值列 + 四个 JSON 文本 (compact 布局下为 Payloads 引用)"""
+
+    def __init__(self, conn: sqlite3.Connection, table_name: str):
+        self.conn = conn
+        self.table_name = table_name
+        row = None
+        try:
+            row = conn.execute(
+                "SELECT Layout FROM TableMeta WHERE TableName=?", (table_name,)
+            ).fetchone()
+        except sqlite3.Error:
+            pass
+        self.compact = bool(row) and row[0] == "compact"
+        self._bodies: Dict[int, Optional[str]] = {}
+
+    def distinct_bodies(self, column: str) -> Iterator[str]:
+        """某个 JSON 列的所有不同取值, 用于在写出前确定展开列与类型"""
+        if self.compact:
+            ref = _COMPACT_REFS[column]
+            cursor = self.conn.execute(
+                f'SELECT Body FROM Payloads WHERE Id IN (SELECT DISTINCT {ref} FROM "{self.table_name}_rows")'
+            )
+        else:
+            cursor = self.conn.execute(
+                f'SELECT DISTINCT {column} FROM "{self.table_name}" WHERE {column} IS NOT NULL'
+            )
+        for (body,) in cursor:
+            yield body
+
+    def rows(self, chunk_rows: int) -> Iterator[List[Tuple[Any, ...]]]:
+        """分块返回 (Id, Slot, Timestamp, Status, Voltage, Current, Temperature, Dtc, Rx1, Rx2, Diag);
+        compact 布局下后四列是 Payloads.Id"""
+        if self.compact:
+            sql = (
+                "SELECT Id, Slot, Timestamp, Status, Voltage, Current, Temperature, "
+                f'DtcRef, Rx1Ref, Rx2Ref, DiagRef FROM "{self.table_name}_rows" ORDER BY Id'
+            )
+        else:
+            sql = f'SELECT * FROM "{self.table_name}" ORDER BY Id'
+        cursor = self.conn.execute(sql)
+        while True:
+            chunk = cursor.fetchmany(chunk_rows)
+            if not chunk:
+                return
+            yield chunk
+
+    def body(self, ref: Any) -> Optional[str]:
+        if not self.compact or ref is None:
+            return ref
+        body = self._bodies.get(ref)
+        if body is None and ref not in self._bodies:
+            row = self.conn.execute("SELECT Body FROM Payloads WHERE Id=?", (ref,)).fetchone()
+            body = row[0] if row else None
+            if len(self._bodies) >= _FLAT_CACHE_LIMIT:
+                self._bodies.clear()
+            self._bodies[ref] = body
+        return body
+
+
+class RunExporter(LoggerMixin):
+    """把一张或多张老化批次表流式导出为一个 Parquet / Arrow IPC 文件"""
+
+    def __init__(
+        self,
+        path_for: Callable[[str], Optional[str]],
+        chunk_rows: int = 50_000,
+        compression: str = "zstd",
+    ):
+        if pa is None:
+            raise RuntimeError("pyarrow is required for Parquet/Arrow export")
+        self._path_for = path_for
+        self.chunk_rows = max(1000, int(chunk_rows))
+        self.compression = compression
+        self._conns: Dict[str, sqlite3.Connection] = {}
+        # 当前导出各批次表名的字典列取值, export 开始时设置, _batch 按下标引用
+        self._table_dict = pa.array([], pa.string())
+
+    def _source(self, table_name: str) -> Optional[_PayloadSource]:
+        path = self._path_for(table_name)
+        if path is None:
+            self.log.warning(f"Export skipped, {table_name} has expired")
+            return None
+        conn = self._conns.get(path)
+        if conn is None:
+            conn = self._conns[path] = sqlite3.connect(path)
+        return _PayloadSource(conn, table_name)
+
+    def _close(self) -> None:
+        for conn in self._conns.values():
+            conn.close()
+        self._conns.clear()
+
+    def _scan_schema(self, sources: Iterable[_PayloadSource]):
+        """预扫描所有 JSON 列的不同取值 (已去重, 远少于行数), 得到展开列及其类型"""
+        kinds: Dict[str, str] = {}
+        for source in sources:
+            for column, prefix in _JSON_COLUMNS:
+                for body in source.distinct_bodies(column):
+                    for key, value in _flatten_body(body, prefix).items():
+                        kind = _kind(value)
+                        if kind is None:
+                            continue
+                        old = kinds.get(key)
+                        if old is None or _KIND_ORDER[kind] > _KIND_ORDER[old]:
+                            kinds[key] = kind
+        fields = [
+            pa.field("table", pa.dictionary(pa.int16(), pa.string())),
+            pa.field("Id", pa.int64()),
+            pa.field("Slot", pa.int32()),
+            pa.field("Timestamp", pa.float64()),
+            pa.field("Time", pa.timestamp("ms", tz="UTC")),
+            pa.field("Status", pa.int8()),
+            pa.field("Voltage", pa.float64()),
+            pa.field("Current", pa.float64()),
+            pa.field("Temperature", pa.float64()),
+            pa.field("dtc_count", pa.int16()),
+            pa.field("dtc_codes", pa.string()),
+        ]
+        # 列顺序固定: 按前缀分组, 组内按名称排序
+        order = {prefix: i for i, (_, prefix) in enumerate(_JSON_COLUMNS)}
+        flat_keys = sorted(kinds, key=lambda k: (order[k.split(".", 1)[0]], k))
+        fields += [pa.field(key, _arrow_type(kinds[key])) for key in flat_keys]
+        return pa.schema(fields), flat_keys, kinds
+
+    def _flat(
+        self,
+        source: _PayloadSource,
+        j: int,
+        ref: Any,
+        kinds: Dict[str, str],
+        flat_cache: Dict[Tuple[int, Any], Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        flat = flat_cache.get((j, ref))
+        if flat is None:
+            flat = _flatten_body(source.body(ref), _JSON_COLUMNS[j][1])
+            # 类型按预扫描结果统一, 如 float 列中的整数、文本列中的数值
+            for key, value in flat.items():
+                kind = kinds.get(key)
+                if kind == "str" and value is not None and not isinstance(value, str):
+                    flat[key] = str(value)
+                elif kind == "float" and isinstance(value, (bool, int)):
+                    flat[key] = float(value)
+                elif kind == "int" and isinstance(value, bool):
+                    flat[key] = int(value)
+            if len(flat_cache) >= _FLAT_CACHE_LIMIT:
+                flat_cache.clear()
+            flat_cache[(j, ref)] = flat
+        return flat
+
+    def _batch(
+        self,
+        source: _PayloadSource,
+        table_index: int,
+        chunk: List[Tuple[Any, ...]],
+        schema,
+        flat_keys: List[str],
+        kinds: Dict[str, str],
+        flat_cache: Dict[Tuple[int, Any], Dict[str, Any]],
+    ):
+        """一块行转为 RecordBatch: 数值列直接转置; JSON 列只对块内不同的 payload 展开一次,
+        再按下标 take 成整列 (payload 高度重复, 逐行展开是导出的主要开销)"""
+        n = len(chunk)
+        columns = list(zip(*chunk))
+        ts = columns[2]
+        arrays = [
+            # 所有批次共用同一个表名字典, Arrow IPC 文件格式不允许中途替换字典
+            pa.DictionaryArray.from_arrays(
+                pa.array([table_index] * n, pa.int16()), self._table_dict
+            ),
+            pa.array(columns[0], pa.int64()),
+            pa.array(columns[1], pa.int32()),
+            pa.array(ts, pa.float64()),
+            pa.array(
+                [None if t is None else int(t * 1000) for t in ts],
+                pa.timestamp("ms", tz="UTC"),
+            ),
+            pa.array(columns[3], pa.int8()),
+            pa.array(columns[4], pa.float64()),
+            pa.array(columns[5], pa.float64()),
+            pa.array(columns[6], pa.float64()),
+        ]
+
+        def _encode(refs):
+            positions: Dict[Any, int] = {}
+            indices = [positions.setdefault(r, len(positions)) for r in refs]
+            return list(positions), pa.array(indices, pa.int32())
+
+        uniq, indices = _encode(columns[7])
+        dtc = [_dtc_fields(source.body(r)) for r in uniq]
+        arrays.append(pa.array([d[0] for d in dtc], pa.int16()).take(indices))
+        arrays.append(pa.array([d[1] for d in dtc], pa.string()).take(indices))
+
+        by_key: Dict[str, Any] = {}
+        for j, (_, prefix) in enumerate(_JSON_COLUMNS):
+            uniq, indices = _encode(columns[8 + j])
+            flats = [
+                self._flat(source, j, r, kinds, flat_cache) if r is not None else {}
+                for r in uniq
+            ]
+            for key in flat_keys:
+                if key.startswith(prefix + "."):
+                    values = pa.array([f.get(key) for f in flats], _arrow_type(kinds[key]))
+                    by_key[key] = values.take(indices)
+        arrays += [
+            by_key[key] if key in by_key else pa.nulls(n, _arrow_type(kinds[key]))
+            for key in flat_keys
+        ]
+        return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+    def export(
+        self,
+        table_names: List[str],
+        file_path: str,
+        fmt: Optional[str] = None,
+        progress: Optional[Callable[[int], None]] = None,
+    ) -> dict:
+        """导出到 file_path, fmt 为空时按扩展名判断 (.parquet / .arrow .feather .ipc)
+
+        返回 {"tables", "rows", "seconds", "rows_per_s", "bytes", "columns"}; progress(累计行数) 每块回调一次。
+        """
+        if fmt is None:
+            ext = os.path.splitext(file_path)[1].lower()
+            fmt = FORMAT_PARQUET if ext in (".parquet", ".pq") else FORMAT_ARROW
+        if fmt not in (FORMAT_PARQUET, FORMAT_ARROW):
+            raise ValueError(f"Unsupported export format: {fmt}")
+
+        started = time.perf_counter()
+        rows_total = 0
+        tables_done = 0
+        try:
+            sources = [s for s in (self._source(t) for t in table_names) if s is not None]
+            self._table_dict = pa.array([s.table_name for s in sources], pa.string())
+            schema, flat_keys, kinds = self._scan_schema(sources)
+            if fmt == FORMAT_PARQUET:
+                writer = pq.ParquetWriter(file_path, schema, compression=self.compression)
+            else:
+                sink = pa.OSFile(file_path, "wb")
+                writer = pa_ipc.new_file(
+                    sink, schema, options=pa_ipc.IpcWriteOptions(compression=self.compression)
+                )
+            try:
+                for table_index, source in enumerate(sources):
+                    flat_cache: Dict[Tuple[int, Any], Dict[str, Any]] = {}
+                    for chunk in source.rows(self.chunk_rows):
+                        batch = self._batch(
+                            source, table_index, chunk, schema, flat_keys, kinds, flat_cache
+                        )
+                        if fmt == FORMAT_PARQUET:
+                            writer.write_batch(batch, row_group_size=self.chunk_rows)
+                        else:
+                            writer.write_batch(batch)
+                        rows_total += len(chunk)
+                        if progress is not None:
+                            progress(rows_total)
+                    tables_done += 1
+            finally:
+                writer.close()
+                if fmt == FORMAT_ARROW:
+                    sink.close()
+        finally:
+            self._close()
+
+        seconds = time.perf_counter() - started
+        stats = {
+            "tables": tables_done,
+            "rows": rows_total,
+            "seconds": round(seconds, 3),
+            "rows_per_s": int(rows_total / seconds) if seconds > 0 else 0,
+            "bytes": os.path.getsize(file_path),
+            "columns": len(schema),
+        }
+        self.log.info(
+            f"Exported {rows_total} rows from {tables_done} tables to {os.path.basename(file_path)} "
+            f"in {seconds:.2f}s ({stats['rows_per_s']} rows/s, {stats['bytes'] / 1e6:.1f} MB)"
+        )
+        return stats
+
+
+def tables_in_range(conn: sqlite3.Connection, start: str, end: Optional[str] = None) -> List[str]:
+    """Summary 中日期前缀在 [start, end] 内的批次表 (前缀可为 yyyy / yyyy_mm / yyyy_mm_dd)"""
+    end = end or start
+    rows = conn.execute(
+        "SELECT TableName FROM Summary WHERE DatePrefix >= ? AND DatePrefix < ? ORDER BY TableName",
+        (start, end + "~"),
+    ).fetchall()
+    return [row[0] for row in rows]
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 4:
+        print("usage: python RunExporter.py <db> <表名 | 日期前缀[..日期前缀]> <输出.parquet|.arrow>")
+        sys.exit(1)
+
+    from DataBaseWorker import DataBaseWorker
+
+    db_worker = DataBaseWorker(sys.argv[1])
+    target, out = sys.argv[2], sys.argv[3]
+    if ".." in target or len(target) < 13:
+        start, _, end = target.partition("..")
+        with db_worker.pool.connection() as conn:
+            names = tables_in_range(conn, start, end or None)
+    else:
+        names = [target]
+    result = RunExporter(db_worker.db_path_for).export(names, out)
+    print(result)
+    db_worker.close()
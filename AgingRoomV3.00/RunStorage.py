@@ -0,0 +1,380 @@
+import os
+import gzip
+import shutil
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+from Logger import LoggerMixin
+
+try:
+    import zstandard
+except ImportError:  # 可选依赖, 未安装时 zstd 归档退化为只做 VACUUM 压实
+    zstandard = None
+
+# 批次文件状态: open 写入中 -> closed 待压实 -> compact 已压实 / archived 已压缩 -> expired 已过保留期删除
+STATE_OPEN = "open"
+STATE_CLOSED = "closed"
+STATE_COMPACT = "compact"
+STATE_ARCHIVED = "archived"
+STATE_EXPIRED = "expired"
+
+_ARCHIVE_SUFFIX = {"zstd": ".zst", "gzip": ".gz"}
+
+
+class RunStorage(LoggerMixin):
+    """按批次分文件存储老化数据, 主库只保留 Summary 与文件目录表 RunShards
+
+    - Mode=run: 每个批次表一个文件 <shard_dir>/yyyy_mm_dd_nn.db
+    - Mode=month: 同月批次共用 <shard_dir>/yyyy_mm.db, 跨月且无写入中的批次后再压实
+    批次文件自带 TableMeta/Payloads/汇总表, 可单独打开。关闭的文件先 VACUUM INTO 压实,
+    再按 Compression 压缩归档; 历史查询用到时才解压到缓存目录 (懒加载)。
+    RetentionPeriod 天数 (0 为永久保留) 之前关闭的文件在维护时删除, Summary 记录保留。
+    """
+
+    def __init__(self, catalog_path: str, cfg: Optional[dict] = None):
+        cfg = cfg or {}
+        self.catalog_path = catalog_path
+        self.mode = cfg.get("Mode", "run")
+        if self.mode not in ("run", "month"):
+            raise ValueError(f"Unsupported shard mode: {self.mode}")
+        self.shard_dir = cfg.get("ShardDir") or os.path.join(
+            os.path.dirname(catalog_path) or ".", "runs"
+        )
+        self.cache_dir = os.path.join(self.shard_dir, ".cache")
+        self.compression = cfg.get("Compression", "gzip")
+        if self.compression not in ("zstd", "gzip", "none"):
+            raise ValueError(f"Unsupported compression: {self.compression}")
+        if self.compression == "zstd" and zstandard is None:
+            self.log.warning("zstandard not installed, closed runs are compacted only")
+            self.compression = "none"
+        self.retention_days = float(cfg.get("RetentionPeriod", 0))
+        # 目录表与归档/解压操作共用一把锁, 避免同一文件被并发压实和解压
+        self._lock = threading.RLock()
+        self._maintenance: Optional[threading.Thread] = None
+        self._rescan = False
+        # 早于本进程创建仍为 open 的批次是上次异常退出遗留的, 启动维护时视为已关闭
+        self._started_at = time.time()
+        os.makedirs(self.shard_dir, exist_ok=True)
+        conn = self._catalog()
+        try:
+            self.ensure_catalog(conn)
+        finally:
+            conn.close()
+
+    @staticmethod
+    def ensure_catalog(conn: sqlite3.Connection) -> None:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS RunShards (
+                TableName TEXT PRIMARY KEY,
+                ShardFile TEXT NOT NULL,
+                State TEXT NOT NULL,
+                CreatedAt REAL,
+                ClosedAt REAL,
+                Bytes INTEGER
+            )
+            """
+        )
+        conn.commit()
+
+    def _catalog(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.catalog_path, timeout=10)
+
+    def _shard_file(self, table_name: str) -> str:
+        # 表名 yyyy_mm_dd_nn, 月分片取前 7 位 yyyy_mm
+        name = table_name[:7] if self.mode == "month" else table_name
+        return f"{name}.db"
+
+    def table_names_like(self, prefix: str) -> List[str]:
+        conn = self._catalog()
+        try:
+            rows = conn.execute(
+                "SELECT TableName FROM RunShards WHERE TableName LIKE ?", (f"{prefix}%",)
+            ).fetchall()
+        finally:
+            conn.close()
+        return [row[0] for row in rows]
+
+    def register(self, table_name: str) -> str:
+        """登记新批次, 返回其数据文件路径"""
+        shard_file = self._shard_file(table_name)
+        with self._lock:
+            conn = self._catalog()
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO RunShards (TableName, ShardFile, State, CreatedAt) VALUES (?, ?, ?, ?)",
+                    (table_name, shard_file, STATE_OPEN, time.time()),
+                )
+                conn.commit()
+            finally:
+                conn.close()
+        return os.path.join(self.shard_dir, shard_file)
+
+    def path_for(self, table_name: str, writable: bool = False) -> Optional[str]:
+        """批次表所在文件; 不在目录表中的旧表返回主库路径, 已过期返回 None
+
+        已压缩归档的文件在此时解压到缓存目录 (只读); writable=True 时归档文件返回 None。
+        """
+        with self._lock:
+            conn = self._catalog()
+            try:
+                row = conn.execute(
+                    "SELECT ShardFile, State FROM RunShards WHERE TableName=?",
+                    (table_name,),
+                ).fetchone()
+            finally:
+                conn.close()
+            if row is None:
+                return self.catalog_path
+            shard_file, state = row
+            if state == STATE_EXPIRED:
+                return None
+            path = os.path.join(self.shard_dir, shard_file)
+            if state != STATE_ARCHIVED:
+                return path
+            if writable:
+                return None
+            return self._materialize(path)
+
+    def _materialize(self, archive_path: str) -> Optional[str]:
+        suffix = os.path.splitext(archive_path)[1]
+        cached = os.path.join(
+            self.cache_dir, os.path.basename(archive_path)[: -len(suffix)]
+        )
+        if os.path.isfile(cached):
+            return cached
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp = cached + ".tmp"
+        started = time.perf_counter()
+        try:
+            with open(archive_path, "rb") as src, open(tmp, "wb") as dst:
+                if suffix == ".zst":
+                    if zstandard is None:
+                        raise RuntimeError("zstandard not installed")
+                    zstandard.ZstdDecompressor().copy_stream(src, dst)
+                else:
+                    with gzip.GzipFile(fileobj=src, mode="rb") as gz:
+                        shutil.copyfileobj(gz, dst, 1 << 20)
+            os.replace(tmp, cached)
+        except Exception as exc:
+            self.log.error(f"Shard restore failed for {archive_path}: {exc}")
+            if os.path.isfile(tmp):
+                os.remove(tmp)
+            return None
+        self.log.info(
+            f"Shard restored: {os.path.basename(archive_path)} in {time.perf_counter() - started:.2f}s"
+        )
+        return cached
+
+    def close_run(self, table_name: str) -> None:
+        """批次结束: 标记关闭, 后台压实/归档已无写入的文件"""
+        with self._lock:
+            conn = self._catalog()
+            try:
+                conn.execute(
+                    "UPDATE RunShards SET State=?, ClosedAt=? WHERE TableName=? AND State=?",
+                    (STATE_CLOSED, time.time(), table_name, STATE_OPEN),
+                )
+                conn.commit()
+            finally:
+                conn.close()
+        self.start_maintenance()
+
+    def start_maintenance(self, startup: bool = False) -> None:
+        """后台执行一次维护; startup=True 时把上次进程遗留的 open 批次视为已关闭并清空解压缓存"""
+        if self._maintenance is not None and self._maintenance.is_alive():
+            if not startup:
+                # 正在运行的维护结束前会再扫描一次, 不重复启动
+                self._rescan = True
+                return
+            self._maintenance.join()
+        self._rescan = False
+        self._maintenance = threading.Thread(
+            target=self._run_maintenance, args=(startup,), daemon=True
+        )
+        self._maintenance.start()
+
+    def wait_maintenance(self, timeout: Optional[float] = None) -> None:
+        if self._maintenance is not None:
+            self._maintenance.join(timeout)
+
+    def _run_maintenance(self, startup: bool) -> None:
+        try:
+            if startup:
+                self._recover_after_restart()
+            while True:
+                self._rescan = False
+                self.compact_ready_shards()
+                self.apply_retention()
+                if not self._rescan:
+                    break
+        except Exception as exc:
+            self.log.error(f"Shard maintenance failed: {exc}")
+
+    def _recover_after_restart(self) -> None:
+        with self._lock:
+            conn = self._catalog()
+            try:
+                conn.execute(
+                    "UPDATE RunShards SET State=?, ClosedAt=COALESCE(ClosedAt, ?) WHERE State=? AND CreatedAt<?",
+                    (STATE_CLOSED, time.time(), STATE_OPEN, self._started_at),
+                )
+                conn.commit()
+            finally:
+                conn.close()
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+            for name in os.listdir(self.shard_dir):
+                if name.endswith(".tmp"):
+                    os.remove(os.path.join(self.shard_dir, name))
+
+    def compact_ready_shards(self) -> int:
+        """压实所有批次都已关闭的文件 (月分片还要求已跨月), 返回处理的文件数"""
+        this_month = datetime.now().strftime("%Y_%m")
+        conn = self._catalog()
+        try:
+            rows = conn.execute(
+                """
+                SELECT ShardFile FROM RunShards GROUP BY ShardFile
+                HAVING SUM(State = ?) = 0 AND SUM(State = ?) > 0
+                """,
+                (STATE_OPEN, STATE_CLOSED),
+            ).fetchall()
+        finally:
+            conn.close()
+        done = 0
+        for (shard_file,) in rows:
+            if self.mode == "month" and shard_file[:7] >= this_month:
+                continue
+            if self._compact_shard(shard_file):
+                done += 1
+        return done
+
+    def _compact_shard(self, shard_file: str) -> bool:
+        path = os.path.join(self.shard_dir, shard_file)
+        tmp = path + ".vacuum.tmp"
+        started = time.perf_counter()
+        before = _file_size(path) + _file_size(path + "-wal")
+        try:
+            if os.path.isfile(tmp):
+                os.remove(tmp)
+            conn = sqlite3.connect(path)
+            try:
+                conn.execute("VACUUM INTO ?", (tmp,))
+            finally:
+                conn.close()
+            with self._lock:
+                # 主库连接已在 close_run 前释放; Windows 下若仍有读者占用文件则替换失败, 下次维护重试
+                os.replace(tmp, path)
+                for extra in (path + "-wal", path + "-shm"):
+                    if os.path.isfile(extra):
+                        os.remove(extra)
+                state, final_file = STATE_COMPACT, shard_file
+                if self.compression != "none":
+                    final_file = shard_file + _ARCHIVE_SUFFIX[self.compression]
+                    self._compress(path, os.path.join(self.shard_dir, final_file))
+                    os.remove(path)
+                    state = STATE_ARCHIVED
+                after = _file_size(os.path.join(self.shard_dir, final_file))
+                conn = self._catalog()
+                try:
+                    conn.execute(
+                        "UPDATE RunShards SET State=?, ShardFile=?, Bytes=? WHERE ShardFile=? AND State=?",
+                        (state, final_file, after, shard_file, STATE_CLOSED),
+                    )
+                    conn.commit()
+                finally:
+                    conn.close()
+        except Exception as exc:
+            self.log.warning(f"Shard compaction deferred for {shard_file}: {exc}")
+            if os.path.isfile(tmp):
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
+            return False
+        self.log.info(
+            f"Shard {shard_file} -> {state}: {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+        return True
+
+    def _compress(self, src_path: str, dst_path: str) -> None:
+        tmp = dst_path + ".tmp"
+        with open(src_path, "rb") as src, open(tmp, "wb") as dst:
+            if self.compression == "zstd":
+                zstandard.ZstdCompressor(level=10, threads=-1).copy_stream(src, dst)
+            else:
+                with gzip.GzipFile(fileobj=dst, mode="wb", compresslevel=6) as gz:
+                    shutil.copyfileobj(src, gz, 1 << 20)
+        os.replace(tmp, dst_path)
+
+    def apply_retention(self, now: Optional[float] = None) -> int:
+        """删除关闭时间早于保留期的文件, 返回删除的文件数"""
+        if self.retention_days <= 0:
+            return 0
+        cutoff = (now or time.time()) - self.retention_days * 86400
+        conn = self._catalog()
+        try:
+            rows = conn.execute(
+                """
+                SELECT ShardFile FROM RunShards GROUP BY ShardFile
+                HAVING SUM(State = ?) = 0 AND SUM(State = ?) < COUNT(*) AND MAX(ClosedAt) < ?
+                """,
+                (STATE_OPEN, STATE_EXPIRED, cutoff),
+            ).fetchall()
+        finally:
+            conn.close()
+        removed = 0
+        for (shard_file,) in rows:
+            with self._lock:
+                path = os.path.join(self.shard_dir, shard_file)
+                targets = [path, path + "-wal", path + "-shm"]
+                suffix = os.path.splitext(shard_file)[1]
+                if suffix in _ARCHIVE_SUFFIX.values():
+                    # 归档文件在缓存目录中的解压副本
+                    targets.append(os.path.join(self.cache_dir, shard_file[: -len(suffix)]))
+                try:
+                    for target in targets:
+                        if os.path.isfile(target):
+                            os.remove(target)
+                except OSError as exc:
+                    self.log.warning(f"Shard {shard_file} not expired yet: {exc}")
+                    continue
+                conn = self._catalog()
+                try:
+                    conn.execute(
+                        "UPDATE RunShards SET State=?, Bytes=0 WHERE ShardFile=?",
+                        (STATE_EXPIRED, shard_file),
+                    )
+                    conn.commit()
+                finally:
+                    conn.close()
+                removed += 1
+        if removed:
+            self.log.info(f"Shard retention: removed {removed} files")
+        return removed
+
+    def shard_stats(self) -> Dict[str, dict]:
+        """各状态的批次数与文件字节数 (月分片的多个批次共用一个文件, 字节数按文件计)"""
+        conn = self._catalog()
+        try:
+            rows = conn.execute(
+                """
+                SELECT State, SUM(n), SUM(b) FROM (
+                    SELECT State, COUNT(*) AS n, MAX(COALESCE(Bytes, 0)) AS b
+                    FROM RunShards GROUP BY State, ShardFile
+                ) GROUP BY State
+                """
+            ).fetchall()
+        finally:
+            conn.close()
+        return {state: {"runs": runs, "bytes": size} for state, runs, size in rows}
+
+
+def _file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
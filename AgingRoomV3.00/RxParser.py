@@ -1,12 +1,16 @@
 import can
 import time
+import threading
+import numpy as np
 
 from typing import Any, Optional
-from Protocol import split_by_can_id, get_slot_id_by_can_id
+from Protocol import split_by_can_id, get_slot_id_by_can_id, build_rx_route_table
 from Logger import LoggerMixin
+from CanInitializer import get_message_decoders
 from Tools import (
     FUNCTION_CONFIG,
     PROJECT_CONFIG,
+    add_config_listener,
     create_slot_table,
     get_default_project,
 )
@@ -29,15 +33,23 @@ class DbcDecoder(LoggerMixin):
     def __init__(self, dbc: Any, data_list: Optional[list] = None):
         self.dbc = dbc
         self.data_list = data_list
+        # 逐消息解码函数（与 CanBusManager 共享的缓存）
+        self._decoders = get_message_decoders(dbc) if dbc is not None else {}
 
-    def on_message_decode(self, msg: can.Message, origin_msg_id: int) -> None:
+    def on_message_decode(
+        self, msg: can.Message, origin_msg_id: int, slot: Optional[int] = None
+    ) -> None:
         if self.dbc is None:
             raise RuntimeError(
                 "DbcDecoder.dbc 未初始化, 请从 CanBusManager.get_dbc() 注入"
             )
-        index = get_slot_id_by_can_id(msg.arbitration_id)
+        index = slot if slot is not None else get_slot_id_by_can_id(msg.arbitration_id)
         try:
-            self.data_list[index] = self.dbc.decode_message(origin_msg_id, msg.data)
+            decode = self._decoders.get(origin_msg_id)
+            if decode is not None:
+                self.data_list[index] = decode(msg.data)
+            else:
+                self.data_list[index] = self.dbc.decode_message(origin_msg_id, msg.data)
         except Exception as e:
             self.log.info(
                 f"无法使用DBC解码消息: ID={origin_msg_id}, Data={msg.data.hex()}"
@@ -51,13 +63,13 @@ class CustomRxMsg1(CustomRxMsg, LoggerMixin):
     def __init__(self, dbc: Any, project_name: str | None = None):
         super().__init__(dbc, project_name=project_name)
 
-    def decoding(self, msg: can.Message):
+    def decoding(self, msg: can.Message, slot: Optional[int] = None):
         """启动DBC解码器"""
         rx_cfg = PROJECT_CONFIG.get(self.project_name, {}).get("RX", {})
         origin_id = rx_cfg.get("IdOfRxMsg1")
         if origin_id is None:
             return
-        self.decoder.on_message_decode(msg, origin_id)
+        self.decoder.on_message_decode(msg, origin_id, slot)
 
 
 class CustomRxMsg2(CustomRxMsg, LoggerMixin):
@@ -66,25 +78,93 @@ class CustomRxMsg2(CustomRxMsg, LoggerMixin):
     def __init__(self, dbc: Any, project_name: str | None = None):
         super().__init__(dbc, project_name=project_name)
 
-    def decoding(self, msg: can.Message):
+    def decoding(self, msg: can.Message, slot: Optional[int] = None):
         """启动DBC解码器"""
         rx_cfg = PROJECT_CONFIG.get(self.project_name, {}).get("RX", {})
         origin_id = rx_cfg.get("IdOfRxMsg2")
         if origin_id is None:
             return
-        self.decoder.on_message_decode(msg, origin_id)
+        self.decoder.on_message_decode(msg, origin_id, slot)
+
+
+# 采集卡状态矩阵：每个 slot 一行（index 0 为占位行, 与 slot table 一致）
+STATUS_DTYPE = np.dtype(
+    [
+        ("timestamp", "f8"),
+        ("status", "i1"),
+        ("voltage", "f8"),
+        ("current", "f8"),
+        ("temperature", "i2"),
+        ("card_bits", "u1"),
+        ("resistor", "u1"),
+        ("valid", "?"),
+    ]
+)
+
+# 不计入激活/统计的状态码
+_INACTIVE_STATUS = (0, -4, -5)
+_UNCOUNTED_STATUS = (0, -4)
+_BAD_STATUS = (-5, -3, -2, -1, 2, 3, 4)
+
+
+class _StatusTableView:
+    """AgingStatus.status 的只读视图：按 slot 下标访问时才生成 dict（兼容旧接口）"""
+
+    def __init__(self, owner: "AgingStatus"):
+        self._owner = owner
+
+    def __len__(self) -> int:
+        return len(self._owner.matrix)
+
+    def __getitem__(self, slot: int) -> Optional[dict]:
+        if isinstance(slot, slice):
+            return [self[i] for i in range(len(self))[slot]]
+        if slot == 0:
+            return None
+        return self._owner.status_dict(slot)
+
+    def __iter__(self):
+        for slot in range(len(self)):
+            yield self[slot]
 
 
 class AgingStatus(LoggerMixin):
-    """解析采集卡老化状态"""
+    """解析采集卡老化状态
+
+    解析结果写入 NumPy 结构化数组 self.matrix（每 slot 一行, 原地更新）；
+    self.status 保持旧的 1-based dict 表接口, 仅在访问时生成 dict。
+    """
+
+    _CARD_INFO_MAP = {
+        "slave_configed": ["configed", "not_configed"],
+        "reserve_1": ["default", "default"],
+        "output_status": ["open", "close"],
+        "current_status": ["normal", "abnormal"],
+        "voltage_status": ["normal", "abnormal"],
+        "can_status": ["normal", "abnormal"],
+        "reserve_2": ["default", "default"],
+        "reserve_3": ["default", "default"],
+    }
+    _RESISTOR_MAP = {0: 9999, 1: 120, 2: 240, 3: -1}
 
     def __init__(self, project_name: str | None = None):
-        self.status = create_slot_table(
-            FUNCTION_CONFIG["UI"]["IndexPerGroup"],
-            default_factory=self._blank_status,
-        )
+        self.slot_count = int(FUNCTION_CONFIG["UI"]["IndexPerGroup"])
+        self.matrix = np.zeros(self.slot_count + 1, dtype=STATUS_DTYPE)
+        self.matrix["temperature"] = 20
+        self._lock = threading.Lock()
+        # 随帧维护的变化集合：状态码镜像 / 待取走的变化 slot / 激活 slot
+        self._codes: list[int] = [0] * (self.slot_count + 1)
+        self._dirty: set[int] = set()
+        self._active: set[int] = set()
+        self._active_version = 0
+        self.status = _StatusTableView(self)
         self._timestamp_offset: Optional[float] = None
         self.project_name = project_name or get_default_project(1)
+        # 判定阈值在初始化时取一次, 避免逐帧查配置
+        project_cfg = PROJECT_CONFIG[self.project_name]
+        self._dark_current: float = FUNCTION_CONFIG["PowerSupply"]["DarkCurrent"]
+        self._voltage_range: list[int] = project_cfg["工作电压范围"]
+        self._current_range: list[int] = project_cfg["工作电流范围"]
 
     def _normalize_timestamp(self, ts: Any) -> Optional[float]:
         try:
@@ -114,28 +194,25 @@ class AgingStatus(LoggerMixin):
             "ResistorInfo": {},
         }
 
-    def decode_status(self, msg: can.Message) -> None:
-        """解析采集卡状态"""
-        map = {
-            "slave_configed": ["configed", "not_configed"],
-            "reserve_1": ["default", "default"],
-            "output_status": ["open", "close"],
-            "current_status": ["normal", "abnormal"],
-            "voltage_status": ["normal", "abnormal"],
-            "can_status": ["normal", "abnormal"],
-            "reserve_2": ["default", "default"],
-            "reserve_3": ["default", "default"],
+    @classmethod
+    def _card_info_from_bits(cls, byte_val: int) -> dict:
+        return {
+            key: values[(byte_val >> i) & 1]
+            for i, (key, values) in enumerate(cls._CARD_INFO_MAP.items())
         }
 
-        def byte_to_bit_list(byte_val):
-            return [(byte_val >> i) & 1 for i in range(8)]
-
-        status_list = byte_to_bit_list(msg.data[5])
+    @classmethod
+    def _resistor_from_byte(cls, value: int) -> dict:
+        config_keys = ["main_can", "can_1", "can_2"]
+        bit_shifts = [4, 2, 0]
+        return {
+            key: cls._RESISTOR_MAP[(value >> shift) & 0x03]
+            for key, shift in zip(config_keys, bit_shifts)
+        }
 
-        mapped_status = {}
-        for key, value in zip(map.keys(), status_list):
-            mapped_status[key] = map[key][value]
-        return mapped_status
+    def decode_status(self, msg: can.Message) -> None:
+        """解析采集卡状态"""
+        return self._card_info_from_bits(msg.data[5])
 
     def decode_resistor(self, msg: can.Message) -> dict:
         """ "解析采集卡电阻配置报文"""
@@ -148,16 +225,7 @@ class AgingStatus(LoggerMixin):
             value = resistor_byte
         else:
             raise ValueError("Input must be a single byte or int.")
-
-        reverse_map = {0: 9999, 1: 120, 2: 240, 3: -1}
-        config_keys = ["main_can", "can_1", "can_2"]
-        bit_shifts = [4, 2, 0]
-
-        result = {}
-        for key, shift in zip(config_keys, bit_shifts):
-            code = (value >> shift) & 0x03
-            result[key] = reverse_map[code]
-        return result
+        return self._resistor_from_byte(value)
 
     def decode_voltage(self, msg: can.Message) -> None:
         """解析当前电压报文"""
@@ -189,9 +257,9 @@ class AgingStatus(LoggerMixin):
         """
 
         status = 0
-        dark_current: float = FUNCTION_CONFIG["PowerSupply"]["DarkCurrent"]
-        voltage_range: list[int] = PROJECT_CONFIG[self.project_name]["工作电压范围"]
-        current_range: list[int] = PROJECT_CONFIG[self.project_name]["工作电流范围"]
+        dark_current = self._dark_current
+        voltage_range = self._voltage_range
+        current_range = self._current_range
         if voltage <= 0 and current <= 0:
             return -5
 
@@ -217,9 +285,10 @@ class AgingStatus(LoggerMixin):
                 status = 4
         return status
 
-    def decoding(self, msg: can.Message):
+    def decoding(self, msg: can.Message, slot: Optional[int] = None):
         """启动DBC解码器"""
-        index = get_slot_id_by_can_id(msg.arbitration_id)
+        index = slot if slot is not None else get_slot_id_by_can_id(msg.arbitration_id)
+        data = msg.data
         current = self.decode_current(msg)
         voltage = self.decode_voltage(msg)
         status = self.mapping_status(current, voltage)
@@ -227,16 +296,86 @@ class AgingStatus(LoggerMixin):
         if normalized_ts is None:
             normalized_ts = time.time()
 
-        self.status[index] = {
-            "Timestamp": normalized_ts,
+        with self._lock:
+            self.matrix[index] = (
+                normalized_ts,
+                status,
+                voltage,
+                current,
+                data[7] - 40,
+                data[5],
+                data[6],
+                True,
+            )
+            if status != self._codes[index]:
+                self._codes[index] = status
+                self._dirty.add(index)
+                was_active = index in self._active
+                if status in _INACTIVE_STATUS:
+                    self._active.discard(index)
+                else:
+                    self._active.add(index)
+                if was_active != (index in self._active):
+                    self._active_version += 1
+
+    # -------- 按需生成 dict 视图 --------
+
+    def status_dict(self, slot: int) -> dict:
+        """生成单个 slot 的状态 dict（与旧版 status[slot] 结构一致）。"""
+        with self._lock:
+            row = self.matrix[slot].item()
+        timestamp, status, voltage, current, temperature, bits, resistor, valid = row
+        if not valid:
+            return self._blank_status()
+        return {
+            "Timestamp": timestamp,
             "Status": status,
             "Voltage": voltage,
             "Current": current,
-            "CardInfo": self.decode_status(msg),
-            "CardTemperature": self.decode_temperature(msg),
-            "ResistorInfo": self.decode_resistor(msg),
+            "CardInfo": self._card_info_from_bits(bits),
+            "CardTemperature": temperature,
+            "ResistorInfo": self._resistor_from_byte(resistor),
         }
 
+    # -------- 向量化统计 --------
+
+    def status_codes(self) -> np.ndarray:
+        """返回所有 slot 的状态码副本（index 0 为占位）。"""
+        with self._lock:
+            return self.matrix["status"].copy()
+
+    def active_slots(self) -> list[int]:
+        """Status 不为 0/-4/-5 的 slot 列表（随帧维护, 不扫描全表）。"""
+        with self._lock:
+            return sorted(self._active)
+
+    def active_version(self) -> int:
+        """激活 slot 集合每变化一次加 1, 调用方据此跳过未变化的下发。"""
+        return self._active_version
+
+    def drain_changed(self) -> list[tuple[int, int]]:
+        """取走自上次调用以来状态码变化的 slot, 返回 [(slot, status)]；无变化时为空。"""
+        if not self._dirty:
+            return []
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            codes = self._codes
+            return [(slot, codes[slot]) for slot in sorted(dirty)]
+
+    def summary(self, slots: Optional[list[int]] = None) -> dict[str, Any]:
+        """统计总数/良品/不良数；max_temp 取 slots（默认激活 slot）中的最高温度。"""
+        with self._lock:
+            codes = self.matrix["status"][1:].copy()
+            temps = self.matrix["temperature"].copy()
+        counted = ~np.isin(codes, _UNCOUNTED_STATUS)
+        total = int(np.count_nonzero(counted))
+        good = int(np.count_nonzero(codes == 1))
+        bad = int(np.count_nonzero(np.isin(codes, _BAD_STATUS)))
+        if slots is None:
+            slots = (np.flatnonzero(~np.isin(codes, _INACTIVE_STATUS)) + 1).tolist()
+        max_temp = float(temps[slots].max()) if len(slots) else None
+        return {"total": total, "good": good, "bad": bad, "max_temp": max_temp}
+
 
 class RxSplitter(can.Listener, LoggerMixin):
     """来自采集卡Can报文分流器,三个节点报文解析"""
@@ -273,22 +412,37 @@ class RxSplitter(can.Listener, LoggerMixin):
             self._dispatch["CH1_APP_RX2"] = self.rx_msg_managers[2].decoding
             self._dispatch["CH2_APP_RX2"] = self.rx_msg_managers[2].decoding
 
+        # can_id -> (handler, slot)：由 Protocol 常量与 Remap 预先计算, 逐帧只查一次表
+        self._routes: dict[int, tuple[Any, int]] = {}
+        self.rebuild_routes()
+        add_config_listener(self.rebuild_routes)
+
+    def rebuild_routes(self) -> None:
+        """按当前配置（UI.Remap）重建 can_id 路由表；配置刷新后自动调用。"""
+        routes: dict[int, tuple[Any, int]] = {}
+        for can_id, (key, slot) in build_rx_route_table().items():
+            # 例如 OUTPUT_CTRL_1 / CH1_TX1 / DIAG_* 等帧没有对应解析器, 不入表
+            handler = self._dispatch.get(key)
+            if handler is not None:
+                routes[can_id] = (handler, slot)
+        self._routes = routes
+
     def on_message_received(self, msg: can.Message) -> None:
-        try:
-            key = split_by_can_id(msg.arbitration_id)
-        except ValueError:
+        route = self._routes.get(msg.arbitration_id)
+        if route is None:
             # 非协议内可分流的帧（例如回环/噪声/其它模块帧）, 直接忽略
             return
 
+        handler, slot = route
         try:
-            handler = self._dispatch.get(key)
-            if handler is None:
-                # 例如 OUTPUT_CTRL_1 / CH1_TX1 等回环帧, 不参与接收解析
-                return
-            handler(msg)
+            handler(msg, slot)
         except Exception as e:
             self.log.error(f"处理接收消息时出错: {e}")
 
+    @property
+    def aging_status(self) -> Optional[AgingStatus]:
+        return self.rx_msg_managers[0]
+
     def get_status(self, which: str, slot: int = None):
         mapping = {
             "card_status": 0,
@@ -0,0 +1,301 @@
+"""老化槽位网格：模型/委托实现
+
+SlotGridModel 以一组槽位的显示状态数组为数据源, 状态变化时只对变化区域发
+dataChanged；SlotGridDelegate 按 COLOR_MAPPING 直接绘制底色与槽位号,
+不再为每个单元格维护 QTableWidgetItem。
+"""
+
+from __future__ import annotations
+
+from math import ceil
+from typing import Callable, Optional
+
+import Tools
+from PySide6.QtCore import QAbstractTableModel, QModelIndex, QPointF, QRect, Qt
+from PySide6.QtGui import QBrush, QColor, QPainter, QPen, QStaticText
+from PySide6.QtWidgets import (
+    QAbstractItemView,
+    QHeaderView,
+    QSizePolicy,
+    QStyle,
+    QStyledItemDelegate,
+    QStyleOptionViewItem,
+    QTableView,
+)
+
+DEFAULT_COLOR = "#D3D3D3"
+
+
+class SlotGridModel(QAbstractTableModel):
+    """单组槽位网格数据模型, 槽位按行优先排布 (slot = row * cols + col + 1)"""
+
+    # 单元格对应的槽位号 (空白格为 0) / 当前显示状态
+    SlotRole = Qt.ItemDataRole.UserRole
+    StatusRole = Qt.ItemDataRole.UserRole + 1
+
+    def __init__(
+        self,
+        slot_count: int,
+        rows: int,
+        color_key: Callable[[int], Optional[str]],
+        parent=None,
+    ):
+        super().__init__(parent)
+        self._color_key = color_key
+        self._slot_count = 0
+        self._rows = 1
+        self._cols = 1
+        self._status: list[int] = [0]
+        # 整组覆盖色 (如暂停), only_nonzero 时只覆盖状态非 0 的槽位
+        self._override: Optional[str] = None
+        self._override_nonzero = True
+        self._brushes: dict[str, QBrush] = {}
+        self._layout(slot_count, rows)
+        Tools.add_config_listener(self._on_config_refreshed)
+
+    def _layout(self, slot_count: int, rows: int) -> None:
+        self._slot_count = max(0, int(slot_count))
+        self._rows = max(1, int(rows))
+        self._cols = max(1, int(ceil(self._slot_count / self._rows)))
+        self._status = [0] * (self._slot_count + 1)
+
+    def configure(self, slot_count: int, rows: int) -> None:
+        """按新的槽位数/行数重排网格, 状态清零"""
+        self.beginResetModel()
+        self._layout(slot_count, rows)
+        self._override = None
+        self.endResetModel()
+
+    # -------- Qt 模型接口 --------
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else self._rows
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else self._cols
+
+    def flags(self, index: QModelIndex) -> Qt.ItemFlag:
+        # 每次重绘逐格调用, 空白格也返回 Enabled, 点击时由 slot_at 过滤
+        return Qt.ItemFlag.ItemIsEnabled
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole):
+        slot = self.slot_at(index)
+        if slot is None:
+            return 0 if role == self.SlotRole else None
+        if role == Qt.ItemDataRole.DisplayRole:
+            return str(slot)
+        if role == Qt.ItemDataRole.BackgroundRole:
+            return self.brush_for(slot)
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            return Qt.AlignmentFlag.AlignCenter
+        if role == self.SlotRole:
+            return slot
+        if role == self.StatusRole:
+            return self._status[slot]
+        return None
+
+    # -------- 槽位访问 --------
+
+    def slot_at(self, index: QModelIndex) -> Optional[int]:
+        if not index.isValid():
+            return None
+        slot = index.row() * self._cols + index.column() + 1
+        return slot if slot <= self._slot_count else None
+
+    def status(self, slot: int) -> int:
+        return self._status[slot] if 0 < slot <= self._slot_count else 0
+
+    def brush_for(self, slot: int) -> Optional[QBrush]:
+        status = self._status[slot]
+        if self._override is not None and (status != 0 or not self._override_nonzero):
+            key = self._override
+        else:
+            key = self._color_key(status)
+        if key is None:
+            return None
+        brush = self._brushes.get(key)
+        if brush is None:
+            brush = QBrush(QColor(Tools.COLOR_MAPPING.get(key, DEFAULT_COLOR)))
+            self._brushes[key] = brush
+        return brush
+
+    # -------- 状态更新 (每次调用最多一个 dataChanged) --------
+
+    def set_statuses(self, status_map: dict[int, int]) -> None:
+        """批量写入槽位显示状态, 只对变化槽位的外接矩形发一次 dataChanged"""
+        top = left = None
+        bottom = right = -1
+        cols = self._cols
+        for slot, status in status_map.items():
+            if not 0 < slot <= self._slot_count or self._status[slot] == status:
+                continue
+            self._status[slot] = status
+            r, c = divmod(slot - 1, cols)
+            top = r if top is None else min(top, r)
+            left = c if left is None else min(left, c)
+            bottom = max(bottom, r)
+            right = max(right, c)
+        if top is not None:
+            self._emit_changed(top, left, bottom, right)
+
+    def set_override(self, key: Optional[str], only_status_nonzero: bool = True) -> None:
+        """整组覆盖色 (key=None 取消), 不改变保存的状态"""
+        self._override = key
+        self._override_nonzero = only_status_nonzero
+        self._emit_all()
+
+    def reset_statuses(self) -> None:
+        """清空所有槽位状态与覆盖色"""
+        self._status = [0] * (self._slot_count + 1)
+        self._override = None
+        self._emit_all()
+
+    def _emit_all(self) -> None:
+        self._emit_changed(0, 0, self._rows - 1, self._cols - 1)
+
+    def _emit_changed(self, top: int, left: int, bottom: int, right: int) -> None:
+        self.dataChanged.emit(
+            self.index(top, left),
+            self.index(bottom, right),
+            [Qt.ItemDataRole.BackgroundRole, self.StatusRole],
+        )
+
+    def _on_config_refreshed(self) -> None:
+        # ColorMapping 可能已变化, 丢弃画刷缓存后整表重绘
+        self._brushes.clear()
+        self._emit_all()
+
+
+class SlotGridDelegate(QStyledItemDelegate):
+    """直接绘制槽位底色与编号, 跳过默认委托逐角色取数与样式选项构造
+
+    槽位号用预排版的 QStaticText 绘制；paint_grid 供 SlotGridView 在一次
+    paintEvent 内批量绘制脏区, 省去逐格回调 Python 的开销。
+    """
+
+    def __init__(self, model: SlotGridModel, parent=None):
+        super().__init__(parent)
+        self._model = model
+        self._texts: dict[int, QStaticText] = {}
+
+    def paint(self, painter, option, index: QModelIndex) -> None:
+        model = self._model
+        slot = index.row() * model._cols + index.column() + 1
+        if slot <= model._slot_count:
+            self._paint_cell(painter, option.rect, slot, option.font)
+
+    def _paint_cell(self, painter, rect: QRect, slot: int, font) -> None:
+        brush = self._model.brush_for(slot)
+        if brush is not None:
+            painter.fillRect(rect, brush)
+        text = self._texts.get(slot)
+        if text is None:
+            text = QStaticText(str(slot))
+            text.prepare(font=font)
+            self._texts[slot] = text
+        size = text.size()
+        painter.drawStaticText(
+            QPointF(
+                rect.x() + (rect.width() - size.width()) / 2,
+                rect.y() + (rect.height() - size.height()) / 2,
+            ),
+            text,
+        )
+
+    def paint_grid(self, painter, view: QTableView, dirty: QRect) -> None:
+        """绘制与 dirty 相交的单元格及网格线, 布局与 QTableView 默认绘制一致"""
+        model = self._model
+        h_header = view.horizontalHeader()
+        v_header = view.verticalHeader()
+        cols = [
+            (h_header.sectionViewportPosition(c), h_header.sectionSize(c))
+            for c in range(model._cols)
+        ]
+        rows = [
+            (v_header.sectionViewportPosition(r), v_header.sectionSize(r))
+            for r in range(model._rows)
+        ]
+        show_grid = view.showGrid()
+        grid = 1 if show_grid else 0
+        left, top = dirty.left(), dirty.top()
+        right, bottom = dirty.right(), dirty.bottom()
+
+        painter.fillRect(dirty, view.palette().base())
+        painter.setPen(view.palette().text().color())
+        font = view.font()
+        for r, (y, h) in enumerate(rows):
+            if y + h <= top or y > bottom:
+                continue
+            base = r * model._cols + 1
+            for c, (x, w) in enumerate(cols):
+                if x + w <= left or x > right:
+                    continue
+                slot = base + c
+                if slot > model._slot_count:
+                    break
+                self._paint_cell(painter, QRect(x, y, w - grid, h - grid), slot, font)
+
+        if show_grid and cols and rows:
+            option = QStyleOptionViewItem()
+            option.initFrom(view)
+            hint = view.style().styleHint(
+                QStyle.StyleHint.SH_Table_GridLineColor, option, view
+            )
+            painter.setPen(QPen(QColor.fromRgba(hint & 0xFFFFFFFF), 0, view.gridStyle()))
+            y_end = rows[-1][0] + rows[-1][1] - 1
+            x_end = cols[-1][0] + cols[-1][1] - 1
+            for x, w in cols:
+                painter.drawLine(x + w - 1, rows[0][0], x + w - 1, y_end)
+            for y, h in rows:
+                painter.drawLine(cols[0][0], y + h - 1, x_end, y + h - 1)
+
+
+class SlotGridView(QTableView):
+    """槽位网格视图：每次重绘由委托一次性绘制脏区, 而不是逐格回调委托"""
+
+    def paintEvent(self, event) -> None:
+        delegate = self.itemDelegate()
+        if not isinstance(delegate, SlotGridDelegate):
+            super().paintEvent(event)
+            return
+        painter = QPainter(self.viewport())
+        try:
+            delegate.paint_grid(painter, self, event.rect())
+        finally:
+            painter.end()
+
+
+def setup_slot_view(view: QTableView, model: SlotGridModel) -> None:
+    """把槽位模型/委托装到视图上"""
+    view.setModel(model)
+    view.setItemDelegate(SlotGridDelegate(model, view))
+    _style_grid(view)
+
+
+def _style_grid(view: QTableView) -> None:
+    """网格外观：不可编辑/不可选中, 隐藏表头, 行列均分铺满"""
+    view.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+    view.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+    view.setSelectionMode(QAbstractItemView.SelectionMode.NoSelection)
+    view.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+    view.setShowGrid(True)
+    for header in (view.horizontalHeader(), view.verticalHeader()):
+        header.setVisible(False)
+        header.setDefaultSectionSize(28)
+        header.setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+
+
+def replace_table_widget(table) -> SlotGridView:
+    """用 QTableView 原位替换 Designer 生成的 QTableWidget, 保留对象名/尺寸策略/滚动条策略"""
+    parent = table.parentWidget()
+    view = SlotGridView(parent)
+    view.setObjectName(table.objectName())
+    view.setSizePolicy(table.sizePolicy())
+    view.setHorizontalScrollBarPolicy(table.horizontalScrollBarPolicy())
+    view.setVerticalScrollBarPolicy(table.verticalScrollBarPolicy())
+    layout = parent.layout() if parent is not None else None
+    if layout is not None:
+        layout.replaceWidget(table, view)
+    table.hide()
+    table.deleteLater()
+    return view
@@ -3,8 +3,10 @@ import can
 import time
 import json
 import logging
+import weakref
 import threading
 from pathlib import Path
+from contextlib import contextmanager
 from Logger import configure_default_logging
 from typing import Callable, Iterable, List, Optional, Union
 
@@ -320,6 +322,35 @@ def refresh_ui_config(
     refresh_configs()
 
 
+# 配置刷新回调：绑定方法以弱引用保存, 对象被回收后自动失效
+_config_listeners: list[Callable[[], Optional[Callable[[], None]]]] = []
+_config_listeners_lock = threading.Lock()
+
+
+def add_config_listener(callback: Callable[[], None]) -> None:
+    """注册 refresh_configs() 之后执行的回调（如重建依赖配置的查找表）。"""
+    if hasattr(callback, "__self__"):
+        ref = weakref.WeakMethod(callback)
+    else:
+        ref = lambda cb=callback: cb  # noqa: E731
+    with _config_listeners_lock:
+        _config_listeners.append(ref)
+
+
+def _notify_config_listeners() -> None:
+    with _config_listeners_lock:
+        _config_listeners[:] = [r for r in _config_listeners if r() is not None]
+        refs = list(_config_listeners)
+    for ref in refs:
+        callback = ref()
+        if callback is None:
+            continue
+        try:
+            callback()
+        except Exception as exc:
+            _log.error(f"配置刷新回调执行失败: {callback}, {exc}")
+
+
 def refresh_configs():
     """刷新全局配置变量"""
     global FUNCTION_CONFIG, PROJECT_CONFIG, SELECTED_PROJECT, COLOR_MAPPING
@@ -329,6 +360,7 @@ def refresh_configs():
     COLOR_MAPPING = FUNCTION_CONFIG.get("UI", {}).get(
         "ColorMapping", FUNCTION_CONFIG.get("ColorMapping", {})
     )
+    _notify_config_listeners()
 
 
 # -------- Slot helpers (1-based indexing) --------
@@ -392,6 +424,68 @@ def normalize_slots(slots: Iterable[int], slot_count: int) -> list[int]:
     return cleaned
 
 
+# -------- Latency metrics --------
+
+
+class LatencyHistogram:
+    """线程安全的耗时统计（毫秒分桶直方图）。"""
+
+    DEFAULT_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+    def __init__(self, bounds_ms: Optional[Iterable[float]] = None):
+        self.bounds_ms = tuple(sorted(bounds_ms or self.DEFAULT_BOUNDS_MS))
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._count = 0
+            self._total_s = 0.0
+            self._max_s = 0.0
+            self._last_s = 0.0
+            self._buckets = [0] * (len(self.bounds_ms) + 1)
+
+    def observe(self, elapsed_s: float) -> None:
+        elapsed_ms = elapsed_s * 1000.0
+        idx = len(self.bounds_ms)
+        for i, bound in enumerate(self.bounds_ms):
+            if elapsed_ms <= bound:
+                idx = i
+                break
+        with self._lock:
+            self._count += 1
+            self._total_s += elapsed_s
+            self._last_s = elapsed_s
+            if elapsed_s > self._max_s:
+                self._max_s = elapsed_s
+            self._buckets[idx] += 1
+
+    @contextmanager
+    def measure(self):
+        """with hist.measure(): ... 统计代码块耗时（异常时同样计入）。"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            count = self._count
+            buckets = {
+                f"<={bound:g}ms": n for bound, n in zip(self.bounds_ms, self._buckets)
+            }
+            buckets[f">{self.bounds_ms[-1]:g}ms"] = self._buckets[-1]
+            return {
+                "count": count,
+                "total_s": round(self._total_s, 6),
+                "avg_ms": round(self._total_s * 1000.0 / count, 3) if count else 0.0,
+                "max_ms": round(self._max_s * 1000.0, 3),
+                "last_ms": round(self._last_s * 1000.0, 3),
+                "buckets": buckets,
+            }
+
+
 def get_slot_results(app, slot):
     """获取指定槽位的card_status\custom_rx1\custom_rx2\diag_results\diag_periodic_snapshot结果的集合"""
 
@@ -445,6 +539,11 @@ def get_slots_results(app, slots: int | list[int]) -> dict[int, dict]:
     if isinstance(slots, int):
         slots = [slots]
     slots = normalize_slots(slots, slot_count)
+    if hasattr(app, "ops") and isinstance(getattr(app, "ops"), dict):
+        # 优先走整组快照, 每个数据源每轮只取一次
+        snapshot_fn = getattr(app, "ops").get("collect_group_snapshot")
+        if callable(snapshot_fn):
+            return snapshot_fn(slots)
     results = {}
     for slot in slots:
         results[slot] = get_slot_results(app, slot)
@@ -454,10 +553,7 @@ def get_slots_results(app, slots: int | list[int]) -> dict[int, dict]:
 def get_all_slots_results(app):
     """获取所有槽位的card_status\custom_rx1\custom_rx2\diag_results\diag_periodic_snapshot结果的集合"""
     slot_count = FUNCTION_CONFIG["UI"]["IndexPerGroup"]
-    results = {}
-    for slot in range(1, slot_count + 1):
-        results[slot] = get_slot_results(app, slot)
-    return results
+    return get_slots_results(app, list(range(1, slot_count + 1)))
 
 
 def get_active_slots(app) -> list[int]:
@@ -465,6 +561,10 @@ def get_active_slots(app) -> list[int]:
     slot_count = FUNCTION_CONFIG["UI"]["IndexPerGroup"]
     status_fn = None
     if hasattr(app, "ops") and isinstance(getattr(app, "ops"), dict):
+        # 优先使用状态矩阵的向量化查询
+        active_fn = getattr(app, "ops").get("card_active_slots")
+        if callable(active_fn):
+            return active_fn()
         status_fn = getattr(app, "ops").get("get_status")
     if not status_fn and hasattr(app, "get_status"):
         status_fn = getattr(app, "get_status")
@@ -0,0 +1,288 @@
+"""
+DataBaseWorker 存储基准, 在临时目录中运行, 不影响正式库
+
+用法: python bench/bench_database.py {storage|export|shards}
+"""
+
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from DataBaseWorker import (  # noqa: E402
+    _EXPORT_FIELDS,
+    LAYOUT_COMPACT,
+    LAYOUT_LEGACY,
+    DataBaseWorker,
+)
+from RunStorage import RunStorage  # noqa: E402
+
+
+def _synthetic_snapshot(poll: int, slots: int, base_ts: float) -> dict:
+    """生成一次轮询的多槽位快照, 数值带噪声, 解码信号/DTC 大部分时间保持不变"""
+    ts = base_ts + poll * 0.5
+    snapshot = {}
+    for slot in range(1, slots + 1):
+        fault = (poll // 600 + slot) % 37 == 0
+        snapshot[slot] = {
+            "card_status": {
+                "Timestamp": ts,
+                "Status": -1 if fault else 1,
+                "Voltage": round(12.0 + random.uniform(-0.05, 0.05), 2),
+                "Current": round(250.0 + random.uniform(-3, 3), 2),
+                "CardTemperature": 40 + (poll // 1200) % 5,
+            },
+            "dtc_codes": [{"DTC": "0xC07300", "Status": 9}] if fault else [],
+            "custom_rx1": {
+                "CMSIVideoAngel": "FOV direction 5",
+                "CMSIVideoZoom": "Zoom level 1",
+                "CMSIDispMod": "Video mode",
+                "CMSIVideoBackLi": f"Backlight brightness level {7 - fault}",
+                "CMSIVideoErrSt": "Fault" if fault else "Normal",
+            },
+            "custom_rx2": None,
+            "diag_results": {"0x8114": "8114"},
+        }
+    return snapshot
+
+
+def _benchmark_storage(polls: int = 2000, slots: int = 160) -> None:
+    """legacy/compact 两种布局的库体积、写入速率与曲线查询延迟对比"""
+    base_ts = time.time()
+    snapshots = [_synthetic_snapshot(p, slots, base_ts) for p in range(polls)]
+    with tempfile.TemporaryDirectory() as tmp:
+        delta_cfg = {
+            "Enable": True,
+            "Heartbeat": 60.0,
+            "Deadband": {"Voltage": 0.1, "Current": 5.0, "Temperature": 1.0},
+        }
+        runs = (
+            (LAYOUT_LEGACY, False, False),
+            (LAYOUT_COMPACT, False, False),
+            (LAYOUT_COMPACT, True, False),
+            (LAYOUT_COMPACT, True, True),
+        )
+        for mode, delta, rollup in runs:
+            label = mode + ("+delta" if delta else "") + ("+rollup" if rollup else "")
+            worker = DataBaseWorker(os.path.join(tmp, f"{label}.db"), storage_mode=mode)
+            worker.storage = None  # 布局对比只看单文件
+            worker.delta_config = delta_cfg if delta else {}
+            worker.rollup_config = {"Enable": rollup, "BucketSeconds": 60.0}
+            table_name = worker.create_new_table()
+            conn = worker._open_connection()
+            cursor = conn.cursor()
+            payload_cache: dict[str, int] = {}
+
+            t0 = time.perf_counter()
+            for snapshot in snapshots:
+                worker._insert_data_with_cursor(
+                    table_name, snapshot, cursor, payload_cache
+                )
+                conn.commit()
+            insert_s = time.perf_counter() - t0
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+            t0 = time.perf_counter()
+            for slot in range(1, slots + 1):
+                cursor.execute(
+                    f'SELECT * FROM "{table_name}" WHERE Slot=? ORDER BY Id DESC LIMIT ?',
+                    (slot, 2000),
+                ).fetchall()
+            tail_ms = (time.perf_counter() - t0) * 1000 / slots
+
+            t0 = time.perf_counter()
+            for slot in range(1, slots + 1, 16):
+                cursor.execute(
+                    f'SELECT * FROM "{table_name}" WHERE Slot=? ORDER BY Timestamp ASC',
+                    (slot,),
+                ).fetchall()
+            full_ms = (time.perf_counter() - t0) * 1000 / len(range(1, slots + 1, 16))
+
+            # 曲线缩小到全程: 有分桶时读分桶, 否则扫该槽位全部原始行
+            t0 = time.perf_counter()
+            for slot in range(1, slots + 1, 16):
+                if rollup:
+                    DataBaseWorker.query_rollup_buckets(conn, table_name, slot)
+                else:
+                    cursor.execute(
+                        f'SELECT Timestamp, Voltage, Current, Temperature FROM "{table_name}" WHERE Slot=?',
+                        (slot,),
+                    ).fetchall()
+            overview_ms = (time.perf_counter() - t0) * 1000 / len(range(1, slots + 1, 16))
+
+            t0 = time.perf_counter()
+            list(DataBaseWorker.export_summary_rows(conn, table_name, [-1]))
+            export_ms = (time.perf_counter() - t0) * 1000
+
+            stored = conn.execute(f'SELECT COUNT(*) FROM "{table_name}"').fetchone()[0]
+            conn.close()
+            worker.close()
+            rows = polls * slots
+            size_mb = os.path.getsize(worker.db_path) / 1024 / 1024
+            print(
+                f"[{label:>20}] rows={rows} stored={stored} size={size_mb:.1f}MB "
+                f"({size_mb * 1024 * 1024 / rows:.0f}B/sample) "
+                f"insert={rows / insert_s:,.0f} samples/s "
+                f"chart_tail={tail_ms:.2f}ms chart_full={full_ms:.2f}ms "
+                f"overview={overview_ms:.2f}ms export={export_ms:.1f}ms"
+            )
+
+
+def _per_slot_export_rows(conn: sqlite3.Connection, table_name: str, bad_status):
+    """旧版导出的逐槽位查询方式 (每槽位约 12 条查询), 作为对比基线"""
+    cursor = conn.cursor()
+    cursor.execute(f'SELECT DISTINCT Slot FROM "{table_name}" ORDER BY Slot ASC')
+    bad = list(bad_status)
+    for (slot,) in cursor.fetchall():
+        cursor.execute(
+            f'SELECT 1 FROM "{table_name}" WHERE Slot=? AND Status IN ({",".join("?" * len(bad))}) LIMIT 1',
+            [slot, *bad],
+        )
+        ng = cursor.fetchone() is not None
+        cursor.execute(
+            f'SELECT 1 FROM "{table_name}" WHERE Slot=? AND Status=1 LIMIT 1', (slot,)
+        )
+        ok = cursor.fetchone() is not None
+        out = [table_name, slot, "NG" if ng else ("OK" if ok else "--")]
+        for f in _EXPORT_FIELDS:
+            cursor.execute(
+                f'SELECT MIN({f}), MAX({f}), AVG({f}) FROM "{table_name}" WHERE Slot=? AND {f} IS NOT NULL',
+                (slot,),
+            )
+            min_val, max_val, avg_val = cursor.fetchone()
+            times = []
+            for value, order in ((min_val, "ASC"), (max_val, "DESC")):
+                cursor.execute(
+                    f'SELECT Timestamp FROM "{table_name}" WHERE Slot=? AND {f}=? ORDER BY Timestamp {order} LIMIT 1',
+                    (slot, value),
+                )
+                row = cursor.fetchone()
+                times.append(DataBaseWorker._fmt_export_time(row[0] if row else None))
+            out += [
+                DataBaseWorker._fmt_export_float(min_val),
+                times[0],
+                DataBaseWorker._fmt_export_float(max_val),
+                times[1],
+                DataBaseWorker._fmt_export_float(avg_val),
+            ]
+        yield out
+
+
+def _benchmark_export(slots: int = 160, samples_per_slot: int = 12500) -> None:
+    """合成多百万行批次表, 对比逐槽位查询与单条分组聚合的导出耗时"""
+    bad_status = [-3, -2, -1, 2, 3, 4]
+    with tempfile.TemporaryDirectory() as tmp:
+        worker = DataBaseWorker(os.path.join(tmp, "export.db"), storage_mode=LAYOUT_LEGACY)
+        worker.storage = None
+        worker.delta_config = {}
+        table_name = worker.create_new_table()
+        # 逐槽位基线按旧表结构 (无导出索引) 跑, 索引建好后再跑分组导出
+        for f in _EXPORT_FIELDS:
+            worker.connection.execute(f'DROP INDEX IF EXISTS "idx_{table_name}_slot_{f.lower()}"')
+        t0 = time.perf_counter()
+        worker.connection.execute(
+            f"""
+            WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+            INSERT INTO "{table_name}" (Slot, Timestamp, Status, Voltage, Current, Temperature,
+                                        DtcCodes, AdditionalInfo_1, AdditionalInfo_2, DiagResults)
+            SELECT i % ? + 1, 1.7e9 + (i / ?) * 0.5,
+                   CASE WHEN abs(random()) % 5000 = 0 THEN -1 ELSE 1 END,
+                   round(12.0 + (abs(random()) % 1000) / 10000.0, 2),
+                   round(250.0 + (abs(random()) % 600) / 100.0, 2),
+                   40 + abs(random()) % 5,
+                   '[]', '{{}}', 'null', '{{}}'
+            FROM n
+            """,
+            (slots * samples_per_slot - 1, slots, slots),
+        )
+        worker.connection.commit()
+        rows = slots * samples_per_slot
+        print(f"synthetic table: {rows:,} rows in {time.perf_counter() - t0:.1f}s")
+
+        conn = sqlite3.connect(worker.db_path)
+        t0 = time.perf_counter()
+        old = list(_per_slot_export_rows(conn, table_name, bad_status))
+        old_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        DataBaseWorker.ensure_export_indexes(conn, table_name)
+        conn.commit()
+        index_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        new = list(DataBaseWorker.export_summary_rows(conn, table_name, bad_status))
+        new_s = time.perf_counter() - t0
+        conn.close()
+        worker.close()
+        print(
+            f"per-slot queries: {old_s:.2f}s, grouped aggregation: {new_s:.2f}s "
+            f"({old_s / new_s:.1f}x), identical={old == new}; "
+            f"building the export indexes afterwards: {index_s:.2f}s"
+        )
+
+
+def _benchmark_sharding(runs: int = 200, polls: int = 120, slots: int = 40) -> None:
+    """单文件与按批次分文件: 累积大量批次后新建批次、读取最新批次曲线的耗时和主库体积"""
+    base_ts = time.time()
+    snapshots = [_synthetic_snapshot(p, slots, base_ts) for p in range(polls)]
+    with tempfile.TemporaryDirectory() as tmp:
+        for sharded in (False, True):
+            label = "sharded" if sharded else "single"
+            worker = DataBaseWorker(os.path.join(tmp, f"{label}.db"))
+            # 不随 FuncConfig 的 Sharding 开关变化, 两种方式都显式指定
+            worker.storage = (
+                RunStorage(worker.db_path, {"Compression": "none"}) if sharded else None
+            )
+            table_name = None
+            t0 = time.perf_counter()
+            for run in range(runs):
+                table_name = worker.create_new_table()
+                conn = worker.connection_for(table_name)
+                cursor = conn.cursor()
+                for snapshot in snapshots:
+                    worker._insert_data_with_cursor(table_name, snapshot, cursor)
+                conn.commit()
+                worker.close_run(table_name)
+            fill_s = time.perf_counter() - t0
+            if worker.storage is not None:
+                worker.storage.wait_maintenance()
+
+            t0 = time.perf_counter()
+            for _ in range(20):
+                worker.cursor.execute(
+                    "SELECT name FROM sqlite_master WHERE type IN ('table', 'view') AND name LIKE ?",
+                    (f"{table_name[:10]}_%",),
+                ).fetchall()
+                if worker.storage is not None:
+                    worker.storage.table_names_like(table_name[:10] + "_")
+            lookup_ms = (time.perf_counter() - t0) * 1000 / 20
+
+            t0 = time.perf_counter()
+            conn = sqlite3.connect(worker.db_path_for(table_name))
+            DataBaseWorker.query_chart_rows(conn, table_name, 1, max_points=2000)
+            conn.close()
+            open_ms = (time.perf_counter() - t0) * 1000
+
+            objects = worker.connection.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()[0]
+            worker.close()
+            main_mb = os.path.getsize(worker.db_path) / 1024 / 1024
+            print(
+                f"{label:>8}: {runs} runs in {fill_s:.1f}s, main db {main_mb:.1f} MB / {objects} objects, "
+                f"table-name lookup {lookup_ms:.2f} ms, cold chart open {open_ms:.1f} ms"
+            )
+
+
+BENCHES = {
+    "storage": _benchmark_storage,
+    "export": _benchmark_export,
+    "shards": _benchmark_sharding,
+}
+
+
+if __name__ == "__main__":
+    name = sys.argv[1] if len(sys.argv) > 1 else ""
+    if name not in BENCHES:
+        sys.exit(f"usage: python {sys.argv[0]} {{{'|'.join(BENCHES)}}}")
+    BENCHES[name]()
@@ -0,0 +1,85 @@
+"""
+整组取数基准: 逐 slot get_slot_results (旧路径) vs collect_group_snapshot
+
+用法: python bench/bench_group_snapshot.py [轮数]
+"""
+
+import os
+import sys
+import threading
+import time
+
+import can
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Tools  # noqa: E402
+from CompManager import ComponentsInstantiation  # noqa: E402
+from Diagnostic import MultiSlotDiagnostic  # noqa: E402
+from RxParser import RxSplitter  # noqa: E402
+
+
+class _CountingLock:
+    """统计 acquire 次数的锁包装"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def __enter__(self):
+        self.count += 1
+        return self._lock.__enter__()
+
+    def __exit__(self, *exc):
+        return self._lock.__exit__(*exc)
+
+
+def _benchmark_snapshot(polls: int = 2000) -> None:
+    """80 个 slot 的每轮取数耗时与诊断锁 acquire 次数"""
+    slot_count = 80
+    bus = can.Bus(interface="virtual", channel="bench_snapshot")
+    notifier = can.Notifier(bus, [])
+    app = ComponentsInstantiation(autostart=False)
+    rx = RxSplitter(dbc=None, switcher=[True, False, False])
+    diag = MultiSlotDiagnostic(bus, notifier, slot_count=slot_count)
+    app.register_component("AgingStatus", rx)
+    app.register_component("Diagnostic", diag)
+    app._register_default_ops()
+    for slot in range(1, slot_count + 1):
+        diag.results[slot] = {"F189": f"SW{slot:03d}"}
+        diag.periodic_last[slot] = {"F190": f"VIN{slot:05d}", "__ts__": 0.0}
+        diag.dtc_last[slot] = [{"dtc": "U0100", "status": 0x09}]
+    # 旧路径的 DTC 快照 op 只在 PeriodicReadDtc 启用时注册, 这里补上以便对比
+    app.register_op("dtc_periodic_snapshot", diag.periodic_dtc_snapshot)
+    slots = list(range(1, slot_count + 1))
+    counting = _CountingLock()
+    diag._lock = counting
+
+    def _legacy():
+        return {slot: Tools.get_slot_results(app, slot) for slot in slots}
+
+    def _bench(name, func):
+        counting.count = 0
+        started = time.perf_counter()
+        for _ in range(polls):
+            func()
+        elapsed = time.perf_counter() - started
+        print(
+            f"  {name:<9} {elapsed / polls * 1e6:>9.1f} us/poll"
+            f"  {counting.count / polls:>6.0f} 次加锁/poll"
+        )
+        return elapsed
+
+    assert _legacy() == app.collect_group_snapshot(slots)
+    print(f"{slot_count} 个 slot, {polls} 轮:")
+    legacy = _bench("legacy", _legacy)
+    batched = _bench("snapshot", lambda: app.collect_group_snapshot(slots))
+    print(f"  speedup   {legacy / batched:.2f}x")
+
+    diag.shutdown()
+    notifier.stop()
+    bus.shutdown()
+
+
+if __name__ == "__main__":
+    _benchmark_snapshot(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
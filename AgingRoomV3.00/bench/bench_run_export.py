@@ -0,0 +1,66 @@
+"""
+RunExporter 基准: 整表读入 Python 元组再解析 JSON 与分块导出 Parquet/Arrow 的速率和峰值内存
+
+用法: python bench/bench_run_export.py [polls] [slots]   (需要 pyarrow)
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_database import _synthetic_snapshot  # noqa: E402
+from DataBaseWorker import LAYOUT_COMPACT, DataBaseWorker  # noqa: E402
+from RunExporter import FORMAT_ARROW, FORMAT_PARQUET, RunExporter  # noqa: E402
+
+
+def _benchmark_export(polls: int = 2000, slots: int = 160) -> None:
+    """合成批次表, 对比整表读入 Python 元组再解析 JSON 与分块导出 Parquet/Arrow 的速率和峰值内存
+
+    速率与内存分两遍测, tracemalloc 本身会拖慢 Python 代码。
+    """
+    def _naive(conn, table_name):
+        data = conn.execute(f'SELECT * FROM "{table_name}"').fetchall()
+        return [tuple(json.loads(v) if isinstance(v, str) else v for v in row) for row in data]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        worker = DataBaseWorker(os.path.join(tmp, "runs.db"), storage_mode=LAYOUT_COMPACT)
+        worker.storage = None
+        worker.delta_config = {}
+        table_name = worker.create_new_table()
+        base_ts = time.time()
+        cursor = worker.connection.cursor()
+        for p in range(polls):
+            worker._insert_data_with_cursor(table_name, _synthetic_snapshot(p, slots, base_ts), cursor)
+        worker.connection.commit()
+        rows = polls * slots
+
+        t0 = time.perf_counter()
+        _naive(worker.connection, table_name)
+        naive_s = time.perf_counter() - t0
+        tracemalloc.start()
+        _naive(worker.connection, table_name)
+        naive_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"  tuples+json: {rows / naive_s:,.0f} rows/s, peak {naive_peak / 1e6:.0f} MB ({rows} rows)")
+
+        for fmt, ext in ((FORMAT_PARQUET, ".parquet"), (FORMAT_ARROW, ".arrow")):
+            out = os.path.join(tmp, "out" + ext)
+            stats = RunExporter(lambda _t: worker.db_path).export([table_name], out, fmt)
+            tracemalloc.start()
+            RunExporter(lambda _t: worker.db_path).export([table_name], out, fmt)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(
+                f"  {fmt:>11}: {stats['rows_per_s']:,} rows/s, peak {peak / 1e6:.0f} MB, "
+                f"{stats['bytes'] / 1e6:.1f} MB, {stats['columns']} columns"
+            )
+        worker.close()
+
+
+if __name__ == "__main__":
+    _benchmark_export(*(int(arg) for arg in sys.argv[1:3]))
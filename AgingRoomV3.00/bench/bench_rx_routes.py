@@ -0,0 +1,71 @@
+"""
+接收分流基准: 逐帧 split_by_can_id (旧路径) vs RxSplitter 的预计算路由表
+
+用法: python bench/bench_rx_routes.py [帧数]
+"""
+
+import os
+import sys
+import time
+
+import can
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Protocol import MAGNIFICATION, build_rx_route_table, split_by_can_id  # noqa: E402
+from RxParser import RxSplitter  # noqa: E402
+
+
+def _benchmark_routes(frame_count: int = 200_000) -> None:
+    """状态帧的端到端 (含 AgingStatus 解析) 与仅分流吞吐"""
+    splitter = RxSplitter(dbc=None, switcher=[True, False, False])
+    # 仅取真实站点（奇数站点编号）上报的状态帧
+    status_ids = [
+        can_id
+        for can_id, (key, _) in build_rx_route_table().items()
+        if key.endswith("_STATUS") and (can_id // MAGNIFICATION) % 2 == 1
+    ]
+    frames = [
+        can.Message(
+            arbitration_id=status_ids[i % len(status_ids)],
+            data=bytes([0, 120, 0, 3, 232, 0x15, 0x16, 65]),
+            timestamp=time.time(),
+        )
+        for i in range(min(frame_count, 10_000))
+    ]
+
+    def _legacy_on_message_received(msg: can.Message) -> None:
+        try:
+            key = split_by_can_id(msg.arbitration_id)
+        except ValueError:
+            return
+        handler = splitter._dispatch.get(key)
+        if handler is None:
+            return
+        handler(msg)
+
+    def _bench(name, func) -> float:
+        started = time.perf_counter()
+        for i in range(frame_count):
+            func(frames[i % len(frames)])
+        elapsed = time.perf_counter() - started
+        print(f"  {name:<8} {frame_count / elapsed:>12,.0f} frames/s")
+        return elapsed
+
+    print(f"{len(status_ids)} 个状态帧 ID, {frame_count} 帧")
+    print("端到端（含 AgingStatus 解析）:")
+    legacy = _bench("legacy", _legacy_on_message_received)
+    routed = _bench("routed", splitter.on_message_received)
+    print(f"  speedup  {legacy / routed:.2f}x")
+
+    # 仅分流开销：解析器替换为空函数
+    splitter._dispatch = {key: (lambda msg, slot=None: None) for key in splitter._dispatch}
+    splitter.rebuild_routes()
+    print("仅分流:")
+    legacy = _bench("legacy", _legacy_on_message_received)
+    routed = _bench("routed", splitter.on_message_received)
+    print(f"  speedup  {legacy / routed:.2f}x")
+
+
+if __name__ == "__main__":
+    _benchmark_routes(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
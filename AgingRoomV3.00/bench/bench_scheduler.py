@@ -0,0 +1,96 @@
+"""
+周期任务调度基准: 旧的 10ms 轮询 vs CompManager._PeriodicWorker 的截止时间堆
+
+用法: python bench/bench_scheduler.py [秒数]
+"""
+
+import os
+import sys
+import threading
+import time
+from typing import Callable, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from CompManager import _PeriodicWorker  # noqa: E402
+
+
+class _LegacyPeriodicWorker:
+    """原实现：每 10ms 醒来扫描全部任务, 串行执行, next_run = now + interval"""
+
+    def __init__(self):
+        self._jobs: dict[str, tuple[float, Callable[[], None]]] = {}
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add_job(self, name, interval_s, func, slow=None):
+        self._jobs[name] = (float(interval_s), func)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        self._stop_event.set()
+        self._thread.join(timeout=timeout)
+
+    def _run(self):
+        next_run = {name: time.time() for name in self._jobs}
+        while not self._stop_event.is_set():
+            now = time.time()
+            time.sleep(0.01)
+            for name, (interval_s, func) in list(self._jobs.items()):
+                if now < next_run.get(name, now):
+                    continue
+                func()
+                next_run[name] = now + interval_s
+
+
+def _benchmark_scheduler(seconds: float = 6.0) -> None:
+    """旧的 10ms 轮询 vs 堆调度：快任务的周期漂移/最大间隔, 以及空闲时的 CPU 占用"""
+
+    def _mixed(worker) -> str:
+        # 0.2s 的报文切换 (2ms) 与 1s 一次、耗时 0.7s 的诊断扫描并存
+        starts: list[float] = []
+
+        def _switch():
+            starts.append(time.monotonic())
+            time.sleep(0.002)
+
+        worker.add_job("Switch", 0.2, _switch)
+        worker.add_job("Sweep", 1.0, lambda: time.sleep(0.7), slow=True)
+        worker.start()
+        time.sleep(seconds)
+        worker.stop(timeout=2.0)
+        gaps = [b - a for a, b in zip(starts, starts[1:])]
+        drift = (starts[-1] - starts[0]) - 0.2 * (len(starts) - 1)
+        return (
+            f"Switch {len(starts):3d}/{int(seconds / 0.2) + 1} 次  "
+            f"平均周期 {sum(gaps) / len(gaps) * 1000:6.1f} ms  "
+            f"最大间隔 {max(gaps) * 1000:6.1f} ms  累计漂移 {drift * 1000:7.1f} ms"
+        )
+
+    def _idle(worker) -> str:
+        worker.add_job("Idle", 1.0, lambda: None)
+        worker.start()
+        cpu = time.process_time()
+        time.sleep(seconds / 2)
+        cpu = time.process_time() - cpu
+        worker.stop()
+        return f"空闲 CPU {cpu * 1000 / (seconds / 2):6.2f} ms/s"
+
+    for name, factory in (("legacy", _LegacyPeriodicWorker), ("heap", _PeriodicWorker)):
+        print(f"{name:<7} {_mixed(factory())}")
+        print(f"{name:<7} {_idle(factory())}")
+    worker = _PeriodicWorker()
+    _mixed(worker)
+    for job, stats in worker.metrics().items():
+        print(
+            f"  {job:<7} runs {stats['runs']:3d}  overruns {stats['overruns']:2d}  "
+            f"lateness avg/max {stats['lateness_avg_ms']:5.2f}/{stats['lateness_max_ms']:5.2f} ms  "
+            f"runtime avg {stats['runtime_avg_ms']:6.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    _benchmark_scheduler(float(sys.argv[1]) if len(sys.argv) > 1 else 6.0)
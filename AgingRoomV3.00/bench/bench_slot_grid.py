@@ -0,0 +1,105 @@
+"""
+大机架槽位网格基准: QTableWidget 逐格 item vs SlotGrid 模型/委托, 对比构建与整组翻转的耗时
+
+用法: python bench/bench_slot_grid.py [组数] [每组槽位] [翻转次数]
+无显示器时可设 QT_QPA_PLATFORM=offscreen
+"""
+
+import os
+import sys
+import time
+from math import ceil
+from typing import Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PySide6.QtCore import Qt  # noqa: E402
+from PySide6.QtGui import QBrush, QColor  # noqa: E402
+from PySide6.QtWidgets import QApplication, QTableWidget, QTableWidgetItem  # noqa: E402
+
+import Tools  # noqa: E402
+from SlotGrid import (  # noqa: E402
+    DEFAULT_COLOR,
+    SlotGridModel,
+    SlotGridView,
+    _style_grid,
+    setup_slot_view,
+)
+
+
+def _benchmark_grid(groups: int = 6, slot_count: int = 80, storms: int = 40) -> None:
+    """每组槽位全部翻转一次状态并重绘的平均耗时"""
+    rows = 5
+    cols = int(ceil(slot_count / rows))
+    qt_app = QApplication(sys.argv[:1])
+
+    def _color_key(status: int) -> Optional[str]:
+        return None if status == 0 else ("good" if status == 1 else "Warning")
+
+    def _paint(widgets) -> None:
+        for w in widgets:
+            w.viewport().repaint()
+
+    def _build_widgets():
+        tables = []
+        for g in range(groups):
+            table = QTableWidget(rows, cols)
+            for slot in range(1, slot_count + 1):
+                item = QTableWidgetItem(str(slot))
+                item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+                item.setFlags(Qt.ItemFlag.ItemIsEnabled)
+                table.setItem((slot - 1) // cols, (slot - 1) % cols, item)
+            _style_grid(table)
+            table.resize(900, 200)
+            table.show()
+            tables.append(table)
+        return tables
+
+    def _storm_widgets(tables, status: int) -> None:
+        brush = QBrush(QColor(Tools.COLOR_MAPPING.get(_color_key(status), DEFAULT_COLOR)))
+        for table in tables:
+            table.setUpdatesEnabled(False)
+            for slot in range(1, slot_count + 1):
+                table.item((slot - 1) // cols, (slot - 1) % cols).setBackground(brush)
+            table.setUpdatesEnabled(True)
+
+    def _build_models():
+        views = []
+        for g in range(groups):
+            view = SlotGridView()
+            setup_slot_view(view, SlotGridModel(slot_count, rows, _color_key, view))
+            view.resize(900, 200)
+            view.show()
+            views.append(view)
+        return views
+
+    def _storm_models(views, status: int) -> None:
+        changes = {slot: status for slot in range(1, slot_count + 1)}
+        for view in views:
+            view.model().set_statuses(changes)
+
+    for name, build, storm in (
+        ("widget", _build_widgets, _storm_widgets),
+        ("model", _build_models, _storm_models),
+    ):
+        started = time.perf_counter()
+        widgets = build()
+        qt_app.processEvents()
+        _paint(widgets)
+        build_ms = (time.perf_counter() - started) * 1000.0
+        started = time.perf_counter()
+        for i in range(storms):
+            storm(widgets, 1 if i % 2 else -1)
+            _paint(widgets)
+        storm_ms = (time.perf_counter() - started) * 1000.0 / storms
+        print(
+            f"{name:<7} {groups} 组 x {slot_count} 槽位  构建+首绘 {build_ms:7.1f} ms  "
+            f"整组翻转+重绘 {storm_ms:6.2f} ms/次"
+        )
+        for w in widgets:
+            w.close()
+        qt_app.processEvents()
+
+
+if __name__ == "__main__":
+    _benchmark_grid(*(int(arg) for arg in sys.argv[1:4]))
@@ -0,0 +1,112 @@
+"""
+上下电风暴基准: 逐槽位跨线程信号 vs 每组一个批量信号, 对比 SlotGrid 模型的应用耗时、生效延迟与 GUI 帧间隔
+
+用法: python bench/bench_slot_storm.py [风暴轮数] [组数] [每组槽位]
+需要图形环境, 无显示器时可设 QT_QPA_PLATFORM=offscreen。
+"""
+
+import os
+import sys
+import time
+from typing import Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PySide6.QtCore import QEventLoop, QObject, QThread, Signal, Slot  # noqa: E402
+from PySide6.QtWidgets import QApplication  # noqa: E402
+
+from main import _FrameProbe  # noqa: E402
+from SlotGrid import SlotGridModel, SlotGridView, setup_slot_view  # noqa: E402
+
+
+def _color_key(status: int) -> Optional[str]:
+    return "good" if status == 1 else "Warning"
+
+
+def _benchmark_storm(rounds: int = 50, groups: int = 2, slots: int = 80) -> None:
+    """每轮所有组的全部槽位同时翻转状态, 与 Connector.on_slot_statuses_changed 相同走模型 set_statuses"""
+    qt_app = QApplication.instance() or QApplication(sys.argv[:1])
+    views = []
+    for g in range(groups):
+        view = SlotGridView()
+        setup_slot_view(view, SlotGridModel(slots, 5, _color_key, view))
+        view.resize(900, 260)
+        view.move(0, g * 280)
+        view.show()
+        views.append(view)
+
+    # 每轮风暴开始发射的时刻, 最后一格生效时记录端到端延迟
+    storm_started = [0.0]
+
+    class _Sink(QObject):
+        def __init__(self):
+            super().__init__()
+            self.apply_ms = 0.0
+            self.latency_ms: list[float] = []
+
+        def _done(self, group: int, slot: int) -> None:
+            if group == groups - 1 and slot == slots:
+                self.latency_ms.append((time.perf_counter() - storm_started[0]) * 1000.0)
+
+        @Slot(int, int, int)
+        def on_one(self, group: int, slot: int, status: int) -> None:
+            started = time.perf_counter()
+            views[group].model().set_statuses({slot: status})
+            self.apply_ms += (time.perf_counter() - started) * 1000.0
+            self._done(group, slot)
+
+        @Slot(int, list)
+        def on_many(self, group: int, changes: list) -> None:
+            started = time.perf_counter()
+            views[group].model().set_statuses(dict(changes))
+            self.apply_ms += (time.perf_counter() - started) * 1000.0
+            self._done(group, changes[-1][0])
+
+    class _Source(QThread):
+        one = Signal(int, int, int)
+        many = Signal(int, list)
+
+        def __init__(self, batched: bool):
+            super().__init__()
+            self.batched = batched
+
+        def run(self):
+            for r in range(rounds):
+                status = 1 if r % 2 else -1
+                storm_started[0] = time.perf_counter()
+                for g in range(groups):
+                    changes = [(slot, status) for slot in range(1, slots + 1)]
+                    if self.batched:
+                        self.many.emit(g, changes)
+                    else:
+                        for slot, st in changes:
+                            self.one.emit(g, slot, st)
+                self.msleep(100)
+
+    for name, batched in (("per-slot", False), ("batched", True)):
+        sink = _Sink()
+        source = _Source(batched)
+        source.one.connect(sink.on_one)
+        source.many.connect(sink.on_many)
+        probe = _FrameProbe()
+        loop = QEventLoop()
+        source.finished.connect(loop.quit)
+        probe.start(name, window_s=3600)
+        source.start()
+        loop.exec()
+        report = probe.stop() or {}
+        signals = rounds * groups * (1 if batched else slots)
+        latency = sorted(sink.latency_ms) or [0.0]
+        print(
+            f"{name:<9} {signals:>6} 个信号  应用 {sink.apply_ms / rounds:6.2f} ms/风暴  "
+            f"生效延迟 p50 {latency[len(latency) // 2]:6.2f}ms max {latency[-1]:6.2f}ms  "
+            f"帧间隔 p50 {report.get('p50_ms', 0):5.1f}ms "
+            f"p95 {report.get('p95_ms', 0):5.1f}ms max {report.get('max_ms', 0):6.1f}ms"
+        )
+    for view in views:
+        view.close()
+    qt_app.processEvents()
+
+
+if __name__ == "__main__":
+    _benchmark_storm(*(int(arg) for arg in sys.argv[1:4]))
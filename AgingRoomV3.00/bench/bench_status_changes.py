@@ -0,0 +1,73 @@
+"""
+AgingThread 每轮取变化基准: 全表比较 (旧路径) vs AgingStatus 维护的变化集合
+
+用法: python bench/bench_status_changes.py
+"""
+
+import os
+import sys
+import time
+
+import can
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from RxParser import _INACTIVE_STATUS, AgingStatus  # noqa: E402
+
+
+def _benchmark_changes() -> None:
+    """空闲机架与满载稳定机架下, 每轮取变化 slot 与激活 slot 的耗时"""
+    aging = AgingStatus()
+    slot_total = aging.slot_count
+    last = {"codes": aging.status_codes()}
+
+    def _scan_cycle():
+        codes = aging.status_codes()
+        changed = (codes != last["codes"]).nonzero()[0].tolist()
+        last["codes"] = codes
+        active = (np.flatnonzero(~np.isin(codes[1:], _INACTIVE_STATUS)) + 1).tolist()
+        return changed, active
+
+    cached = {"version": None, "active": []}
+
+    def _dirty_cycle():
+        # 与 AgingThread 相同：激活集合版本未变时沿用上轮列表
+        changed = aging.drain_changed()
+        version = aging.active_version()
+        if version != cached["version"]:
+            cached["version"] = version
+            cached["active"] = aging.active_slots()
+        return changed, cached["active"]
+
+    def _cycle_bench(name, func, cycles=20_000) -> None:
+        started = time.perf_counter()
+        for _ in range(cycles):
+            func()
+        elapsed = time.perf_counter() - started
+        print(f"  {name:<8} {elapsed / cycles * 1e6:>8.2f} us/cycle")
+
+    print(f"AgingThread 每轮取变化（{slot_total} slot, 无状态变化）:")
+    print(" 空闲机架:")
+    _cycle_bench("scan", _scan_cycle)
+    _cycle_bench("dirty", _dirty_cycle)
+    steady = [
+        can.Message(
+            arbitration_id=0,
+            data=bytes([0, 120, 0x07, 0xA1, 0x20, 0x15, 0x16, 65]),
+            timestamp=time.time(),
+        )
+        for _ in range(slot_total)
+    ]
+    for slot, msg in enumerate(steady, start=1):
+        aging.decoding(msg, slot)
+    assert len(aging.active_slots()) == slot_total
+    _scan_cycle()
+    _dirty_cycle()
+    print(" 满载机架（状态稳定）:")
+    _cycle_bench("scan", _scan_cycle)
+    _cycle_bench("dirty", _dirty_cycle)
+
+
+if __name__ == "__main__":
+    _benchmark_changes()
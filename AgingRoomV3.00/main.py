@@ -1,12 +1,14 @@
 from __future__ import annotations
 
+import os
 import re
 import sys
 import time
+import threading
 import Tools
+import RunExporter
 import sqlite3
 import logging
-import csv
 import json
 
 from math import ceil
@@ -17,10 +19,12 @@ from datetime import datetime, timedelta
 from DataBaseWorker import DataBaseWorker
 from ui.main_widget_ui import Ui_MainWidget
 from CompManager import ComponentsInstantiation
-from Tools import COLOR_MAPPING, FUNCTION_CONFIG, PROJECT_CONFIG
+from SlotGrid import SlotGridModel, replace_table_widget, setup_slot_view
+from Tools import FUNCTION_CONFIG, PROJECT_CONFIG
 from PySide6.QtCore import (
     Qt,
     Signal,
+    QObject,
     QThread,
     Slot,
     QTimer,
@@ -28,6 +32,7 @@ from PySide6.QtCore import (
     QMargins,
     QPointF,
     QLineF,
+    QModelIndex,
 )
 from PySide6.QtGui import QColor, QBrush, QPainter, QCursor, QPen
 from PySide6.QtWidgets import (
@@ -43,6 +48,7 @@ from PySide6.QtWidgets import (
     QCheckBox,
     QPushButton,
     QSizePolicy,
+    QTableView,
     QTableWidget,
     QTableWidgetItem,
     QWidget,
@@ -65,6 +71,11 @@ from PySide6.QtCharts import (
 
 _log = logging.getLogger(__name__)
 
+# 延时报警期间按正常显示的状态码
+_ALARM_DELAY_STATUS = (-3, -2, -1, 1, 2, 3, 4)
+# 单批变化的槽位数达到该值视为上下电风暴, 期间测量 GUI 帧间隔
+_SLOT_STORM_THRESHOLD = 20
+
 
 class Connector(QWidget):
     def __init__(
@@ -99,6 +110,17 @@ class Connector(QWidget):
             i: {} for i in range(1, self._group_count + 1)
         }
         self._non_recoverable_status = self._load_non_recoverable_status()
+        # 槽位批量刷新统计 (批次数/槽位数/应用耗时), 退出时写日志
+        self._slot_batch_metrics = {
+            "batches": 0,
+            "slots": 0,
+            "apply_ms_total": 0.0,
+            "apply_ms_max": 0.0,
+            "max_batch": 0,
+        }
+        self._frame_probe = _FrameProbe(self)
+        # 每组槽位网格的数据模型, 颜色变化统一走模型的 dataChanged
+        self._slot_models: dict[int, SlotGridModel] = {}
         self._db_worker = DataBaseWorker()
         self._db_worker.initialization()
         self._db_worker.start_writing()
@@ -148,6 +170,10 @@ class Connector(QWidget):
         for idx in range(1, 4):
             group_box = getattr(self.ui, f"groupBox_{idx}", None)
             table = getattr(self.ui, f"iconTable_{idx}", None)
+            if isinstance(table, QTableWidget):
+                # Designer 生成的是 QTableWidget, 运行时原位换成模型/委托视图
+                table = replace_table_widget(table)
+                setattr(self.ui, f"iconTable_{idx}", table)
             icon_frame = getattr(self.ui, f"iconFrame_{idx}", None)
             control_frame = getattr(self.ui, f"controlFrame_{idx}", None)
             control_layout = getattr(self.ui, f"controlLayout_{idx}", None)
@@ -165,7 +191,7 @@ class Connector(QWidget):
             if not visible:
                 continue
             group_box.setTitle(f"第{i}组")
-            self._render_slots(table, slots_per_group, fixed_rows)
+            self._render_slots(i, table, slots_per_group, fixed_rows)
 
             if icon_frame is not None:
                 icon_frame.setSizePolicy(
@@ -203,9 +229,12 @@ class Connector(QWidget):
         self._bind_stop_clicks()
 
     def _init_history(self) -> None:
+        # 历史查询在后台线程执行, 只采用最新一次请求的结果
+        self._history_seq = 0
+        self._history_workers: set[_HistoryQueryWorker] = set()
         self._setup_history_table()
         self._bind_history_controls()
-        self._refresh_history_date_options()
+        self._request_history(refresh_dates=True)
 
     def _setup_history_table(self) -> None:
         table = getattr(self.ui, "historyTable", None)
@@ -253,8 +282,7 @@ class Connector(QWidget):
         if combo_day is not None:
             combo_day.currentIndexChanged.connect(self._on_history_date_changed)
 
-    def _refresh_history_date_options(self) -> None:
-        prefixes = self._fetch_summary_date_prefixes()
+    def _refresh_history_date_options(self, prefixes: list[str]) -> None:
         dates = []
         for prefix in prefixes:
             parts = prefix.split("_")
@@ -320,15 +348,40 @@ class Connector(QWidget):
         combo.blockSignals(False)
 
     def _on_history_refresh(self) -> None:
-        self._refresh_history_date_options()
-        self._load_history_summary(self._get_history_date_prefix())
+        self._request_history(refresh_dates=True)
 
     def _on_history_query(self) -> None:
-        self._load_history_summary(self._get_history_date_prefix())
+        self._request_history(refresh_dates=False)
 
     def _on_history_date_changed(self) -> None:
-        self._refresh_history_date_options()
-        self._load_history_summary(self._get_history_date_prefix())
+        self._request_history(refresh_dates=True)
+
+    def _request_history(self, refresh_dates: bool) -> None:
+        self._history_seq += 1
+        worker = _HistoryQueryWorker(
+            self._db_worker,
+            self._history_seq,
+            self._get_history_date_prefix(),
+            refresh_dates,
+        )
+        worker.loaded.connect(self._on_history_loaded)
+        worker.finished.connect(lambda w=worker: self._history_workers.discard(w))
+        self._history_workers.add(worker)
+        worker.start()
+
+    def _on_history_loaded(
+        self, seq: int, date_prefix: object, prefixes: object, rows: list
+    ) -> None:
+        if seq != self._history_seq:
+            return  # 已有更新的请求
+        if prefixes is not None:
+            self._refresh_history_date_options(prefixes)
+            current = self._get_history_date_prefix()
+            if current != date_prefix:
+                # 选项刷新后当前日期被重置, 按新的前缀再查一次
+                self._request_history(refresh_dates=False)
+                return
+        self._fill_history_table(rows)
 
     def _get_history_date_prefix(self) -> Optional[str]:
         combo_year = getattr(self.ui, "combo_history_year", None)
@@ -347,24 +400,11 @@ class Connector(QWidget):
             return f"{year:04d}_{month:02d}"
         return f"{year:04d}_{month:02d}_{day:02d}"
 
-    def _load_history_summary(self, date_prefix: Optional[str]) -> None:
+    def _fill_history_table(self, rows: list[dict]) -> None:
         table = getattr(self.ui, "historyTable", None)
         if table is None:
             return
-        table.setRowCount(0)
-
-        db_path = getattr(self._db_worker, "db_path", "./aging_data.db")
-        try:
-            conn = sqlite3.connect(db_path)
-        except Exception:
-            return
-
-        try:
-            self._ensure_summary_table(conn)
-            rows = self._query_summary_rows(conn, date_prefix)
-        finally:
-            conn.close()
-
+        table.setUpdatesEnabled(False)
         table.setRowCount(len(rows))
         for r, row in enumerate(rows):
             values = row["values"]
@@ -374,66 +414,12 @@ class Connector(QWidget):
                 if c == 0:
                     item.setData(Qt.ItemDataRole.UserRole, row["table_name"])
                 table.setItem(r, c, item)
+        table.setUpdatesEnabled(True)
 
-    def _fetch_summary_date_prefixes(self) -> list[str]:
-        db_path = getattr(self._db_worker, "db_path", "./aging_data.db")
-        try:
-            conn = sqlite3.connect(db_path)
-        except Exception:
-            return []
-        try:
-            self._ensure_summary_table(conn)
-            cursor = conn.cursor()
-            cursor.execute(
-                "SELECT DISTINCT DatePrefix FROM Summary WHERE DatePrefix IS NOT NULL ORDER BY DatePrefix DESC"
-            )
-            return [row[0] for row in cursor.fetchall() if row and row[0]]
-        finally:
-            conn.close()
-
-    def _ensure_summary_table(self, conn: sqlite3.Connection) -> None:
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS Summary (
-                TableName TEXT PRIMARY KEY,
-                DatePrefix TEXT,
-                GroupIndex INTEGER,
-                Project TEXT,
-                Operator TEXT,
-                SetHours REAL,
-                StartTime REAL,
-                EndTime REAL,
-                AgingSeconds REAL,
-                Total INTEGER,
-                Good INTEGER,
-                Bad INTEGER,
-                GoodRate REAL
-            )
-            """
-        )
-        conn.commit()
-
-    def _query_summary_rows(
-        self, conn: sqlite3.Connection, date_prefix: Optional[str]
-    ) -> list[dict]:
-        cursor = conn.cursor()
-        if date_prefix:
-            cursor.execute(
-                """
-                SELECT TableName, GroupIndex, Project, Operator, SetHours, AgingSeconds, Total, Good, GoodRate
-                FROM Summary WHERE DatePrefix LIKE ? ORDER BY TableName DESC
-                """,
-                (f"{date_prefix}%",),
-            )
-        else:
-            cursor.execute(
-                """
-                SELECT TableName, GroupIndex, Project, Operator, SetHours, AgingSeconds, Total, Good, GoodRate
-                FROM Summary ORDER BY TableName DESC
-                """
-            )
+    @classmethod
+    def _format_summary_rows(cls, summary_rows: list[tuple]) -> list[dict]:
         rows = []
-        for idx, row in enumerate(cursor.fetchall(), start=1):
+        for idx, row in enumerate(summary_rows, start=1):
             (
                 table_name,
                 group_index,
@@ -448,14 +434,14 @@ class Connector(QWidget):
             set_duration = "--"
             if set_hours is not None:
                 try:
-                    set_duration = self._format_duration(float(set_hours) * 3600)
+                    set_duration = cls._format_duration(float(set_hours) * 3600)
                 except Exception:
                     set_duration = "--"
 
             aging_duration = "--"
             if aging_seconds is not None:
                 try:
-                    aging_duration = self._format_duration(float(aging_seconds))
+                    aging_duration = cls._format_duration(float(aging_seconds))
                 except Exception:
                     aging_duration = "--"
 
@@ -483,11 +469,23 @@ class Connector(QWidget):
         table = getattr(self.ui, "historyTable", None)
         if table is None or table.rowCount() == 0:
             return
-        file_path, _ = QFileDialog.getSaveFileName(
-            self, "导出汇总表", "summary.csv", "CSV Files (*.csv)"
+        file_path, selected_filter = QFileDialog.getSaveFileName(
+            self,
+            "导出汇总表",
+            "summary.csv",
+            "CSV Files (*.csv);;Parquet Files (*.parquet);;Arrow IPC Files (*.arrow)",
         )
         if not file_path:
             return
+        ext = os.path.splitext(file_path)[1].lower()
+        if not ext:
+            ext = (
+                ".parquet"
+                if "Parquet" in selected_filter
+                else ".arrow" if "Arrow" in selected_filter else ".csv"
+            )
+            file_path += ext
+        raw_export = ext in (".parquet", ".arrow")
         selected_rows = (
             table.selectionModel().selectedRows() if table.selectionModel() else []
         )
@@ -499,18 +497,12 @@ class Connector(QWidget):
                 if table_name:
                     table_names = [table_name]
         if not table_names:
-            date_prefix = self._get_history_date_prefix()
-            db_path = getattr(self._db_worker, "db_path", "./aging_data.db")
-            try:
-                conn = sqlite3.connect(db_path)
-            except Exception:
-                return
-            try:
-                self._ensure_summary_table(conn)
-                rows = self._query_summary_rows(conn, date_prefix)
-                table_names = [row["table_name"] for row in rows]
-            finally:
-                conn.close()
+            # 未选中时导出当前列表 (即当前日期前缀的查询结果), 不再重新查库
+            for r in range(table.rowCount()):
+                item = table.item(r, 0)
+                table_name = item.data(Qt.ItemDataRole.UserRole) if item else None
+                if table_name:
+                    table_names.append(table_name)
 
         if not table_names:
             return
@@ -520,12 +512,26 @@ class Connector(QWidget):
             and self._history_export_worker.isRunning()
         ):
             return
+        if raw_export:
+            # 原始数据按批次流式导出为列式文件, 供离线分析
+            if not RunExporter.available():
+                _log.error("导出 Parquet/Arrow 需要安装 pyarrow")
+                return
+            self._history_export_worker = _RawExportWorker(
+                getattr(self._db_worker, "db_path", "./aging_data.db"),
+                table_names,
+                file_path,
+                path_for=getattr(self._db_worker, "db_path_for", None),
+            )
+            self._history_export_worker.start()
+            return
         bad_status = set(FUNCTION_CONFIG.get("UI", {}).get("NonRecoverableStatus", []))
         self._history_export_worker = _HistoryExportWorker(
             getattr(self._db_worker, "db_path", "./aging_data.db"),
             table_names,
             file_path,
             bad_status,
+            path_for=getattr(self._db_worker, "db_path_for", None),
         )
         self._history_export_worker.start()
 
@@ -538,37 +544,9 @@ class Connector(QWidget):
         set_hours: Optional[float],
         start_time: float,
     ) -> None:
-        db_path = getattr(self._db_worker, "db_path", "./aging_data.db")
-        conn = sqlite3.connect(db_path)
-        try:
-            self._ensure_summary_table(conn)
-            date_prefix = table_name[:10]
-            conn.execute(
-                """
-                INSERT OR REPLACE INTO Summary
-                (TableName, DatePrefix, GroupIndex, Project, Operator, SetHours, StartTime,
-                 EndTime, AgingSeconds, Total, Good, Bad, GoodRate)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    table_name,
-                    date_prefix,
-                    int(group_index),
-                    project or "--",
-                    operator or "--",
-                    set_hours,
-                    float(start_time),
-                    None,
-                    None,
-                    None,
-                    None,
-                    None,
-                    None,
-                ),
-            )
-            conn.commit()
-        finally:
-            conn.close()
+        self._db_worker.write_summary_start(
+            table_name, group_index, project, operator, set_hours, start_time
+        )
 
     def _write_summary_end(
         self,
@@ -580,29 +558,9 @@ class Connector(QWidget):
         bad: int,
         good_rate: float,
     ) -> None:
-        db_path = getattr(self._db_worker, "db_path", "./aging_data.db")
-        conn = sqlite3.connect(db_path)
-        try:
-            self._ensure_summary_table(conn)
-            conn.execute(
-                """
-                UPDATE Summary
-                SET EndTime=?, AgingSeconds=?, Total=?, Good=?, Bad=?, GoodRate=?
-                WHERE TableName=?
-                """,
-                (
-                    float(end_time),
-                    aging_seconds,
-                    int(total),
-                    int(good),
-                    int(bad),
-                    float(good_rate),
-                    table_name,
-                ),
-            )
-            conn.commit()
-        finally:
-            conn.close()
+        self._db_worker.write_summary_end(
+            table_name, end_time, aging_seconds, total, good, bad, good_rate
+        )
 
     def _populate_combo_options(self) -> None:
         projects = list(PROJECT_CONFIG.keys())
@@ -675,91 +633,74 @@ class Connector(QWidget):
             if combo_worker is not None:
                 combo_worker.currentIndexChanged.connect(self._on_select_changed)
 
-    def _render_slots(self, table: QTableWidget, slot_count: int, rows: int) -> None:
-        cols = int(ceil(slot_count / rows)) if rows > 0 else slot_count
-        rows = max(1, rows)
-
-        table.clear()
-        table.setRowCount(rows)
-        table.setColumnCount(cols)
-        table.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
-        table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
-        table.setSelectionMode(QAbstractItemView.SelectionMode.NoSelection)
-        table.setFocusPolicy(Qt.FocusPolicy.NoFocus)
-        table.setShowGrid(True)
-        table.horizontalHeader().setVisible(False)
-        table.verticalHeader().setVisible(False)
-        table.horizontalHeader().setDefaultSectionSize(28)
-        table.verticalHeader().setDefaultSectionSize(28)
-        table.horizontalHeader().setSectionResizeMode(
-            table.horizontalHeader().ResizeMode.Stretch
-        )
-        table.verticalHeader().setSectionResizeMode(
-            table.verticalHeader().ResizeMode.Stretch
-        )
-
-        for slot in range(1, slot_count + 1):
-            r = (slot - 1) // cols
-            c = (slot - 1) % cols
-            item = QTableWidgetItem(str(slot))
-            item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            item.setFlags(Qt.ItemFlag.ItemIsEnabled)
-            table.setItem(r, c, item)
-
-        # 清空多余单元格
-        for r in range(rows):
-            for c in range(cols):
-                slot = r * cols + c + 1
-                if slot > slot_count:
-                    table.setItem(r, c, QTableWidgetItem(""))
+    def _render_slots(
+        self, group_index: int, view: QTableView, slot_count: int, rows: int
+    ) -> None:
+        model = self._slot_models.get(group_index)
+        if model is None:
+            model = SlotGridModel(slot_count, rows, self._map_status_to_color, view)
+            self._slot_models[group_index] = model
+            setup_slot_view(view, model)
+        else:
+            model.configure(slot_count, rows)
 
     def _bind_slot_clicks(self) -> None:
         for idx in range(1, 4):
             table = getattr(self.ui, f"iconTable_{idx}", None)
             if table is None:
                 continue
-            table.cellClicked.connect(
-                lambda row, col, g=idx, t=table: self._on_slot_clicked(g, t, row, col)
-            )
+            table.clicked.connect(lambda index, g=idx: self._on_slot_clicked(g, index))
 
-    def _on_slot_clicked(
-        self, group_index: int, table: QTableWidget, row: int, col: int
-    ) -> None:
-        item = table.item(row, col)
-        if item is None:
-            return
-        text = item.text().strip()
-        if not text:
-            return
-        try:
-            slot_no = int(text)
-        except ValueError:
+    def _on_slot_clicked(self, group_index: int, index: QModelIndex) -> None:
+        model = self._slot_models.get(group_index)
+        slot_no = model.slot_at(index) if model is not None else None
+        if slot_no is None:
             return
         dialog = SlotDetailDialog(self, group_index, slot_no)
         dialog.exec()
 
-    def on_slot_status_changed(
-        self, group_index: int, slot_no: int, status: int
-    ) -> None:
-        """根据状态变更某个槽位的显示颜色,延时报警功能"""
+    def on_slot_statuses_changed(self, group_index: int, changes: list) -> None:
+        """按一个刷新周期内的 [(slot, status)] 变化批量更新槽位颜色,延时报警功能"""
         state = self._group_state.get(group_index, {})
-        if not state.get("running") or state.get("frozen"):
+        if not state.get("running") or state.get("frozen") or not changes:
             return
-        self._slot_raw_status.setdefault(group_index, {})[slot_no] = status
-        if self._is_alarm_delay_active(group_index) and status in (
-            -3,
-            -2,
-            -1,
-            1,
-            2,
-            3,
-            4,
-        ):  # 设置特定状态延时报警
-            display_status = 1
-        else:
-            display_status = self._apply_latched_status(group_index, slot_no, status)
-        self._slot_status.setdefault(group_index, {})[slot_no] = display_status
-        self._slot_change_color(group_index, slot_no, display_status)
+        if len(changes) >= _SLOT_STORM_THRESHOLD:
+            # 上下电沿：整组同时翻转, 从此刻起测量事件循环帧间隔
+            self._frame_probe.start(f"第{group_index}组 {len(changes)} 个槽位")
+        started = time.perf_counter()
+        raw_map = self._slot_raw_status.setdefault(group_index, {})
+        status_map = self._slot_status.setdefault(group_index, {})
+        delay_active = self._is_alarm_delay_active(group_index)
+        display: dict[int, int] = {}
+        for slot_no, status in changes:
+            raw_map[slot_no] = status
+            if delay_active and status in _ALARM_DELAY_STATUS:  # 设置特定状态延时报警
+                display_status = 1
+            else:
+                display_status = self._apply_latched_status(
+                    group_index, slot_no, status
+                )
+            status_map[slot_no] = display_status
+            display[slot_no] = display_status
+        self._slot_change_colors(group_index, display)
+
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        metrics = self._slot_batch_metrics
+        metrics["batches"] += 1
+        metrics["slots"] += len(changes)
+        metrics["apply_ms_total"] += elapsed_ms
+        metrics["apply_ms_max"] = max(metrics["apply_ms_max"], elapsed_ms)
+        metrics["max_batch"] = max(metrics["max_batch"], len(changes))
+
+    def slot_update_metrics(self) -> dict:
+        """槽位批量刷新统计与最近一次风暴期间的帧间隔"""
+        metrics = dict(self._slot_batch_metrics)
+        batches = metrics["batches"]
+        metrics["apply_ms_avg"] = (
+            metrics["apply_ms_total"] / batches if batches else 0.0
+        )
+        metrics["storm_frames"] = self._frame_probe.last_report()
+        return metrics
 
     def on_group_summary_updated(
         self,
@@ -833,34 +774,14 @@ class Connector(QWidget):
             return False
         return (time.time() - float(start_time)) < delay
 
-    def _slot_change_color(self, group_index: int, slot_no: int, status: int) -> None:
-        """变更某个槽位的显示颜色"""
+    def _slot_change_colors(self, group_index: int, status_map: dict[int, int]) -> None:
+        """批量变更槽位的显示颜色, 模型对变化区域发一次 dataChanged"""
         state = self._group_state.get(group_index, {})
-        if state.get("paused"):
+        if state.get("paused") or not status_map:
             return
-        table = getattr(self.ui, f"iconTable_{group_index}", None)
-        if table is None:
-            return
-        cols = table.columnCount()
-        rows = table.rowCount()
-        if cols <= 0 or rows <= 0:
-            return
-        r = (slot_no - 1) // cols
-        c = (slot_no - 1) % cols
-        if r >= rows:
-            return
-        item = table.item(r, c)
-        if item is None:
-            item = QTableWidgetItem(str(slot_no))
-            item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            item.setFlags(Qt.ItemFlag.ItemIsEnabled)
-            table.setItem(r, c, item)
-
-        key = self._map_status_to_color(status)
-        if key is None:
-            return
-        color = COLOR_MAPPING.get(key, "#D3D3D3")
-        item.setBackground(QColor(color))
+        model = self._slot_models.get(group_index)
+        if model is not None:
+            model.set_statuses(status_map)
 
     def _load_non_recoverable_status(self) -> list[int]:
         ui_cfg = FUNCTION_CONFIG.get("UI", {})
@@ -917,10 +838,12 @@ class Connector(QWidget):
     def _reapply_group_status(self, group_index: int) -> None:
         self._slot_latched[group_index] = {}
         status_map = self._slot_raw_status.get(group_index, {})
+        display: dict[int, int] = {}
         for slot_no, status in status_map.items():
             display_status = self._apply_latched_status(group_index, slot_no, status)
             self._slot_status.setdefault(group_index, {})[slot_no] = display_status
-            self._slot_change_color(group_index, slot_no, display_status)
+            display[slot_no] = display_status
+        self._slot_change_colors(group_index, display)
 
     def _on_select_changed(self, index: int) -> None:
         sender = self.sender()
@@ -1154,46 +1077,22 @@ class Connector(QWidget):
     def _set_group_color(
         self, group_index: int, key: str, only_status_nonzero: bool = False
     ) -> None:
-        table = getattr(self.ui, f"iconTable_{group_index}", None)
-        if table is None:
-            return
-        color = COLOR_MAPPING.get(key, "#D3D3D3")
-        status_map = self._slot_status.get(group_index, {})
-        for r in range(table.rowCount()):
-            for c in range(table.columnCount()):
-                item = table.item(r, c)
-                if item is None:
-                    continue
-                text = item.text().strip()
-                if not text:
-                    continue
-                if only_status_nonzero:
-                    try:
-                        slot_no = int(text)
-                    except ValueError:
-                        continue
-                    if status_map.get(slot_no, 0) == 0:
-                        continue
-                item.setBackground(QColor(color))
+        model = self._slot_models.get(group_index)
+        if model is not None:
+            model.set_override(key, only_status_nonzero)
 
     def _clear_group_color(self, group_index: int) -> None:
-        table = getattr(self.ui, f"iconTable_{group_index}", None)
-        if table is None:
-            return
-        clear_brush = QBrush()
-        for r in range(table.rowCount()):
-            for c in range(table.columnCount()):
-                item = table.item(r, c)
-                if item is None:
-                    continue
-                if not item.text().strip():
-                    continue
-                item.setBackground(clear_brush)
+        model = self._slot_models.get(group_index)
+        if model is not None:
+            model.reset_statuses()
 
     def _refresh_group_colors(self, group_index: int) -> None:
-        status_map = self._slot_status.get(group_index, {})
-        for slot_no, status in status_map.items():
-            self._slot_change_color(group_index, slot_no, status)
+        state = self._group_state.get(group_index, {})
+        model = self._slot_models.get(group_index)
+        if state.get("paused") or model is None:
+            return
+        model.set_override(None)
+        model.set_statuses(self._slot_status.get(group_index, {}))
 
     def _ensure_worker(self, group_index: int) -> AgingThread:
         worker = self._workers.get(group_index)
@@ -1210,7 +1109,7 @@ class Connector(QWidget):
             db_worker=self._db_worker,
             table_name=table_name,
         )
-        worker.slot_status_changed.connect(self.on_slot_status_changed)
+        worker.slot_statuses_changed.connect(self.on_slot_statuses_changed)
         worker.summary_updated.connect(self.on_group_summary_updated)
         self._workers[group_index] = worker
         return worker
@@ -1369,6 +1268,9 @@ class Connector(QWidget):
         if worker is not None and worker.isRunning():
             worker.stop()
             worker.wait(2000)
+        if table_name:
+            # 采集线程已停, 该批次不再有新数据, 数据文件交给后台压实归档
+            self._db_worker.close_run(table_name)
 
         if app is not None:
             if "periodic_worker_stop" in app.ops:
@@ -1416,6 +1318,9 @@ class Connector(QWidget):
 
 
 class SlotDetailDialog(QDialog):
+    # 实时行由 LiveFeed 在采集线程回调, 经信号排队到界面线程
+    live_rows = Signal(list)
+
     def __init__(self, parent: QWidget, group_index: int, slot_no: int):
         info_mapping = {
             1: "电压曲线",
@@ -1438,6 +1343,8 @@ class SlotDetailDialog(QDialog):
             "dtc_count": [],
         }
         self._max_points = 2000
+        # 变化记录表只存变化行, 绘制时按阶梯还原
+        self._step_mode = False
         self._dtc_whitelist = self._load_dtc_whitelist()
 
         charts = QVBoxLayout()
@@ -1471,7 +1378,22 @@ class SlotDetailDialog(QDialog):
 
         layout.addLayout(charts)
 
+        # 缩放/拖动后按可视窗口重新取数 (防抖, 连续滚轮只取最后一次)
+        self._window_timers: dict[str, QTimer] = {}
+        for key, cfg in self._charts.items():
+            timer = QTimer(self)
+            timer.setSingleShot(True)
+            timer.setInterval(200)
+            timer.timeout.connect(lambda k=key: self._request_window(k))
+            self._window_timers[key] = timer
+            cfg["view"].view_changed.connect(timer.start)
+
         self._data_worker: Optional[_ChartDataWorker] = None
+        self._live_token: Optional[int] = None
+        # 回填完成前收到的实时行先暂存, 回填后只追加比回填更新的部分, 保证时间有序
+        self._backfilled = False
+        self._pending_live: list[tuple] = []
+        self.live_rows.connect(self._on_live_rows)
         self._start_data_worker()
 
     def _create_chart(self, title: str, y_label: str):
@@ -1529,20 +1451,45 @@ class SlotDetailDialog(QDialog):
             self._set_no_data("暂无数据")
             return
 
+        self._step_mode = self._is_delta_table(db_worker, table_name)
+        live_feed = getattr(db_worker, "live_feed", None)
+        if live_feed is not None:
+            # 先订阅再回填, 两者之间到达的行由 _on_backfill 去重
+            self._live_feed = live_feed
+            self._live_token = live_feed.subscribe(
+                table_name, self._slot_no, self.live_rows.emit
+            )
         db_path = getattr(db_worker, "db_path", "./aging_data.db")
         self._data_worker = _ChartDataWorker(
             db_path=db_path,
             table_name=table_name,
             slot_no=self._slot_no,
-            poll_interval=1.0,
             initial_limit=self._max_points,
+            path_for=getattr(db_worker, "db_path_for", None),
         )
-        self._data_worker.data_ready.connect(self._on_rows_ready)
+        self._data_worker.backfill_ready.connect(self._on_backfill)
+        self._data_worker.window_ready.connect(self._on_window_ready)
         self._data_worker.start()
 
-    def _on_rows_ready(self, rows: list[tuple]) -> None:
-        if not rows:
+    def _on_backfill(self, rows: list[tuple]) -> None:
+        self._backfilled = True
+        pending, self._pending_live = self._pending_live, []
+        last_ts = None
+        if rows:
+            last_ts = max(row[2] for row in rows if row[2] is not None)
+            self._on_rows_ready(rows)
+        if last_ts is not None:
+            pending = [row for row in pending if row[2] is not None and row[2] > last_ts]
+        self._on_rows_ready(pending)
+
+    def _on_live_rows(self, rows: list[tuple]) -> None:
+        if not self._backfilled:
+            self._pending_live.extend(rows)
             return
+        self._on_rows_ready(rows)
+
+    def _rows_to_points(self, rows: list[tuple]) -> dict[str, list]:
+        points: dict[str, list] = {key: [] for key in self._buffers}
         for row in rows:
             ts = row[2]
             if ts is None:
@@ -1550,30 +1497,62 @@ class SlotDetailDialog(QDialog):
             x_ms = int(float(ts) * 1000)  # Directly convert timestamp to milliseconds
             status = row[3]
             if row[4] is not None:
-                self._append_point("voltage", x_ms, float(row[4]), status)
+                points["voltage"].append((x_ms, float(row[4]), status))
             if row[5] is not None:
-                self._append_point("current", x_ms, float(row[5]), status)
+                points["current"].append((x_ms, float(row[5]), status))
             if row[6] is not None:
-                self._append_point("temperature", x_ms, float(row[6]), status)
+                points["temperature"].append((x_ms, float(row[6]), status))
             dtc_count = self._calc_dtc_count(row[7] if len(row) > 7 else None)
             if dtc_count is not None:
-                self._append_point("dtc_count", x_ms, float(dtc_count), status)
+                points["dtc_count"].append((x_ms, float(dtc_count), status))
+        return points
 
-        self._update_series("voltage", self._buffers["voltage"])
-        self._update_series("current", self._buffers["current"])
-        self._update_series("temperature", self._buffers["temperature"])
-        self._update_series("dtc_count", self._buffers["dtc_count"])
+    def _on_rows_ready(self, rows: list[tuple]) -> None:
+        if not rows:
+            return
+        needs_overview = False
+        for key, pts in self._rows_to_points(rows).items():
+            buf = self._buffers[key]
+            buf.extend(pts)
+            # 实时追加积累过多时, 重新取一次全程降采样, 而不是丢弃最早的数据
+            if len(buf) > self._max_points * 2:
+                needs_overview = True
 
-    def _append_point(
-        self, key: str, x_ms: int, y: float, status: Optional[int]
-    ) -> None:
-        buf = self._buffers.get(key)
-        if buf is None:
+        for key in self._buffers:
+            self._update_series(key, self._buffers[key])
+
+        if needs_overview and self._data_worker is not None:
+            self._data_worker.request_window("", None, None, self._max_points)
+
+    def _request_window(self, key: str) -> None:
+        cfg = self._charts.get(key)
+        if cfg is None or self._data_worker is None:
             return
-        buf.append((x_ms, y, status))
-        overflow = len(buf) - self._max_points
-        if overflow > 0:
-            del buf[:overflow]
+        x_axis = cfg["x_axis"]
+        start = x_axis.min().toMSecsSinceEpoch() / 1000.0
+        end = x_axis.max().toMSecsSinceEpoch() / 1000.0
+        if end <= start:
+            return
+        points = max(200, cfg["view"].viewport().width() * 2)
+        self._data_worker.request_window(key, start, end, points)
+
+    def _on_window_ready(self, key: str, rows: list[tuple]) -> None:
+        """key 为空表示全程概览, 替换全部曲线; 否则只替换被缩放的那一条"""
+        points = self._rows_to_points(rows)
+        keys = [key] if key else list(self._buffers)
+        for k in keys:
+            new_points = points[k]
+            if not key and new_points:
+                # 数据库落后于实时推送 (组提交间隔), 保留概览之后已推送的点
+                last_x = new_points[-1][0]
+                new_points.extend(p for p in self._buffers[k] if p[0] > last_x)
+            self._buffers[k] = new_points
+            self._update_series(k, self._buffers[k])
+        if not key:
+            # 概览会把已放大的曲线也换成粗粒度, 对锁定视图补取一次窗口
+            for k, cfg in self._charts.items():
+                if cfg["view"].is_user_locked():
+                    self._window_timers[k].start()
 
     def _load_and_draw(self) -> None:
         parent = self.parent()
@@ -1583,10 +1562,14 @@ class SlotDetailDialog(QDialog):
             self._set_no_data("暂无数据")
             return
 
+        self._step_mode = self._is_delta_table(db_worker, table_name)
         try:
-            rows = db_worker.query_data(
-                table_name,
-                conditions=f"Slot={int(self._slot_no)} ORDER BY Timestamp ASC",
+            conn = db_worker.connection_for(table_name)
+            if conn is None:
+                self._set_no_data("数据已过保留期")
+                return
+            rows = DataBaseWorker.query_chart_rows(
+                conn, table_name, self._slot_no, max_points=self._max_points
             )
         except Exception:
             return
@@ -1595,30 +1578,18 @@ class SlotDetailDialog(QDialog):
             self._set_no_data("暂无数据")
             return
 
-        voltage_points = []
-        current_points = []
-        temperature_points = []
-        dtc_points = []
-        for row in rows:
-            ts = row[2]
-            if ts is None:
-                continue
-            x_ms = int(float(ts) * 1000)  # Directly convert timestamp to milliseconds
-            status = row[3]
-            if row[4] is not None:
-                voltage_points.append((x_ms, float(row[4]), status))
-            if row[5] is not None:
-                current_points.append((x_ms, float(row[5]), status))
-            if row[6] is not None:
-                temperature_points.append((x_ms, float(row[6]), status))
-            dtc_count = self._calc_dtc_count(row[7] if len(row) > 7 else None)
-            if dtc_count is not None:
-                dtc_points.append((x_ms, float(dtc_count), status))
+        for key, pts in self._rows_to_points(rows).items():
+            self._update_series(key, pts)
 
-        self._update_series("voltage", voltage_points)
-        self._update_series("current", current_points)
-        self._update_series("temperature", temperature_points)
-        self._update_series("dtc_count", dtc_points)
+    @staticmethod
+    def _is_delta_table(db_worker, table_name: str) -> bool:
+        is_delta = getattr(db_worker, "is_delta_table", None)
+        if not callable(is_delta):
+            return False
+        try:
+            return bool(is_delta(table_name))
+        except Exception:
+            return False
 
     def _load_dtc_whitelist(self) -> set[str]:
         parent = self.parent()
@@ -1678,6 +1649,9 @@ class SlotDetailDialog(QDialog):
         return count
 
     def closeEvent(self, event) -> None:
+        if self._live_token is not None:
+            self._live_feed.unsubscribe(self._live_token)
+            self._live_token = None
         if self._data_worker is not None:
             self._data_worker.stop()
             self._data_worker.wait(2000)
@@ -1704,6 +1678,8 @@ class SlotDetailDialog(QDialog):
             return
 
         cfg["chart"].setTitle("")
+        if self._step_mode:
+            points = DataBaseWorker.step_points(points)
 
         clean_points = []
         alert_points = []
@@ -1799,6 +1775,9 @@ class AlarmStatusConfigDialog(QDialog):
 
 
 class _ChartView(QChartView):
+    # 缩放/拖动结束后发出, 由对话框按新的可视范围重新取数
+    view_changed = Signal()
+
     def __init__(self, chart: QChart, parent: Optional[QWidget] = None):
         super().__init__(chart, parent)
         self.setMouseTracking(True)
@@ -1875,6 +1854,7 @@ class _ChartView(QChartView):
             self._panning = False
             self._last_pos = None
             self.unsetCursor()
+            self.view_changed.emit()
             event.accept()
             return
         super().mouseReleaseEvent(event)
@@ -1948,72 +1928,127 @@ class _ChartView(QChartView):
         factor = 1.2 if delta > 0 else 0.8
         self.chart().zoom(factor)
         self._user_locked = True
+        self.view_changed.emit()
         event.accept()
 
 
 class _ChartDataWorker(QThread):
-    data_ready = Signal(list)
+    """详情窗口的数据库读取线程: 只做打开时的回填和缩放窗口查询, 实时数据走 LiveFeed"""
+
+    backfill_ready = Signal(list)
+    # (曲线 key, 行), key 为空表示全程概览
+    window_ready = Signal(str, list)
 
     def __init__(
         self,
         db_path: str,
         table_name: str,
         slot_no: int,
-        poll_interval: float = 1.0,
         initial_limit: int = 2000,
+        path_for=None,
     ):
         super().__init__()
         self._db_path = db_path
+        # 分文件存储时在本线程解析批次文件 (归档文件需要先解压)
+        self._path_for = path_for
         self._table_name = table_name
         self._slot_no = int(slot_no)
-        self._poll_ms = max(200, int(poll_interval * 1000))
         self._initial_limit = max(0, int(initial_limit))
         self._running = True
-        self._last_id = 0
+        # 只保留最新一次窗口请求, 连续缩放时旧请求直接作废
+        self._window_lock = threading.Lock()
+        self._window_request: Optional[tuple] = None
+        self._wakeup = threading.Event()
 
     def stop(self) -> None:
         self._running = False
+        self._wakeup.set()
+
+    def request_window(
+        self,
+        key: str,
+        start: Optional[float],
+        end: Optional[float],
+        max_points: int,
+    ) -> None:
+        with self._window_lock:
+            self._window_request = (key, start, end, int(max_points))
+        self._wakeup.set()
+
+    def _take_window_request(self) -> Optional[tuple]:
+        with self._window_lock:
+            req, self._window_request = self._window_request, None
+        return req
 
     def run(self):
+        conn = None
         try:
-            conn = sqlite3.connect(self._db_path)
-            cursor = conn.cursor()
-            idx_name = f"idx_{self._table_name}_slot_id".replace("-", "_")
-            try:
-                cursor.execute(
-                    f'CREATE INDEX IF NOT EXISTS {idx_name} ON "{self._table_name}" (Slot, Id)'
-                )
-                conn.commit()
-            except Exception:
-                pass
-
+            db_path = self._path_for(self._table_name) if self._path_for else self._db_path
+            if db_path is None:
+                self.backfill_ready.emit([])
+                return
+            conn = sqlite3.connect(db_path)
+            rows = []
             if self._initial_limit > 0:
-                cursor.execute(
-                    f'SELECT * FROM "{self._table_name}" WHERE Slot=? ORDER BY Id DESC LIMIT ?',
-                    (self._slot_no, self._initial_limit),
-                )
-                rows = cursor.fetchall()[::-1]
-                if rows:
-                    self._last_id = rows[-1][0]
-                    self.data_ready.emit(rows)
+                try:
+                    rows = DataBaseWorker.query_chart_rows(
+                        conn, self._table_name, self._slot_no,
+                        max_points=self._initial_limit,
+                    )
+                except sqlite3.Error:
+                    rows = []
+            # 回填失败也要通知, 否则对话框会一直暂存实时行
+            self.backfill_ready.emit(rows)
 
             while self._running:
-                cursor.execute(
-                    f'SELECT * FROM "{self._table_name}" WHERE Slot=? AND Id>? ORDER BY Id ASC',
-                    (self._slot_no, self._last_id),
+                self._wakeup.wait()
+                self._wakeup.clear()
+                req = self._take_window_request()
+                if req is None or not self._running:
+                    continue
+                key, start, end, points = req
+                rows = DataBaseWorker.query_chart_rows(
+                    conn, self._table_name, self._slot_no, start, end, points
                 )
-                rows = cursor.fetchall()
-                if rows:
-                    self._last_id = rows[-1][0]
-                    self.data_ready.emit(rows)
-                self.msleep(self._poll_ms)
+                self.window_ready.emit(key, rows)
         except Exception:
             return
         finally:
-            try:
+            if conn is not None:
                 conn.close()
-            except Exception:
-                pass
+
+
+class _HistoryQueryWorker(QThread):
+    """历史页查询: 日期选项与汇总列表在后台读取并格式化, 结果经信号回到界面线程"""
+
+    # (请求序号, 日期前缀, 日期选项或 None, 格式化后的行)
+    loaded = Signal(int, object, object, list)
+
+    def __init__(
+        self,
+        db_worker: DataBaseWorker,
+        seq: int,
+        date_prefix: Optional[str],
+        refresh_dates: bool,
+    ):
+        super().__init__()
+        self._db_worker = db_worker
+        self._seq = seq
+        self._date_prefix = date_prefix
+        self._refresh_dates = refresh_dates
+
+    def run(self):
+        prefixes = None
+        rows: list = []
+        try:
+            if self._refresh_dates:
+                prefixes = self._db_worker.summary_date_prefixes()
+            rows = Connector._format_summary_rows(
+                self._db_worker.query_summary(self._date_prefix)
+            )
+        except Exception as exc:
+            _log.error(f"历史汇总查询失败: {exc}")
+        self.loaded.emit(self._seq, self._date_prefix, prefixes, rows)
 
 
 class _HistoryExportWorker(QThread):
@@ -2023,187 +2058,70 @@ class _HistoryExportWorker(QThread):
         table_names: list[str],
         file_path: str,
         bad_status: set[int],
+        path_for=None,
     ):
         super().__init__()
+        # 分文件存储时按表解析数据文件, 归档文件在本线程内解压
+        self._path_for = path_for
         self._db_path = db_path
         self._table_names = table_names
         self._file_path = file_path
         self._bad_status = bad_status
 
     def run(self):
+        # 每张表一条分组聚合, 结果边查边写入 CSV
+        started = time.perf_counter()
         try:
-            conn = sqlite3.connect(self._db_path)
-        except Exception:
-            return
-
-        try:
-            with open(self._file_path, "w", newline="", encoding="utf-8-sig") as f:
-                writer = csv.writer(f)
-                writer.writerow(
-                    [
-                        "批次表",
-                        "穴位",
-                        "状态",
-                        "电压最小值",
-                        "电压最小时间",
-                        "电压最大值",
-                        "电压最大时间",
-                        "电压平均值",
-                        "电流最小值",
-                        "电流最小时间",
-                        "电流最大值",
-                        "电流最大时间",
-                        "电流平均值",
-                        "温度最小值",
-                        "温度最小时间",
-                        "温度最大值",
-                        "温度最大时间",
-                        "温度平均值",
-                    ]
-                )
-                for table_name in self._table_names:
-                    self._write_table_summary(conn, writer, table_name)
-        except Exception:
-            return
-        finally:
-            try:
-                conn.close()
-            except Exception:
-                pass
-
-    def _write_table_summary(
-        self, conn: sqlite3.Connection, writer: csv.writer, table_name: str
-    ) -> None:
-        cursor = conn.cursor()
-        try:
-            cursor.execute(
-                f'SELECT DISTINCT Slot FROM "{table_name}" ORDER BY Slot ASC'
+            count = DataBaseWorker.export_summary_csv(
+                self._db_path,
+                self._table_names,
+                self._file_path,
+                self._bad_status,
+                path_for=self._path_for,
             )
-        except Exception:
+        except Exception as exc:
+            _log.error(f"历史汇总导出失败: {exc}")
             return
-
-        slots = [row[0] for row in cursor.fetchall()]
-        for slot in slots:
-            if self._has_ng_status(cursor, table_name, slot):
-                status_text = "NG"
-            elif self._has_ok_status(cursor, table_name, slot):
-                status_text = "OK"
-            else:
-                status_text = "--"
-
-            v_stats = self._get_stats(cursor, table_name, slot, "Voltage")
-            c_stats = self._get_stats(cursor, table_name, slot, "Current")
-            t_stats = self._get_stats(cursor, table_name, slot, "Temperature")
-
-            writer.writerow(
-                [
-                    table_name,
-                    slot,
-                    status_text,
-                    *v_stats,
-                    *c_stats,
-                    *t_stats,
-                ]
-            )
-
-    def _has_ng_status(
-        self, cursor: sqlite3.Cursor, table_name: str, slot: int
-    ) -> bool:
-        if not self._bad_status:
-            return False
-        placeholders = ",".join(["?"] * len(self._bad_status))
-        params = [int(slot), *self._bad_status]
-        try:
-            cursor.execute(
-                f'SELECT 1 FROM "{table_name}" WHERE Slot=? AND Status IN ({placeholders}) LIMIT 1',
-                params,
-            )
-            return cursor.fetchone() is not None
-        except Exception:
-            return False
-
-    def _has_ok_status(
-        self, cursor: sqlite3.Cursor, table_name: str, slot: int
-    ) -> bool:
-        try:
-            cursor.execute(
-                f'SELECT 1 FROM "{table_name}" WHERE Slot=? AND Status=1 LIMIT 1',
-                (int(slot),),
-            )
-            return cursor.fetchone() is not None
-        except Exception:
-            return False
-
-    def _get_stats(
-        self, cursor: sqlite3.Cursor, table_name: str, slot: int, field: str
-    ) -> list[str]:
-        try:
-            cursor.execute(
-                f'SELECT MIN({field}), MAX({field}), AVG({field}) FROM "{table_name}" WHERE Slot=? AND {field} IS NOT NULL',
-                (int(slot),),
-            )
-            row = cursor.fetchone()
-        except Exception:
-            row = None
-
-        if not row:
-            return ["", "", "", "", ""]
-
-        min_val, max_val, avg_val = row
-        min_time = self._get_time_for_value(
-            cursor, table_name, slot, field, min_val, asc=True
-        )
-        max_time = self._get_time_for_value(
-            cursor, table_name, slot, field, max_val, asc=False
+        _log.info(
+            f"历史汇总导出完成: {len(self._table_names)} 张表, {count} 行, "
+            f"耗时 {time.perf_counter() - started:.2f}s"
         )
 
-        return [
-            self._fmt_float(min_val),
-            min_time,
-            self._fmt_float(max_val),
-            max_time,
-            self._fmt_float(avg_val),
-        ]
 
-    def _get_time_for_value(
+class _RawExportWorker(QThread):
+    def __init__(
         self,
-        cursor: sqlite3.Cursor,
-        table_name: str,
-        slot: int,
-        field: str,
-        value: Optional[float],
-        asc: bool = True,
-    ) -> str:
-        if value is None:
-            return ""
-        order = "ASC" if asc else "DESC"
-        try:
-            cursor.execute(
-                f'SELECT Timestamp FROM "{table_name}" WHERE Slot=? AND {field}=? ORDER BY Timestamp {order} LIMIT 1',
-                (int(slot), value),
-            )
-            row = cursor.fetchone()
-        except Exception:
-            row = None
-        if not row or row[0] is None:
-            return ""
-        try:
-            return datetime.fromtimestamp(float(row[0])).strftime("%Y-%m-%d %H:%M:%S")
-        except Exception:
-            return ""
+        db_path: str,
+        table_names: list[str],
+        file_path: str,
+        path_for=None,
+    ):
+        super().__init__()
+        self._db_path = db_path
+        self._table_names = table_names
+        self._file_path = file_path
+        self._path_for = path_for
 
-    @staticmethod
-    def _fmt_float(value: Optional[float]) -> str:
-        if value is None:
-            return ""
+    def run(self):
+        # 按块读取原始记录, 展平为带类型的列后写入 Parquet / Arrow
+        path_for = self._path_for or (lambda _table: self._db_path)
         try:
-            return f"{float(value):.2f}"
-        except Exception:
-            return ""
+            stats = RunExporter.RunExporter(path_for).export(
+                self._table_names, self._file_path
+            )
+        except Exception as exc:
+            _log.error(f"原始数据导出失败: {exc}")
+            return
+        _log.info(
+            f"原始数据导出完成: {stats['tables']} 张表, {stats['rows']} 行, "
+            f"{stats['columns']} 列, {stats['bytes'] / 1e6:.1f} MB, "
+            f"耗时 {stats['seconds']:.2f}s ({stats['rows_per_s']:.0f} 行/s)"
+        )
 
 
 class AgingThread(QThread):
-    slot_status_changed = Signal(int, int, int)
+    # 每个刷新周期一次: (group_index, [(slot, status), ...])
+    slot_statuses_changed = Signal(int, list)
     summary_updated = Signal(int, int, int, int, float, float, object)
 
     def __init__(
@@ -2222,6 +2140,10 @@ class AgingThread(QThread):
         self._running = True
         self._paused = False
         self._last_status: dict[int, int] = {}
+        self._last_codes = None
+        # 激活集合版本号：未变化时不重复下发诊断 slot 列表
+        self._active_version: Optional[int] = None
+        self._active_slots: list[int] = []
 
     def _get_status_func(self):
         if hasattr(self.app, "ops") and isinstance(getattr(self.app, "ops"), dict):
@@ -2247,38 +2169,30 @@ class AgingThread(QThread):
                 slot_count = int(FUNCTION_CONFIG["UI"].get("IndexPerGroup", 0))
                 continue
 
-            active_slots = Tools.get_active_slots(self.app)
-            diag_set_fn = None
-            diag_once_set = None
-            dtc_set_fn = None
-            if hasattr(self.app, "ops") and isinstance(getattr(self.app, "ops"), dict):
-                diag_set_fn = getattr(self.app, "ops").get("diag_set_periodic_slots")
-                diag_once_set = getattr(self.app, "ops").get("diag_set_pending_slots")
-                dtc_set_fn = getattr(self.app, "ops").get("dtc_set_periodic_slots")
-            if not diag_set_fn and hasattr(self.app, "diag_set_periodic_slots"):
-                diag_set_fn = getattr(self.app, "diag_set_periodic_slots")
-            if not diag_once_set and hasattr(self.app, "diag_set_pending_slots"):
-                diag_once_set = getattr(self.app, "diag_set_pending_slots")
-            if not dtc_set_fn and hasattr(self.app, "dtc_set_periodic_slots"):
-                dtc_set_fn = getattr(self.app, "dtc_set_periodic_slots")
-            if callable(diag_set_fn):
-                diag_set_fn(active_slots)
-            if callable(diag_once_set):
-                current_slots = set(active_slots)
-                last_slots = getattr(self, "_last_active_slots", set())
-                if current_slots != last_slots:
-                    diag_once_set(active_slots)
-                    self._last_active_slots = current_slots
-            if callable(dtc_set_fn):
-                dtc_set_fn(active_slots)
+            ops = getattr(self.app, "ops", None)
+            ops = ops if isinstance(ops, dict) else {}
+            version_fn = ops.get("card_active_version")
+            version = version_fn() if callable(version_fn) else None
+            if version is None or version != self._active_version:
+                active_slots = Tools.get_active_slots(self.app)
+                self._apply_active_slots(active_slots)
+                self._active_version = version
+                self._active_slots = active_slots
+            else:
+                # 激活集合未变化：沿用上轮结果, 诊断 slot 列表也无需重设
+                active_slots = self._active_slots
 
             results = Tools.get_slots_results(self.app, active_slots)  # 状态更新
             if results:
                 self.db_worker.enqueue(self.table_name, results)  # 状态写入数据库
 
+            if self._emit_changes(ops, slot_count, active_slots):
+                continue
+
             total = 0
             good = 0
             bad = 0
+            batch = []
 
             for slot in range(1, slot_count + 1):
                 card_status = status_fn("card_status", slot)
@@ -2294,7 +2208,9 @@ class AgingThread(QThread):
                 last = self._last_status.get(slot)
                 if last != status:
                     self._last_status[slot] = status
-                    self.slot_status_changed.emit(self.group_index, slot, status)
+                    batch.append((slot, status))
+            if batch:
+                self.slot_statuses_changed.emit(self.group_index, batch)
 
             max_temp: Optional[float] = None
             for slot_data in (results or {}).values():
@@ -2317,6 +2233,83 @@ class AgingThread(QThread):
 
             self.msleep(int(self.poll_interval * 1000))
 
+    def _apply_active_slots(self, active_slots: list[int]) -> None:
+        """把激活 slot 列表下发给周期诊断/一次性诊断/周期 DTC"""
+        diag_set_fn = None
+        diag_once_set = None
+        dtc_set_fn = None
+        if hasattr(self.app, "ops") and isinstance(getattr(self.app, "ops"), dict):
+            diag_set_fn = getattr(self.app, "ops").get("diag_set_periodic_slots")
+            diag_once_set = getattr(self.app, "ops").get("diag_set_pending_slots")
+            dtc_set_fn = getattr(self.app, "ops").get("dtc_set_periodic_slots")
+        if not diag_set_fn and hasattr(self.app, "diag_set_periodic_slots"):
+            diag_set_fn = getattr(self.app, "diag_set_periodic_slots")
+        if not diag_once_set and hasattr(self.app, "diag_set_pending_slots"):
+            diag_once_set = getattr(self.app, "diag_set_pending_slots")
+        if not dtc_set_fn and hasattr(self.app, "dtc_set_periodic_slots"):
+            dtc_set_fn = getattr(self.app, "dtc_set_periodic_slots")
+        if callable(diag_set_fn):
+            diag_set_fn(active_slots)
+        if callable(diag_once_set):
+            current_slots = set(active_slots)
+            last_slots = getattr(self, "_last_active_slots", set())
+            if current_slots != last_slots:
+                diag_once_set(active_slots)
+                self._last_active_slots = current_slots
+        if callable(dtc_set_fn):
+            dtc_set_fn(active_slots)
+
+    def _emit_changes(
+        self, ops: dict, slot_count: int, active_slots: list[int]
+    ) -> bool:
+        """按变化集合只对状态变化的 slot 批量发信号, 并在有变化或有激活 slot 时刷新统计。
+
+        返回 True 表示本轮已处理完毕（已休眠）；未提供变化集合时返回 False 走全表比较。
+        """
+        drain_fn = ops.get("card_drain_changed")
+        codes_fn = ops.get("card_status_codes")
+        summary_fn = ops.get("card_status_summary")
+        if not (callable(drain_fn) and callable(codes_fn) and callable(summary_fn)):
+            return False
+        if self._last_codes is None:
+            # 首轮按全表下发一次, 之后只取变化
+            drain_fn()
+            codes = codes_fn()
+            self._last_codes = codes
+            changed = [
+                (slot, int(codes[slot]))
+                for slot in range(1, min(slot_count + 1, len(codes)))
+            ]
+        else:
+            changed = drain_fn()
+        batch = []
+        for slot, status in changed:
+            if slot > slot_count:
+                continue
+            self._last_status[slot] = status
+            batch.append((slot, status))
+        if batch:
+            # 整批一次跨线程投递, GUI 侧一次重绘
+            self.slot_statuses_changed.emit(self.group_index, batch)
+        if changed or active_slots:
+            summary = summary_fn(active_slots)
+            total = summary["total"]
+            good = summary["good"]
+            bad = summary["bad"]
+            pass_rate = (good / total * 100.0) if total > 0 else 0.0
+            fail_rate = (bad / total * 100.0) if total > 0 else 0.0
+            self.summary_updated.emit(
+                self.group_index,
+                total,
+                good,
+                bad,
+                pass_rate,
+                fail_rate,
+                summary["max_temp"],
+            )
+        self.msleep(int(self.poll_interval * 1000))
+        return True
+
     def stop(self):
         self._running = False
 
@@ -2334,6 +2327,66 @@ class AgingThread(QThread):
         return self._paused
 
 
+class _FrameProbe(QObject):
+    """GUI 线程帧间隔探针：窗口期内用 16ms 精确定时器采样事件循环的实际间隔"""
+
+    def __init__(self, parent=None, interval_ms: int = 16, window_s: float = 2.0):
+        super().__init__(parent)
+        self._timer = QTimer(self)
+        self._timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self._timer.setInterval(interval_ms)
+        self._timer.timeout.connect(self._on_tick)
+        self._window_s = window_s
+        self._label = ""
+        self._last = 0.0
+        self._deadline = 0.0
+        self._gaps: list[float] = []
+        self._report: Optional[dict] = None
+
+    def start(self, label: str, window_s: Optional[float] = None) -> None:
+        """开始 (或延长) 一个测量窗口; 从调用时刻起计, 包含当前正在处理的批次"""
+        now = time.perf_counter()
+        self._deadline = now + (window_s if window_s is not None else self._window_s)
+        if self._timer.isActive():
+            self._label = f"{self._label}; {label}"
+            return
+        self._label = label
+        self._gaps = []
+        self._last = now
+        self._timer.start()
+
+    def _on_tick(self) -> None:
+        now = time.perf_counter()
+        self._gaps.append((now - self._last) * 1000.0)
+        self._last = now
+        if now >= self._deadline:
+            self.stop()
+
+    def stop(self) -> Optional[dict]:
+        if not self._timer.isActive():
+            return self._report
+        self._timer.stop()
+        gaps = sorted(self._gaps)
+        if gaps:
+            self._report = {
+                "label": self._label,
+                "frames": len(gaps),
+                "p50_ms": gaps[len(gaps) // 2],
+                "p95_ms": gaps[min(len(gaps) - 1, int(len(gaps) * 0.95))],
+                "max_ms": gaps[-1],
+            }
+            _log.info(
+                f"槽位刷新风暴帧间隔 [{self._label}]: {len(gaps)} 帧, "
+                f"p50 {self._report['p50_ms']:.1f}ms, "
+                f"p95 {self._report['p95_ms']:.1f}ms, "
+                f"max {self._report['max_ms']:.1f}ms"
+            )
+        return self._report
+
+    def last_report(self) -> Optional[dict]:
+        return self._report
+
+
 def main():
     _log.info("----应用启动----")
     qt_app = QApplication(sys.argv)
@@ -2351,7 +2404,9 @@ def main():
                 worker.wait(2000)
         if connector._db_worker is not None:
             connector._db_worker.stop_writing()
+            _log.info(f"DB writer metrics: {connector._db_worker.writer_metrics()}")
             connector._db_worker.close()
+        _log.info(f"Slot grid metrics: {connector.slot_update_metrics()}")
         for app in list(connector._apps.values()):
             if hasattr(app, "shutdown"):
                 app.shutdown()
@@ -0,0 +1,58 @@
+import os
+import sys
+
+import can
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from RxParser import AgingStatus  # noqa: E402
+
+
+def _frame(voltage: float, current: float) -> can.Message:
+    """采集卡状态帧: data[1] 电压 (0.1V), data[2:5] 电流 (0.001), data[7] 温度 (+40)"""
+    data = bytearray(8)
+    data[1] = round(voltage * 10)
+    data[2:5] = round(current * 1000).to_bytes(3, "big")
+    data[7] = 65
+    return can.Message(arbitration_id=0x100, data=data)
+
+
+def _feed(aging: AgingStatus, slot: int, voltage: float, current: float) -> int:
+    aging.decoding(_frame(voltage, current), slot=slot)
+    return int(aging.status_codes()[slot])
+
+
+def test_drain_changed_reports_each_change_once():
+    aging = AgingStatus()
+    assert aging.drain_changed() == []
+
+    ok = _feed(aging, 3, 12.0, 500)
+    lost = _feed(aging, 1, 0, 0)
+    assert (ok, lost) == (1, -5)
+    assert aging.drain_changed() == [(1, -5), (3, 1)]
+    assert aging.drain_changed() == []
+
+    # 状态码不变的帧不算变化
+    _feed(aging, 3, 12.1, 520)
+    assert aging.drain_changed() == []
+
+    over = _feed(aging, 3, 12.0, 1500)
+    assert aging.drain_changed() == [(3, over)]
+
+
+def test_active_version_bumps_only_when_active_set_changes():
+    aging = AgingStatus()
+    version = aging.active_version()
+
+    _feed(aging, 2, 12.0, 500)
+    assert aging.active_slots() == [2]
+    assert aging.active_version() == version + 1
+
+    # 1 -> 2 仍是激活状态, 集合不变
+    _feed(aging, 2, 12.0, 1500)
+    assert aging.active_version() == version + 1
+
+    # 暗电流以下视为未接产品, 移出激活集合
+    _feed(aging, 2, 12.0, 1)
+    assert aging.active_slots() == []
+    assert aging.active_version() == version + 2
@@ -0,0 +1,57 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from DataBaseWorker import _DeltaFilter  # noqa: E402
+
+
+def _row(ts, status=1, voltage=12.0, current=100.0, temperature=25.0, dtc="[]", slot=1):
+    return (slot, ts, status, voltage, current, temperature, dtc, "{}", "{}", "null")
+
+
+def _filter():
+    return _DeltaFilter({"Voltage": 0.1, "Current": 5.0, "Temperature": 1.0}, heartbeat=60.0)
+
+
+def test_first_row_per_slot_is_kept():
+    f = _filter()
+    rows = [_row(0.0, slot=1), _row(0.0, slot=2), _row(1.0, slot=1)]
+    assert f.filter(rows) == rows[:2]
+    assert (f.seen, f.written) == (3, 2)
+
+
+def test_rows_inside_deadband_are_dropped_until_heartbeat():
+    f = _filter()
+    f.filter([_row(0.0)])
+    assert f.filter([_row(10.0, voltage=12.05, current=103.0, temperature=25.5)]) == []
+    hb = _row(60.0)
+    assert f.filter([hb]) == [hb]
+
+
+def test_drift_is_measured_against_last_written_row():
+    """缓慢漂移: 每次采样都在死区内, 累计超出死区后落库"""
+    f = _filter()
+    f.filter([_row(0.0, voltage=12.0)])
+    assert f.filter([_row(1.0, voltage=12.06)]) == []
+    drifted = _row(2.0, voltage=12.12)
+    assert f.filter([drifted]) == [drifted]
+
+
+def test_status_payload_and_missing_values_are_changes():
+    f = _filter()
+    f.filter([_row(0.0)])
+    for row in (
+        _row(1.0, status=-1),
+        _row(2.0, status=-1, dtc='["U0100"]'),
+        _row(3.0, status=-1, dtc='["U0100"]', voltage=None),
+    ):
+        assert f.filter([row]) == [row]
+
+
+def test_non_numeric_timestamp_is_kept():
+    f = _filter()
+    f.filter([_row(0.0)])
+    for ts in (None, ""):
+        row = _row(ts)
+        assert f.filter([row]) == [row]
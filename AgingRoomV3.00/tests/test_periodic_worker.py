@@ -0,0 +1,46 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from CompManager import _PeriodicWorker  # noqa: E402
+
+
+def _run(worker, name, seconds):
+    """直接执行一次任务 (不经调度线程), seconds 为任务耗时"""
+    job = worker._jobs[name]
+    job.func = lambda: time.sleep(seconds) if seconds else None
+    worker._execute(job, time.monotonic())
+    return job.slow
+
+
+def test_single_slow_run_does_not_promote():
+    worker = _PeriodicWorker(max_workers=1, slow_threshold_s=0.01)
+    worker.add_job("poll", 1.0, lambda: None)
+    assert _run(worker, "poll", 0.03) is False
+    assert _run(worker, "poll", 0) is False
+    assert _run(worker, "poll", 0.03) is False
+    assert _run(worker, "poll", 0.03) is False
+
+
+def test_consecutive_slow_runs_promote_and_fast_runs_demote():
+    worker = _PeriodicWorker(max_workers=1, slow_threshold_s=0.01)
+    streak = worker._slow_streak
+    worker.add_job("poll", 1.0, lambda: None)
+    results = [_run(worker, "poll", 0.03) for _ in range(streak)]
+    assert results == [False] * (streak - 1) + [True]
+    # 移除后重新加入仍按慢任务调度
+    worker.remove_job("poll")
+    worker.add_job("poll", 1.0, lambda: None)
+    assert worker._jobs["poll"].slow
+
+    results = [_run(worker, "poll", 0) for _ in range(streak)]
+    assert results == [True] * (streak - 1) + [False]
+    assert "poll" not in worker._slow_names
+
+
+def test_declared_slow_job_stays_on_executor():
+    worker = _PeriodicWorker(max_workers=1, slow_threshold_s=0.01)
+    worker.add_job("diag", 1.0, lambda: None, slow=True)
+    assert all(_run(worker, "diag", 0) for _ in range(worker._slow_streak + 1))
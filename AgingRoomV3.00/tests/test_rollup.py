@@ -0,0 +1,86 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import DataBaseWorker as dbw  # noqa: E402
+
+
+def _snapshot(timestamp=None, voltage=12.0, **card_status):
+    card_status.update(Status=1, Voltage=voltage, Current=100.0, CardTemperature=25.0)
+    if timestamp is not None:
+        card_status["Timestamp"] = timestamp
+    return {1: {"card_status": card_status}}
+
+
+@pytest.fixture
+def worker(tmp_path, monkeypatch):
+    monkeypatch.setitem(
+        dbw.FUNCTION_CONFIG,
+        "DataBase",
+        {
+            "Path": str(tmp_path / "aging_data.db"),
+            "StorageMode": dbw.LAYOUT_COMPACT,
+            "DeltaRecording": {"Enable": True, "Heartbeat": 60.0, "Deadband": {}},
+            "Rollup": {"Enable": True, "BucketSeconds": 60},
+            "Writer": {"SpillPath": str(tmp_path / "aging_data.spill.jsonl")},
+            "Sharding": {"Enable": False},
+        },
+    )
+    w = dbw.DataBaseWorker()
+    yield w
+    w.stop_writing()
+    w.close()
+
+
+def test_rollup_tracks_extremes_and_buckets(worker):
+    """汇总随写入更新: 最值及其时间、行数, 以及按分钟切分的分桶"""
+    table = worker.create_new_table()
+    worker.start_writing()
+    for ts, voltage in ((1000.0, 12.0), (1010.0, 11.5), (1030.0, 12.5), (1090.0, 12.0)):
+        worker.enqueue(table, _snapshot(ts, voltage))
+    worker.stop_writing()
+
+    metrics = worker.writer_metrics()
+    assert metrics["failed_rows"] == 0
+    assert metrics["spilled"] == 0
+
+    row = worker.connection.execute(
+        "SELECT Count, VoltageMin, VoltageMinTs, VoltageMax, VoltageMaxTs "
+        "FROM SlotRollup WHERE TableName=? AND Slot=1",
+        (table,),
+    ).fetchone()
+    assert row == (4, 11.5, 1010.0, 12.5, 1030.0)
+
+    buckets = dbw.DataBaseWorker.query_rollup_buckets(worker.connection, table, 1)
+    # 60 秒分桶: [960, 1020) 两行, 1030 与 1090 各落一桶
+    assert [(b[2], b[3]) for b in buckets] == [(11.5, 12.0), (12.5, 12.5), (12.0, 12.0)]
+
+
+@pytest.mark.parametrize("blank", [None, ""])
+def test_rollup_survives_row_without_timestamp(worker, blank):
+    """首行缺少时间戳后, 后续同值行不应提交失败并转存"""
+    table = worker.create_new_table()
+    worker.start_writing()
+    if blank is None:
+        worker.enqueue(table, _snapshot())
+    else:
+        worker.enqueue(table, _snapshot(Timestamp=blank))
+    for ts in (1000.0, 1001.0, 1002.0):
+        worker.enqueue(table, _snapshot(ts))
+    worker.stop_writing()
+
+    metrics = worker.writer_metrics()
+    assert metrics["failed_rows"] == 0
+    assert metrics["spilled"] == 0
+    assert not metrics["spilling"]
+
+    row = worker.connection.execute(
+        "SELECT Count, VoltageMin, VoltageMinTs, VoltageMax, VoltageMaxTs "
+        "FROM SlotRollup WHERE TableName=? AND Slot=1",
+        (table,),
+    ).fetchone()
+    # 变化记录过滤后落库: 无时间戳的首行 + 第一条有时间戳的行
+    assert row == (2, 12.0, 1000.0, 12.0, 1000.0)
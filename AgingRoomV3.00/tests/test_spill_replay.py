@@ -0,0 +1,135 @@
+import json
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import DataBaseWorker as dbw  # noqa: E402
+
+
+def _snapshot(timestamp):
+    card_status = {
+        "Status": 1,
+        "Voltage": 12.0,
+        "Current": 100.0,
+        "CardTemperature": 25.0,
+        "Timestamp": timestamp,
+    }
+    return {1: {"card_status": card_status}}
+
+
+@pytest.fixture
+def worker(tmp_path, monkeypatch):
+    monkeypatch.setitem(
+        dbw.FUNCTION_CONFIG,
+        "DataBase",
+        {
+            "Path": str(tmp_path / "aging_data.db"),
+            "StorageMode": dbw.LAYOUT_LEGACY,
+            "DeltaRecording": {"Enable": False},
+            "Rollup": {"Enable": False},
+            # 每条日志记录单独提交, 便于在记录之间制造中断
+            "Writer": {
+                "SpillPath": str(tmp_path / "aging_data.spill.jsonl"),
+                "CommitRows": 1,
+            },
+            "Sharding": {"Enable": False},
+        },
+    )
+    w = dbw.DataBaseWorker()
+    yield w
+    w.close()
+
+
+def _spill_five(worker, table):
+    """写入 5 条日志记录, 返回 (日志 Id, 每条记录结束处的字节偏移)"""
+    for ts in range(1, 6):
+        worker._spill({"t": table, "d": _snapshot(float(ts))})
+    with open(worker.spill_path, "rb") as f:
+        lines = f.readlines()
+    offsets = []
+    offset = 0
+    for line in lines:
+        offset += len(line)
+        offsets.append(offset)
+    return json.loads(lines[0])["id"], offsets[1:]
+
+
+def _replay(worker):
+    conns = dbw._WriterConnections(worker)
+    try:
+        worker._replay_spill(conns)
+    finally:
+        conns.close_all()
+
+
+def _timestamps(worker, table):
+    rows = worker.connection.execute(
+        f'SELECT Timestamp FROM "{table}" ORDER BY Id'
+    ).fetchall()
+    return [row[0] for row in rows]
+
+
+def test_replay_resumes_after_committed_offset(worker):
+    """崩溃前已随偏移提交的记录, 重启回放时跳过"""
+    table = worker.create_new_table()
+    replay_id, offsets = _spill_five(worker, table)
+    # 模拟上次回放: 前两条记录与偏移在同一事务中提交后进程退出
+    cursor = worker.connection.cursor()
+    for ts in (1.0, 2.0):
+        worker._insert_data_with_cursor(table, _snapshot(ts), cursor)
+    worker._save_replay_offset(cursor, (replay_id, offsets[1]))
+    worker.connection.commit()
+
+    _replay(worker)
+
+    assert _timestamps(worker, table) == [1.0, 2.0, 3.0, 4.0, 5.0]
+    assert worker.writer_metrics()["replayed"] == 3
+    assert not worker._has_spill_backlog()
+
+
+def test_replay_ignores_offset_of_another_journal(worker):
+    """SpillProgress 中是另一份日志的偏移时, 本日志从头回放"""
+    table = worker.create_new_table()
+    _, offsets = _spill_five(worker, table)
+    cursor = worker.connection.cursor()
+    worker._save_replay_offset(cursor, ("stale", offsets[-1]))
+    worker.connection.commit()
+
+    _replay(worker)
+
+    assert _timestamps(worker, table) == [1.0, 2.0, 3.0, 4.0, 5.0]
+
+
+def test_replay_resumes_after_transient_failure(worker, monkeypatch):
+    """回放中途提交失败 (库被锁) 时保留 .replay, 重试后不重复写入已提交的记录"""
+    table = worker.create_new_table()
+    _spill_five(worker, table)
+
+    insert_rows = worker._insert_rows
+    calls = []
+
+    def flaky_insert(*args, **kwargs):
+        calls.append(args[0])
+        if len(calls) == 3:
+            raise sqlite3.OperationalError("database is locked")
+        return insert_rows(*args, **kwargs)
+
+    monkeypatch.setattr(worker, "_insert_rows", flaky_insert)
+    _replay(worker)
+
+    assert _timestamps(worker, table) == [1.0, 2.0]
+    assert worker._spilling
+    assert os.path.isfile(worker.spill_path + ".replay")
+    assert worker.writer_metrics()["spilled"] == 5
+
+    _replay(worker)
+
+    assert _timestamps(worker, table) == [1.0, 2.0, 3.0, 4.0, 5.0]
+    assert not worker._has_spill_backlog()
+    # 可重试的失败不转存, 也不进死信文件
+    assert worker.writer_metrics()["spilled"] == 5
+    assert not os.path.exists(worker.dead_letter_path)
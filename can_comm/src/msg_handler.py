@@ -4,8 +4,13 @@
 
 import can
 import cantools
-from multiprocessing import Queue
-from multiprocessing.queues import Empty
+import logging
+import pickle
+import multiprocessing
+import queue
+import threading
+from collections import deque
+from queue import Empty, Full
 import sys
 from pathlib import Path
 
@@ -21,12 +26,231 @@ except ImportError:
 
 can_config: dict = tools.load_config()
 
+_log = logging.getLogger(__name__)
+
+# 进程级DBC缓存: (绝对路径, mtime_ns, encoding) -> Database; DBC 文件修改后自动失效
+_dbc_cache: dict = {}
+_dbc_cache_lock = threading.Lock()
+_DBC_PICKLE_VERSION = 1
+
+
+def _load_dbc_pickle(pickle_path: Path, header: tuple):
+    if not pickle_path.exists():
+        return None
+    try:
+        with open(pickle_path, "rb") as f:
+            cached_header, cached_db = pickle.load(f)
+    except Exception as e:
+        _log.warning(f"DBC预编译文件读取失败, 重新解析: {pickle_path}, {e!r}")
+        return None
+    return cached_db if cached_header == header else None
+
+
+def _store_dbc_pickle(pickle_path: Path, header: tuple, db) -> None:
+    # 先写临时文件再替换, 中途崩溃不会留下截断的 .pkl
+    tmp_path = pickle_path.with_name(pickle_path.name + ".tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            pickle.dump((header, db), f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp_path.replace(pickle_path)
+    except Exception as e:
+        _log.warning(f"DBC预编译文件写入失败: {pickle_path}, {e!r}")
+        try:
+            tmp_path.unlink()
+        except Exception:
+            pass
+
+
+def load_dbc(dbc_path: Path, encoding: str, persist: bool = False):
+    """按路径+修改时间缓存DBC; persist=True 时在.dbc旁读写 .dbc.pkl, 冷启动跳过解析"""
+    path = Path(dbc_path).resolve()
+    mtime_ns = path.stat().st_mtime_ns
+    key = (str(path), mtime_ns, encoding)
+    with _dbc_cache_lock:
+        db = _dbc_cache.get(key)
+    if db is not None:
+        return db
+
+    header = (_DBC_PICKLE_VERSION, cantools.__version__, mtime_ns, encoding)
+    pickle_path = path.with_name(path.name + ".pkl")
+    db = _load_dbc_pickle(pickle_path, header) if persist else None
+    if db is None:
+        db = cantools.db.load_file(filename=str(path), encoding=encoding)
+        if persist:
+            _store_dbc_pickle(pickle_path, header, db)
+
+    with _dbc_cache_lock:
+        # 同一路径的旧版本 (mtime 变化前) 移除
+        for stale in [k for k in _dbc_cache if k[0] == key[0] and k != key]:
+            del _dbc_cache[stale]
+        db = _dbc_cache.setdefault(key, db)
+    return db
+
+
+class RingQueue:
+    """进程内有界环形队列, 线程间传递 can.Message 无需序列化
+
+    drop_oldest 的 put 与所有 get 依赖 deque 的原子 append/popleft, 只有队列空时才进入条件变量等待;
+    drop_newest/block 的容量检查与 append 需要原子完成, 在锁内进行。
+    overflow 策略:
+    - "drop_oldest": 满时覆盖最旧的一帧 (接收侧默认, 保证读到最新状态)
+    - "drop_newest": 满时丢弃新帧
+    - "block": 满时阻塞生产者, 超时抛 queue.Full (发送侧默认, 指令不丢)
+    """
+
+    OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "block")
+
+    def __init__(self, maxsize: int = 4096, overflow: str = "drop_oldest"):
+        if maxsize <= 0:
+            raise ValueError("maxsize 必须大于0")
+        if overflow not in self.OVERFLOW_POLICIES:
+            raise ValueError(f"不支持的溢出策略: {overflow}")
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self._buf = deque(maxlen=maxsize if overflow == "drop_oldest" else None)
+        self._cond = threading.Condition(threading.Lock())
+        self._getters = 0
+        self._putters = 0
+        self.put_count = 0
+        self.drop_count = 0
+        self.high_watermark = 0
+
+    def put(self, item, block: bool = True, timeout=None):
+        if self.overflow != "drop_oldest":
+            return self._put_bounded(item, block, timeout)
+        buf = self._buf
+        if len(buf) >= self.maxsize:
+            # deque(maxlen) 在 append 时自动挤掉最旧元素
+            self.drop_count += 1
+        buf.append(item)
+        self.put_count += 1
+        size = len(buf)
+        if size > self.high_watermark:
+            with self._cond:
+                self.high_watermark = max(self.high_watermark, size)
+        if self._getters:
+            with self._cond:
+                self._cond.notify()
+        return True
+
+    def put_nowait(self, item):
+        return self.put(item, block=False)
+
+    def _put_bounded(self, item, block, timeout):
+        """drop_newest/block: 容量检查与 append 在同一把锁内, 并发生产者不会超过 maxsize"""
+        with self._cond:
+            if len(self._buf) >= self.maxsize:
+                if self.overflow == "drop_newest":
+                    self.drop_count += 1
+                    return False
+                if not block:
+                    raise Full
+                self._putters += 1
+                try:
+                    if not self._cond.wait_for(
+                        lambda: len(self._buf) < self.maxsize, timeout
+                    ):
+                        raise Full
+                finally:
+                    self._putters -= 1
+            self._buf.append(item)
+            self.put_count += 1
+            size = len(self._buf)
+            if size > self.high_watermark:
+                self.high_watermark = size
+            if self._getters:
+                self._cond.notify()
+        return True
+
+    def get(self, block: bool = True, timeout=None):
+        try:
+            item = self._buf.popleft()
+        except IndexError:
+            if not block:
+                raise Empty
+            with self._cond:
+                # 先登记等待再复查, 与 put 的 "append 后检查 _getters" 配对, 不会漏唤醒
+                self._getters += 1
+                try:
+                    if not self._cond.wait_for(lambda: self._buf, timeout):
+                        raise Empty
+                    item = self._buf.popleft()
+                finally:
+                    self._getters -= 1
+        if self._putters:
+            with self._cond:
+                self._cond.notify_all()
+        return item
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def qsize(self) -> int:
+        return len(self._buf)
+
+    def empty(self) -> bool:
+        return not self._buf
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._buf),
+            "maxsize": self.maxsize,
+            "overflow": self.overflow,
+            "put": self.put_count,
+            "dropped": self.drop_count,
+            "high_watermark": self.high_watermark,
+        }
+
+
+def make_queue(kind: str = "ring", maxsize: int = 4096, overflow: str = "drop_oldest"):
+    """按类型创建收发队列
+
+    - "ring": RingQueue, 进程内默认选项
+    - "simple": queue.SimpleQueue, 无界, 无丢帧统计
+    - "process": multiprocessing.Queue, 仅在收发两端位于不同进程时使用 (每帧都会pickle)
+    """
+    if kind == "ring":
+        return RingQueue(maxsize=maxsize, overflow=overflow)
+    if kind == "simple":
+        return queue.SimpleQueue()
+    if kind == "process":
+        return multiprocessing.Queue(maxsize=maxsize)
+    raise ValueError(f"不支持的队列类型: {kind}")
+
+
+def queue_stats(q) -> dict:
+    """统一获取队列状态, 非 RingQueue 只返回当前长度"""
+    if isinstance(q, RingQueue):
+        return q.stats()
+    try:
+        size = q.qsize()
+    except NotImplementedError:
+        # macOS 上 multiprocessing.Queue.qsize 不可用
+        size = None
+    return {"size": size}
+
 
 class MessageHandler:
-    def __init__(self, send_queue, recv_queue):
+    def __init__(self, send_queue=None, recv_queue=None, bus=None):
+        """send_queue/recv_queue 为空时按配置 transport 创建; bus 为空时按配置 can_bus 打开"""
+        transport = can_config.get("transport", {})
+        kind = transport.get("queue", "ring")
+        if send_queue is None:
+            send_queue = make_queue(
+                kind,
+                maxsize=transport.get("send_maxsize", 1024),
+                overflow=transport.get("send_overflow", "block"),
+            )
+        if recv_queue is None:
+            recv_queue = make_queue(
+                kind,
+                maxsize=transport.get("recv_maxsize", 8192),
+                overflow=transport.get("recv_overflow", "drop_oldest"),
+            )
         self.send_queue = send_queue
         self.recv_queue = recv_queue
-        self.bus = can.Bus(
+        self.log_frames = transport.get("log_frames", False)
+        self.bus = bus or can.Bus(
             interface=can_config["can_bus"]["interface"],
             channel=can_config["can_bus"]["channel"],
             bitrate=can_config["can_bus"]["bitrate"],
@@ -36,31 +260,58 @@ class MessageHandler:
         self.notifier = can.Notifier(self.bus, [self])
         self.dbc_name = f"dbc/{can_config['dbc']['file_name']}.dbc"
         self.dbc_path = tools._normalize_path("dbc", Path(self.dbc_name))
-        self.dbc = cantools.db.load_file(
-            filename=str(self.dbc_path),
+        self.dbc = load_dbc(
+            self.dbc_path,
             encoding=can_config["dbc"]["encoding"],
+            persist=can_config["dbc"].get("pickle_cache", False),
         )
+        # 逐消息解码函数, 跳过 decode_message 的通用查找
+        self._decoders = {m.frame_id: m.decode for m in self.dbc.messages}
+        self._build_indexes()
         self.recv_running = True
         self.send_running = True
         self.product_status = {}
+        self.rx_decoded = 0
+        self.rx_dropped = 0
         self._stopping = False
         self._recv_thread = None
         self._send_thread = None
 
+    def _build_indexes(self):
+        """加载DBC时一次性建立索引: 帧ID/名称 -> 消息, 信号名 -> 消息名集合, 消息名 -> 默认信号模板"""
+        self._msg_by_id = {}
+        self._msg_by_name = {}
+        self._messages_by_signal = {}
+        self._signal_templates = {}
+        for m in self.dbc.messages:
+            # 与逐条扫描一致: 重复帧ID/名称取DBC中第一个
+            self._msg_by_id.setdefault(m.frame_id, m)
+            self._msg_by_name.setdefault(m.name, m)
+            self._signal_templates[m.name] = {sig.name: 0 for sig in m.signals}
+            for sig in m.signals:
+                self._messages_by_signal.setdefault(sig.name, set()).add(m.name)
+
     def __call__(self, msg: can.Message):
         """Notifier callback - receives messages from bus"""
-        self.recv_queue.put(msg)
+        try:
+            self.recv_queue.put(msg, block=False)
+        except Full:
+            # 阻塞策略或有界进程队列已满: 不能卡住 Notifier 线程, 计为丢帧
+            self.rx_dropped += 1
 
     def decode_message_loop(self):
         """Main loop for decoding receive messages"""
         while self.recv_running:
             try:
                 msg: can.Message = self.recv_queue.get(timeout=1)
-                if msg.arbitration_id not in self.dbc._frame_id_to_message:
+                decode = self._decoders.get(msg.arbitration_id)
+                if decode is None:
                     continue
-                decoded_msg = self.dbc.decode_message(msg.arbitration_id, msg.data)
+                decoded_msg = decode(msg.data)
                 self.product_status.update(decoded_msg)
-                print(f"Message ID: {msg.arbitration_id}, Data: {decoded_msg}")
+                self.rx_decoded += 1
+                if self.log_frames:
+                    print(f"Message ID: {msg.arbitration_id}, Data: {decoded_msg}")
             except Empty:
                 continue
             except Exception as e:
@@ -101,6 +352,15 @@ class MessageHandler:
         """获取最新的product状态"""
         return self.product_status.copy()
 
+    def transport_stats(self) -> dict:
+        """收发队列状态与丢帧计数"""
+        return {
+            "recv": queue_stats(self.recv_queue),
+            "send": queue_stats(self.send_queue),
+            "rx_decoded": self.rx_decoded,
+            "rx_dropped": self.rx_dropped,
+        }
+
     def send_raw_message(self, arbitration_id, data, is_extended_id=False):
         """发送原始CAN消息的便捷方法"""
         msg = can.Message(
@@ -128,6 +388,33 @@ class MessageHandler:
             print(f"发送DBC消息失败: {e!r}")
             return None
 
+    def send_dbc_messages(self, items):
+        """批量DBC编码并发送
+
+        items 中每项可以是:
+        - 信号字典: {"Sig1": 1, ...} → 根据信号自动匹配唯一DBC消息
+        - (消息名/帧ID, 信号字典) 二元组
+        先全部编码, 再依次放入发送队列; 返回与 items 等长的列表, 编码失败的项为 None。
+        """
+        built = []
+        for item in items:
+            if isinstance(item, dict):
+                message_or_id, signal_data = item, None
+            else:
+                message_or_id, signal_data = item
+            try:
+                built.append(self._build_dbc_message(message_or_id, signal_data)[3])
+            except Exception as e:
+                print(f"编码DBC消息失败: {item!r}, {e!r}")
+                built.append(None)
+
+        for msg in built:
+            if msg is not None:
+                self.send_queue.put(msg)
+        if self.log_frames:
+            print(f"Sending {sum(m is not None for m in built)}/{len(built)} DBC messages")
+        return built
+
     def set_periodic_task(
         self, message_or_id, signal_data=None, interval=0.1, duration=None
     ):
@@ -178,74 +465,67 @@ class MessageHandler:
             msg_def = self._find_message_by_signals(signal_data)
 
         filled_data = self._complete_dict(msg_def, signal_data)
-        encoded_data = self.dbc.encode_message(msg_def.name, filled_data)
+        encoded_data = msg_def.encode(filled_data)
         msg = can.Message(arbitration_id=msg_def.frame_id, data=encoded_data)
         return msg_def, filled_data, encoded_data, msg
 
     def _resolve_message_def(self, message_or_id):
         """根据名称或帧ID解析DBC消息定义"""
         if isinstance(message_or_id, int):
-            return next(
-                (m for m in self.dbc.messages if m.frame_id == message_or_id), None
-            )
+            return self._msg_by_id.get(message_or_id)
 
         # 尝试把字符串解析为帧ID(支持'0x..'或十进制)
         if isinstance(message_or_id, str):
             try:
-                frame_id = int(message_or_id, 0)
-                msg_by_id = next(
-                    (m for m in self.dbc.messages if m.frame_id == frame_id), None
-                )
+                msg_by_id = self._msg_by_id.get(int(message_or_id, 0))
                 if msg_by_id:
                     return msg_by_id
             except ValueError:
                 pass
             # 按名称匹配
-            try:
-                return self.dbc.get_message_by_name(message_or_id)
-            except KeyError:
-                return None
+            return self._msg_by_name.get(message_or_id)
 
         return None
 
     def _find_message_by_signals(self, signal_data):
         """根据提供的信号键集合匹配唯一的DBC消息"""
         provided = set(signal_data.keys())
-        candidates = []
-        for msg in self.dbc.messages:
-            signal_names = {s.name for s in msg.signals}
-            if provided.issubset(signal_names):
-                candidates.append(msg)
+        missing = {sig for sig in provided if sig not in self._messages_by_signal}
+        if missing:
+            raise ValueError(
+                f"未找到包含信号 {provided} 的单条DBC消息。信号 {missing} 在DBC中不存在。"
+            )
 
-        if not candidates:
-            # 提供更详细的错误提示
-            all_signals = set()
-            for msg in self.dbc.messages:
-                all_signals.update(s.name for s in msg.signals)
-
-            missing = provided - all_signals
-            if missing:
-                hint = f"信号 {missing} 在DBC中不存在。"
-            else:
-                hint = "可能这些信号分布在多条消息中。"
+        if not provided:
+            # 空信号集是任意消息的子集, 与逐条比对时一致: 唯一消息直接返回, 否则提示多条
+            candidates = set(self._msg_by_name)
+        else:
+            candidates = None
+            for sig in provided:
+                names = self._messages_by_signal[sig]
+                candidates = set(names) if candidates is None else candidates & names
+                if not candidates:
+                    break
 
-            raise ValueError(f"未找到包含信号 {provided} 的单条DBC消息。{hint}")
+        if not candidates:
+            raise ValueError(
+                f"未找到包含信号 {provided} 的单条DBC消息。可能这些信号分布在多条消息中。"
+            )
 
         if len(candidates) > 1:
-            names = [m.name for m in candidates]
-            raise ValueError(f"匹配到多条DBC消息 {names}, 请指定消息名或帧ID")
+            raise ValueError(
+                f"匹配到多条DBC消息 {sorted(candidates)}, 请指定消息名或帧ID"
+            )
 
-        return candidates[0]
+        return self._msg_by_name[next(iter(candidates))]
 
     def _complete_dict(self, msg_def, signal_data):
         """填补缺失的信号键,默认值为0,并忽略DBC未定义的多余键"""
-        allowed = {s.name for s in msg_def.signals}
-        # 仅保留DBC定义的信号
-        completed = {k: v for k, v in signal_data.items() if k in allowed}
-        # 补齐缺失的信号默认值0
-        for signal in allowed:
-            completed.setdefault(signal, 0)
-        print(f"Completed signal data (filtered): {completed}")
+        completed = dict(self._signal_templates[msg_def.name])
+        for k, v in signal_data.items():
+            # 仅保留DBC定义的信号
+            if k in completed:
+                completed[k] = v
         return completed
 
     def stop(self):
@@ -262,12 +542,9 @@ class MessageHandler:
 if __name__ == "__main__":
     import time
 
-    # 创建队列
-    send_queue = Queue()
-    recv_queue = Queue()
-
-    # 创建并启动消息处理器
-    mh = MessageHandler(send_queue, recv_queue).start()
+    # 创建并启动消息处理器, 收发队列按配置 transport 创建 (默认进程内 RingQueue)
+    # 跨进程使用时显式传入: MessageHandler(make_queue("process"), make_queue("process"))
+    mh = MessageHandler().start()
 
     # 示例: 发送原始CAN消息
     # mh.send_raw_message(0x12, [0x01, 0x02, 0x03, 0x04, 0x05, 0x06, 0x07, 0x08])
@@ -280,6 +557,12 @@ if __name__ == "__main__":
     # mh.send_dbc_message("BCU_Input_Detection_0x011", {"BCU_0x11_0_1_Key_ON": 1})
     # mh.send_dbc_message(0x11, {"BCU_0x11_24_16_V_ON": 12500})
 
+    # 批量发送: 一次编码多条消息
+    # mh.send_dbc_messages([
+    #     {"HU_Angle_AdtCmd": 1},
+    #     ("BCU_Input_Detection_0x011", {"BCU_0x11_0_1_Key_ON": 1}),
+    # ])
+
     # # 获取最新状态
     for _ in range(5):
         status = mh.get_status()
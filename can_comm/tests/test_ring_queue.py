@@ -0,0 +1,128 @@
+import sys
+import threading
+import time
+from pathlib import Path
+from queue import Empty, Full
+
+import pytest
+
+root_dir = Path(__file__).resolve().parent.parent
+if str(root_dir) not in sys.path:
+    sys.path.insert(0, str(root_dir))
+
+from src.msg_handler import RingQueue  # noqa: E402
+
+
+def _drain(q):
+    items = []
+    while True:
+        try:
+            items.append(q.get_nowait())
+        except Empty:
+            return items
+
+
+def test_drop_oldest_overwrites_oldest():
+    q = RingQueue(maxsize=4, overflow="drop_oldest")
+    for i in range(6):
+        assert q.put(i) is True
+    assert _drain(q) == [2, 3, 4, 5]
+    stats = q.stats()
+    assert stats["put"] == 6
+    assert stats["dropped"] == 2
+    assert stats["high_watermark"] == 4
+
+
+def test_drop_newest_rejects_new_items():
+    q = RingQueue(maxsize=3, overflow="drop_newest")
+    assert [q.put(i) for i in range(5)] == [True, True, True, False, False]
+    assert _drain(q) == [0, 1, 2]
+    assert q.stats()["dropped"] == 2
+
+
+def test_block_put_raises_full_without_space():
+    q = RingQueue(maxsize=2, overflow="block")
+    q.put(0)
+    q.put(1)
+    with pytest.raises(Full):
+        q.put_nowait(2)
+    started = time.monotonic()
+    with pytest.raises(Full):
+        q.put(2, timeout=0.05)
+    assert time.monotonic() - started >= 0.05
+    assert _drain(q) == [0, 1]
+
+
+def test_block_put_waits_for_consumer():
+    q = RingQueue(maxsize=1, overflow="block")
+    q.put("a")
+    done = threading.Event()
+
+    def producer():
+        q.put("b", timeout=2.0)
+        done.set()
+
+    t = threading.Thread(target=producer)
+    t.start()
+    assert not done.wait(0.05)
+    assert q.get() == "a"
+    assert done.wait(2.0)
+    t.join()
+    assert q.get_nowait() == "b"
+
+
+@pytest.mark.parametrize("overflow", RingQueue.OVERFLOW_POLICIES)
+def test_blocked_get_is_woken_by_put(overflow):
+    q = RingQueue(maxsize=8, overflow=overflow)
+    got = []
+    t = threading.Thread(target=lambda: got.append(q.get(timeout=2.0)))
+    t.start()
+    time.sleep(0.05)
+    q.put("frame")
+    t.join(2.0)
+    assert got == ["frame"]
+
+
+def test_get_timeout_raises_empty():
+    q = RingQueue(maxsize=2)
+    with pytest.raises(Empty):
+        q.get(timeout=0.02)
+    with pytest.raises(Empty):
+        q.get_nowait()
+
+
+def test_block_concurrent_producers_never_exceed_maxsize():
+    """多个生产者同时等待空位时, 容量检查与 append 原子完成, 队列长度不超过 maxsize"""
+    q = RingQueue(maxsize=4, overflow="block")
+    producers = 4
+    per_producer = 500
+    received = []
+    peak = [0]
+
+    def producer(base):
+        for i in range(per_producer):
+            q.put(base + i, timeout=5.0)
+
+    def consumer():
+        for _ in range(producers * per_producer):
+            peak[0] = max(peak[0], q.qsize())
+            received.append(q.get(timeout=5.0))
+
+    threads = [threading.Thread(target=producer, args=(p * per_producer,)) for p in range(producers)]
+    threads.append(threading.Thread(target=consumer))
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(10.0)
+
+    assert sorted(received) == list(range(producers * per_producer))
+    assert peak[0] <= 4
+    assert q.stats()["high_watermark"] <= 4
+    assert q.stats()["dropped"] == 0
+
+
+def test_rejects_bad_arguments():
+    with pytest.raises(ValueError):
+        RingQueue(maxsize=0)
+    with pytest.raises(ValueError):
+        RingQueue(overflow="discard")
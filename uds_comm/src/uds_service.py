@@ -7,6 +7,7 @@ from typing import Any, Optional
 
 import udsoncan
 import ctypes
+import functools
 
 try:
     import tools
@@ -34,26 +35,31 @@ class DefineDidCodec(udsoncan.DidCodec):
         return self.string_len
 
 
+@functools.lru_cache(maxsize=None)
+def _bind_generate_key(dll_path: str):
+    """解析导出表并绑定 GenerateKeyEx, 同一 DLL 路径只执行一次"""
+    dll_func_name = tools.get_dll_func_names(Path(dll_path))[0]
+    seed_key_dll = ctypes.CDLL(dll_path)
+    GenerateKeyEx = seed_key_dll.__getattr__(dll_func_name)
+
+    GenerateKeyEx.argtypes = [
+        ctypes.POINTER(ctypes.c_ubyte),
+        ctypes.c_ushort,
+        ctypes.c_uint,
+        ctypes.POINTER(ctypes.c_ubyte),
+        ctypes.POINTER(ctypes.c_ubyte),
+        ctypes.POINTER(ctypes.c_ushort),
+    ]
+    GenerateKeyEx.restype = ctypes.c_uint
+    return seed_key_dll, GenerateKeyEx
+
+
 class Security:
 
     def security_algo(level, seed):
         dll_file_name = diag_config["security"]["dll_file_name"]
         dll_path = tools._normalize_path("dll", Path(f"dll/{dll_file_name}.dll"))
-        dll_func_name = tools.get_dll_func_names(dll_path)[0]
-
-        ZeekrSeedKey = ctypes.CDLL(str(dll_path))
-
-        GenerateKeyEx = ZeekrSeedKey.__getattr__(dll_func_name)
-
-        GenerateKeyEx.argtypes = [
-            ctypes.POINTER(ctypes.c_ubyte),
-            ctypes.c_ushort,
-            ctypes.c_uint,
-            ctypes.POINTER(ctypes.c_ubyte),
-            ctypes.POINTER(ctypes.c_ubyte),
-            ctypes.POINTER(ctypes.c_ushort),
-        ]
-        GenerateKeyEx.restype = ctypes.c_uint
+        _, GenerateKeyEx = _bind_generate_key(str(dll_path))
 
         iSeedArray = (ctypes.c_ubyte * len(seed))(*seed)
         iSecurityLevel = ctypes.c_uint(level)